@@ -1,24 +1,38 @@
 import base64
-import json
 import math
+import os
 from collections import defaultdict
-from os import path, remove
-from uuid import uuid4
+from os import path
 
 import dash_bootstrap_components as dbc
 import dash_cytoscape as cyto
-import networkx as nx
 from dash import Dash, Input, Output, State, callback, dcc, html, no_update
 
-from visto.visualizer.build_graph import build_graph
-from visto.visualizer.components import navbar, no_node_modal
+from visto.connector.ontology_registry import ontology_registry
+from visto.connector.template_cache import template_cache
+from visto.visualizer.column_cache import column_cache
+from visto.visualizer.build_graph import BUILD_PHASES, build_graph, get_build_key
+from visto.visualizer.component_cache import component_cache
+from visto.visualizer.components import (
+    build_progress,
+    expired_graph_modal,
+    navbar,
+    no_node_modal,
+)
+from visto.visualizer.display_graphs import freeze_display_graphs, get_display_graphs
+from visto.visualizer.ego_cache import ego_cache
+from visto.visualizer.graph_store import graph_store
+from visto.visualizer.jobs import job_runner
 from visto.visualizer.plotter import plotter_modal
+from visto.visualizer.rank_index import RankIndex
 from visto.visualizer.selector import selector
-from visto.visualizer.serializers import read_json_graph
+from visto.visualizer.serializers import get_node_ids, serialize_graph
+from visto.visualizer.snapshot import SNAPSHOT_EXTENSION, read_snapshot, write_snapshot
 from visto.visualizer.stylesheet import default_stylesheet
 from visto.visualizer.visualizer_ref import VisualizerRef
 
 NUM_PANELS = 6
+EGO_RADIUS = 2
 NUM_COLS = 2
 LAYOUT_FULLWIDTH = 12
 
@@ -90,86 +104,74 @@ def generate_cytoscape_layout(
 cytoscape_layout = generate_cytoscape_layout(defaultdict(lambda: []))
 
 visualizer_ref = VisualizerRef()
+template_cache.set_cache_dir(visualizer_ref.get_template_cache_path())
+for search_path in visualizer_ref.get_ontology_search_paths():
+    ontology_registry.add_search_path(search_path)
+graph_store.set_spill_dir(visualizer_ref.get_graph_store_path())
+# drop the cached neighborhoods and stop precomputing them with the graphs
+graph_store.add_evict_callback(ego_cache.invalidate)
+column_cache.set_cache_dir(visualizer_ref.get_column_cache_path())
 app = Dash(__name__, external_stylesheets=[dbc.themes.BOOTSTRAP])
 
 app.layout = html.Div(
     [
-        dcc.Store(id="var-graph-store"),
-        dcc.Store(id="experiment-graph-store"),
-        dcc.Store(id="linked-nodes-store"),
+        # the graphs are kept on the server, the browser only holds their id
+        dcc.Store(id="graph-id-store"),
+        # the upload that is currently being built in the background
+        dcc.Store(id="build-job-store"),
         dcc.Store(id="selector-store", data=True),
         dcc.Store(id="for-plotting-nodes-store", data=[]),
         dcc.Store(id="for-adding-nodes-store", data=[]),
         dcc.Store(id="source-file-store", data=visualizer_ref.get_file_source_path()),
     ]
-    + [navbar, no_node_modal, plotter_modal]
+    + [navbar, build_progress, no_node_modal, expired_graph_modal, plotter_modal]
     + cytoscape_layout
     + [selector]
 )
 
 
-def generate_init_display_graph(file_path):
-    # only get the first subtree for debugging
-    experiment_graph = list(build_graph(file_path).values())[0].get_graph()
-    # get all the linked nodes
-    linked_nodes = {
-        (parent, child)
-        for parent, child, data in experiment_graph.edges(data=True)
-        if data["rel"] == "pmd:resource"
-    }
-    # delete child nodes of this relationship for better viewing
-    to_remove = {child for (parent, child) in linked_nodes}
-    new_node_values = {parent: child for parent, child in linked_nodes}
-    linked_nodes = {parent for (parent, child) in linked_nodes}
-
-    experiment_graph.remove_nodes_from(to_remove)
-    nx.set_node_attributes(experiment_graph, new_node_values, "resource")
-
-    # only get the instance variables for display
-    var_only_graph = experiment_graph.subgraph(
-        [node for node in experiment_graph if ":" not in node or node.startswith("ex:")]
+def generate_graphs(file_path, progress=None):
+    # components that are unchanged since an earlier upload are reused
+    root_ontologies = build_graph(
+        file_path, progress=progress, component_cache=component_cache
     )
+    return get_display_graphs(root_ontologies)
 
-    root = next(nx.topological_sort(var_only_graph))
-    init_display_graph = nx.ego_graph(var_only_graph, root, radius=2)
-
-    return experiment_graph, var_only_graph, init_display_graph, linked_nodes
-
-
-def serialize_graph(graph, linked_nodes):
-    graph_uuid = str(uuid4()).split("-")[-1]
-    elements = []
-    node_ids = dict()
-
-    for node_ct, node in enumerate(graph.nodes()):
-        node_id = f"{graph_uuid}-{node_ct}"
-        node_ids[node] = node_id
-        elements.append(
-            {
-                "data": {
-                    "id": node_id,
-                    "label": f"{node}",
-                    "chosen": False,
-                    "is_node": True,
-                    "linked": node in linked_nodes,
-                },
-            }
-        )
 
-    for parent, child, data in graph.edges(data=True):
-        parent_id, child_id = node_ids[parent], node_ids[child]
-        elements.append(
-            {
-                "data": {
-                    "source": parent_id,
-                    "target": child_id,
-                    "label": f"{data['rel']}",
-                    "is_node": False,
-                }
-            }
-        )
+def get_snapshot_file_path(graph_id):
+    snapshot_path = visualizer_ref.get_snapshot_path()
+    if snapshot_path is None:
+        return None
+    return path.join(snapshot_path, f"{graph_id}{SNAPSHOT_EXTENSION}")
+
 
-    return elements
+def read_graph_snapshot(graph_id):
+    # snapshots are prebuilt with visto-compile --snapshots or written after
+    # earlier builds, a missing or outdated file just means building again
+    snapshot_file_path = get_snapshot_file_path(graph_id)
+    if snapshot_file_path is None or not path.exists(snapshot_file_path):
+        return None
+    try:
+        return read_snapshot(snapshot_file_path)
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def write_graph_snapshot(graph_id, graphs):
+    snapshot_file_path = get_snapshot_file_path(graph_id)
+    if snapshot_file_path is None:
+        return
+    try:
+        os.makedirs(path.dirname(snapshot_file_path), exist_ok=True)
+        write_snapshot(snapshot_file_path, graphs, metadata={"graph_id": graph_id})
+    except OSError:
+        # snapshots are best-effort, the graphs are kept in the graph store anyway
+        pass
+
+
+def generate_init_display_graph(var_only_graph):
+    root = var_only_graph.get_roots()[0]
+    return var_only_graph.ego_graph(root, radius=EGO_RADIUS)
 
 
 @app.callback(
@@ -184,26 +186,31 @@ def toggle_modal(n, is_open):
     return is_open
 
 
+@app.callback(
+    Output("expired-graph-modal", "is_open", allow_duplicate=True),
+    Input("expired-graph-close", "n_clicks"),
+    prevent_initial_call=True,
+)
+def close_expired_graph_modal(n):
+    return False
+
+
 for layout_idx in range(NUM_PANELS - 1):
 
     @callback(
         Output(f"cytoscape-{layout_idx+1}", "elements", allow_duplicate=True),
         Output(f"cytoscape-caption-{layout_idx+1}", "children"),
         Output("no-node-modal", "is_open", allow_duplicate=True),
+        Output("expired-graph-modal", "is_open", allow_duplicate=True),
         Input(f"cytoscape-{layout_idx}", "tapNode"),
-        State("var-graph-store", "data"),
-        State("experiment-graph-store", "data"),
-        State("linked-nodes-store", "data"),
+        State("graph-id-store", "data"),
         State("selector-store", "data"),
+        State(f"cytoscape-toggle-{layout_idx+1}", "value"),
         prevent_initial_call=True,
     )
-    def select_ego_node(
-        node_data, var_only_graph, experiment_graph, linked_nodes, selector_state
-    ):
+    def select_ego_node(node_data, graph_id, selector_state, show_types):
         if not selector_state:
-            var_only_graph = read_json_graph(var_only_graph)
-            experiment_graph = read_json_graph(experiment_graph)
-            linked_nodes = json.loads(linked_nodes)
+            graphs = graph_store.get(graph_id)
 
             if not node_data:
                 return no_update
@@ -211,64 +218,203 @@ for layout_idx in range(NUM_PANELS - 1):
             if not node_data["data"]["label"]:
                 return no_update
 
-            if not var_only_graph or not experiment_graph:
-                return no_update
+            if graphs is None:
+                return no_update, no_update, no_update, graph_id is not None
 
-            # generate a new graph from the node
+            # generate a new graph from the node, neighborhoods are cached per graph
             selected_node = node_data["data"]["label"]
-            if selected_node not in var_only_graph.nodes():
-                return no_update, no_update, True
+            if selected_node not in graphs["var_only_graph"].nodes():
+                return no_update, no_update, True, no_update
+
+            new_elements = ego_cache.get_elements(
+                graph_id,
+                graphs,
+                selected_node,
+                radius=EGO_RADIUS,
+                show_types=bool(show_types),
+            )
 
-            selected_var_graph = nx.ego_graph(var_only_graph, selected_node, radius=2)
-            new_elements = serialize_graph(selected_var_graph, linked_nodes)
+            return new_elements, selected_node, False, no_update
 
-            for element in new_elements:
-                element["data"]["chosen"] = element["data"]["label"] == selected_node
+        return no_update
 
-            return new_elements, selected_node, False
 
-        return no_update
+def prepare_graphs(graph_id, graphs):
+    # keep element ids stable across taps and toggles
+    graphs["node_ids"] = get_node_ids(graphs["experiment_graph"], graph_id)
+    # expand types through precomputed entries instead of walking the graph
+    graphs["rank_index"] = RankIndex(graphs["experiment_graph"])
+    return graphs
+
+
+def precompute_ego_elements(graph_id, graphs):
+    ego_cache.precompute(
+        graph_id,
+        graphs,
+        visualizer_ref.get_ego_precompute_count(),
+        radius=EGO_RADIUS,
+    )
+
+
+def store_graphs(graph_id, graphs):
+    graph_store.put(prepare_graphs(graph_id, graphs), graph_id=graph_id)
+    precompute_ego_elements(graph_id, graphs)
+    return graphs
+
+
+def load_graphs(graph_id):
+    # asked by the graph store for graphs that neither its memory nor its disk
+    # copies hold, e.g. after a restart without a graph store path
+    graphs = read_graph_snapshot(graph_id)
+    if graphs is None:
+        return None
+    prepare_graphs(graph_id, graphs)
+    precompute_ego_elements(graph_id, graphs)
+    return graphs
+
+
+graph_store.set_loader(load_graphs)
+
+
+def build_graphs(content, graph_id, progress=None):
+    graphs = freeze_display_graphs(generate_graphs(content, progress=progress))
+    write_graph_snapshot(graph_id, graphs)
+    return store_graphs(graph_id, graphs)
+
+
+def generate_init_elements(graphs):
+    init_display_graph = generate_init_display_graph(graphs["var_only_graph"])
+    return serialize_graph(
+        init_display_graph, graphs["linked_nodes"], node_ids=graphs["node_ids"]
+    )
+
+
+def get_progress_label(status):
+    # e.g. "traversal (2/3): 12/40"
+    phase = status["phase"]
+    if phase is None:
+        return "Waiting for the build to start..."
+    label = f"{phase} ({BUILD_PHASES.index(phase) + 1}/{len(BUILD_PHASES)})"
+    if status["total"] > 1:
+        label += f": {status['done']}/{status['total']}"
+    return label
+
+
+def get_progress_value(status):
+    # every phase takes an equal share of the bar
+    phase = status["phase"]
+    if phase is None:
+        return 0
+    fraction = status["done"] / status["total"] if status["total"] else 1
+    return 100 * (BUILD_PHASES.index(phase) + fraction) / len(BUILD_PHASES)
 
 
 @callback(
     Output("cytoscape-0", "elements", allow_duplicate=True),
-    Output("var-graph-store", "data"),
-    Output("experiment-graph-store", "data"),
-    Output("linked-nodes-store", "data"),
+    Output("graph-id-store", "data"),
+    Output("build-job-store", "data"),
+    Output("build-interval", "disabled"),
+    Output("build-progress-area", "style"),
     Input("file-upload", "contents"),
     State("file-upload", "filename"),
+    State("build-job-store", "data"),
     prevent_initial_call=True,
 )
-def upload_file(contents, filename):
-    file_uuid = uuid4()
+def upload_file(contents, filename, prev_job):
     if not contents or not filename:
         return no_update
 
     if not filename.endswith(".drawio"):
         return no_update
 
-    temp_path = path.join(visualizer_ref.get_temp_path(), f"{file_uuid}-{filename}")
-    with open(temp_path, "wb") as f:
-        _, content = contents.split(",")
-        decoded = base64.b64decode(content)
-        f.write(decoded)
+    # a new upload supersedes the one that is still being built
+    if prev_job is not None:
+        job_runner.discard(prev_job["job_id"])
 
-    try:
-        experiment_graph, var_only_graph, init_display_graph, linked_nodes = (
-            generate_init_display_graph(temp_path)
+    _, content = contents.split(",")
+    decoded = base64.b64decode(content)
+
+    # identical uploads share one build, the key also covers the templates
+    graph_id = get_build_key(decoded)
+    # from memory, the disk copies of any app process or a prebuilt snapshot
+    graphs = graph_store.get(graph_id)
+    if graphs is not None:
+        return generate_init_elements(graphs), graph_id, None, True, {"display": "none"}
+
+    # build in the background and poll for progress, the upload returns at once
+    job_id = job_runner.submit(build_graphs, decoded, graph_id)
+    return (
+        no_update,
+        no_update,
+        {"job_id": job_id, "graph_id": graph_id},
+        False,
+        {"display": "block"},
+    )
+
+
+@callback(
+    Output("cytoscape-0", "elements", allow_duplicate=True),
+    Output("graph-id-store", "data", allow_duplicate=True),
+    Output("build-job-store", "data", allow_duplicate=True),
+    Output("build-interval", "disabled", allow_duplicate=True),
+    Output("build-progress-area", "style", allow_duplicate=True),
+    Output("build-progress", "value"),
+    Output("build-progress-label", "children"),
+    Input("build-interval", "n_intervals"),
+    State("build-job-store", "data"),
+    prevent_initial_call=True,
+)
+def poll_build(n_intervals, build_job):
+    job = job_runner.get_job(build_job["job_id"]) if build_job else None
+    if job is None:
+        return no_update, no_update, None, True, {"display": "none"}, 0, ""
+
+    status = job.get_status()
+    if status["state"] in ("queued", "running"):
+        return (
+            no_update,
+            no_update,
+            no_update,
+            no_update,
+            no_update,
+            get_progress_value(status),
+            get_progress_label(status),
         )
-    finally:
-        remove(temp_path)
 
-    new_elements = serialize_graph(init_display_graph, linked_nodes)
+    job_runner.discard(build_job["job_id"])
+    if status["state"] != "done":
+        # keep the bar visible to report the failure, cancellations just hide it
+        if status["state"] == "failed":
+            label = f"Build failed: {status['error']}"
+            return no_update, no_update, None, True, no_update, 0, label
+        return no_update, no_update, None, True, {"display": "none"}, 0, ""
+
+    graphs = job.get_result()
     return (
-        new_elements,
-        json.dumps(nx.node_link_data(var_only_graph)),
-        json.dumps(nx.node_link_data(experiment_graph)),
-        json.dumps(list(linked_nodes)),
+        generate_init_elements(graphs),
+        build_job["graph_id"],
+        None,
+        True,
+        {"display": "none"},
+        100,
+        "",
     )
 
 
+@callback(
+    Output("build-job-store", "data", allow_duplicate=True),
+    Output("build-interval", "disabled", allow_duplicate=True),
+    Output("build-progress-area", "style", allow_duplicate=True),
+    Input("build-cancel", "n_clicks"),
+    State("build-job-store", "data"),
+    prevent_initial_call=True,
+)
+def cancel_build(n_clicks, build_job):
+    if build_job is not None:
+        job_runner.discard(build_job["job_id"])
+    return None, True, {"display": "none"}
+
+
 for layout_idx in range(NUM_PANELS):
 
     @callback(
@@ -300,28 +446,25 @@ for layout_idx in range(NUM_PANELS):
 
     @callback(
         Output(f"cytoscape-{layout_idx}", "elements", allow_duplicate=True),
+        Output("expired-graph-modal", "is_open", allow_duplicate=True),
         Input(f"cytoscape-toggle-{layout_idx}", "value"),
         State(f"cytoscape-{layout_idx}", "elements"),
-        State("var-graph-store", "data"),
-        State("experiment-graph-store", "data"),
-        State("linked-nodes-store", "data"),
+        State("graph-id-store", "data"),
         prevent_initial_call=True,
     )
-    def toggle_type(
-        toggle_true, elements, var_only_graph, experiment_graph, linked_nodes
-    ):
-
-        if (
-            elements is None
-            or var_only_graph is None
-            or experiment_graph is None
-            or linked_nodes is None
-        ):
+    def toggle_type(toggle_true, elements, graph_id):
+        if elements is None:
             return no_update
 
-        var_only_graph = read_json_graph(var_only_graph)
-        experiment_graph = read_json_graph(experiment_graph)
-        linked_nodes = json.loads(linked_nodes)
+        graphs = graph_store.get(graph_id)
+        if graphs is None:
+            return no_update, graph_id is not None
+
+        var_only_graph = graphs["var_only_graph"]
+        experiment_graph = graphs["experiment_graph"]
+        linked_nodes = graphs["linked_nodes"]
+        node_ids = graphs["node_ids"]
+        rank_index = graphs["rank_index"]
 
         selected_node = None
 
@@ -337,32 +480,21 @@ for layout_idx in range(NUM_PANELS):
         }
 
         if toggle_true:
-            new_nodes = set()
-            for node in nodes:
-                predecessors = {
-                    predecessor
-                    for predecessor in experiment_graph.predecessors(node)
-                    if experiment_graph[predecessor][node]["is_rank"]
-                }
-                for predecessor in predecessors:
-                    new_nodes |= {predecessor}
-                    new_nodes |= nx.ancestors(experiment_graph, predecessor)
-
-            nodes |= new_nodes
+            nodes = rank_index.add_type_nodes(nodes)
             new_elements = serialize_graph(
-                experiment_graph.subgraph(nodes), linked_nodes
+                experiment_graph.subgraph(nodes), linked_nodes, node_ids=node_ids
             )
         else:
             new_nodes = nodes & var_only_graph.nodes()
             new_elements = serialize_graph(
-                var_only_graph.subgraph(new_nodes), linked_nodes
+                var_only_graph.subgraph(new_nodes), linked_nodes, node_ids=node_ids
             )
 
         if selected_node:
             for element in new_elements:
                 element["data"]["chosen"] = element["data"]["label"] == selected_node
 
-        return new_elements
+        return new_elements, no_update
 
 
 def main():
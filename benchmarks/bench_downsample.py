@@ -0,0 +1,85 @@
+# time the decimation of plotted series read through the plotter column cache
+# run from the repository root with: python -m benchmarks.bench_downsample
+import argparse
+import tempfile
+import time
+from os import path
+from timeit import repeat
+
+import numpy as np
+import pandas as pd
+
+from visto.visualizer.column_cache import ColumnCache
+from visto.visualizer.downsample import DOWNSAMPLERS, downsample, get_range_indices
+
+
+def write_series(file_path, num_rows, seed=0):
+    # a random walk with sparse spikes, sampled once per second
+    rng = np.random.default_rng(seed)
+    values = np.cumsum(rng.normal(size=num_rows))
+    spikes = rng.choice(num_rows, size=max(num_rows // 100_000, 1), replace=False)
+    values[spikes] += rng.normal(scale=50, size=len(spikes))
+    pd.DataFrame(
+        {
+            "timestamp": pd.date_range("2023-03-01", periods=num_rows, freq="s"),
+            "value": values,
+        }
+    ).to_csv(file_path, index=False)
+
+
+def time_call(func, runs):
+    return min(repeat(func, number=1, repeat=runs))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--points", type=int, default=4000)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        source_path = path.join(temp_dir, "series.csv")
+        start = time.perf_counter()
+        write_series(source_path, args.rows)
+        print(f"wrote {args.rows} rows in {time.perf_counter() - start:.1f} s")
+
+        column_cache = ColumnCache(path.join(temp_dir, "columns"))
+        start = time.perf_counter()
+        (_, x_values), (_, y_values) = column_cache.get_columns(source_path, [0, 1])
+        print(f"converted columns in {time.perf_counter() - start:.1f} s")
+        read_time = time_call(
+            lambda: pd.read_csv(source_path, usecols=[0, 1]), min(args.runs, 1)
+        )
+        print(f"pd.read_csv of both columns takes {read_time:.1f} s per plot\n")
+
+        x_numeric = x_values.view(np.int64).astype(np.float64)
+        print(f"{'method':>8} {'view':>8} {'rows':>10} {'points':>7} {'time (s)':>9}")
+        for method in DOWNSAMPLERS:
+            for fraction in [1, 0.1, 0.001]:
+                # zoom into the middle of the series
+                span = (x_numeric[-1] - x_numeric[0]) * fraction / 2
+                center = (x_numeric[-1] + x_numeric[0]) / 2
+                indices = None
+                num_rows = args.rows
+                if fraction < 1:
+                    indices = get_range_indices(x_values, center - span, center + span)
+                    num_rows = len(indices)
+
+                def run():
+                    if indices is None:
+                        return downsample(x_values, y_values, method, args.points)
+                    # the zoom callback also has to locate the visible range
+                    visible = get_range_indices(x_values, center - span, center + span)
+                    return downsample(x_values, y_values, method, args.points, visible)
+
+                points = len(run())
+                elapsed = time_call(run, args.runs)
+                print(
+                    f"{method:>8} {fraction:>8.1%} {num_rows:>10} {points:>7}"
+                    f" {elapsed:>9.4f}"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,288 @@
+# time the build pipeline and the main app callbacks on generated diagrams and
+# save the results as json, pass an earlier result file to compare against it
+# run from the repository root with:
+#   python -m benchmarks.bench_end_to_end --output results.json
+import argparse
+import base64
+import json
+import os
+import platform
+import statistics
+import subprocess
+import tempfile
+import time
+from datetime import datetime, timezone
+from importlib import metadata
+from os import path
+
+from benchmarks.diagram_generator import add_size_arguments, generate_diagram, get_sizes
+from visto.connector.data_ref import DataRef
+from visto.connector.ontology import Ontology
+from visto.connector.template_cache import template_cache
+from visto.visualizer.visualizer_ref import VisualizerRef
+
+REPOSITORY_PATH = path.dirname(path.dirname(path.abspath(__file__)))
+RESULTS_VERSION = 1
+
+SIZES = {
+    "small": {
+        "components": 4,
+        "areas": 2,
+        "binds": 3,
+        "defines": 1,
+        "links": 3,
+        "adopts": 3,
+        "places": 2,
+    },
+    "medium": {
+        "components": 24,
+        "areas": 4,
+        "binds": 4,
+        "defines": 2,
+        "links": 4,
+        "adopts": 4,
+        "places": 3,
+    },
+    "large": {
+        "components": 96,
+        "areas": 8,
+        "binds": 4,
+        "defines": 4,
+        "links": 4,
+        "adopts": 4,
+        "places": 3,
+    },
+}
+
+
+def use_temp_paths(temp_dir):
+    # keep the app caches and outputs out of the configured folders, this has
+    # to happen before the app module is imported
+    for name in [
+        "get_triple_output_path",
+        "get_template_cache_path",
+        "get_graph_store_path",
+        "get_column_cache_path",
+    ]:
+        folder_path = path.join(
+            temp_dir, name.removeprefix("get_").removesuffix("_path")
+        )
+        os.makedirs(folder_path)
+        setattr(VisualizerRef, name, lambda self, folder_path=folder_path: folder_path)
+    VisualizerRef.get_ego_precompute_count = lambda self: 0
+
+
+def time_scenario(func, runs, setup=None):
+    times = []
+    for _ in range(runs):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return {"runs": runs, "min": min(times), "median": statistics.median(times)}
+
+
+def get_git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=REPOSITORY_PATH,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def get_version():
+    try:
+        return metadata.version("mds-visto")
+    except metadata.PackageNotFoundError:
+        return None
+
+
+def clear_template_cache():
+    template_cache.invalidate()
+
+
+def run_pipeline_scenarios(content, runs):
+    from visto.visualizer.build_graph import build_graph
+
+    results = dict()
+    results["build_graph_cold"] = time_scenario(
+        lambda: build_graph(content, save_triples=False),
+        runs,
+        setup=clear_template_cache,
+    )
+    results["build_graph"] = time_scenario(
+        lambda: build_graph(content, save_triples=False), runs
+    )
+    results["build_graph_csv"] = time_scenario(
+        lambda: build_graph(content, triple_format="csv"), runs
+    )
+    return results
+
+
+def run_ontology_scenarios(runs, num_ontologies=100):
+    ref = DataRef()
+    template_cache.get_template("motor", ref.get_ontology_path("motor"))
+
+    def construct():
+        for idx in range(num_ontologies):
+            Ontology(f"motor {idx}", "motor_", "motor")
+
+    return {
+        "ontology_cold": time_scenario(
+            lambda: Ontology("motor 0", "motor_", "motor"),
+            runs,
+            setup=clear_template_cache,
+        ),
+        f"ontology_x{num_ontologies}": time_scenario(construct, runs),
+    }
+
+
+def run_app_scenarios(content, runs):
+    import app
+    from visto.visualizer.compact_graph import CompactGraph
+    from visto.visualizer.ego_cache import ego_cache
+    from visto.visualizer.graph_store import graph_store
+
+    contents = (
+        "data:application/octet-stream;base64," + base64.b64encode(content).decode()
+    )
+    graph_id = app.get_build_key(content)
+
+    results = dict()
+    results["generate_init_display_graph"] = time_scenario(
+        lambda: app.generate_init_display_graph(
+            CompactGraph.from_networkx(app.generate_graphs(content)["var_only_graph"])
+        ),
+        runs,
+    )
+
+    def upload():
+        # an upload is done once the polled build job has finished
+        build_job = app.upload_file(contents, "generated.drawio", None)[2]
+        while build_job is not None:
+            if app.poll_build(0, build_job)[2] is None:
+                break
+            time.sleep(0.001)
+        if graph_id not in graph_store:
+            raise RuntimeError("the build of the generated diagram failed")
+
+    results["upload_file"] = time_scenario(
+        upload, runs, setup=lambda: graph_store.discard(graph_id)
+    )
+    results["upload_file_cached"] = time_scenario(upload, runs)
+
+    graphs = graph_store.get(graph_id)
+    var_only_graph = graphs["var_only_graph"]
+    # ego graphs follow successors, pick the node with the most of them
+    node = max(var_only_graph.nodes(), key=var_only_graph.out_degree)
+    node_data = {"data": {"label": node}}
+    results["select_ego_node"] = time_scenario(
+        lambda: app.select_ego_node(node_data, graph_id, False, False),
+        runs,
+        setup=ego_cache.invalidate,
+    )
+    results["select_ego_node_cached"] = time_scenario(
+        lambda: app.select_ego_node(node_data, graph_id, False, False), runs
+    )
+
+    elements = app.generate_init_elements(graphs)
+    results["toggle_type"] = time_scenario(
+        lambda: app.toggle_type(True, elements, graph_id), runs
+    )
+    return results
+
+
+def compare_results(results, baseline):
+    # median ratios against an earlier run, above 1 means slower now
+    baseline_times = {
+        (entry["size"], entry["scenario"]): entry["median"]
+        for entry in baseline["results"]
+    }
+    print(f"\ncompared to {baseline.get('revision') or 'baseline'}")
+    print(
+        f"{'size':>8} {'scenario':>28} {'before (s)':>11} {'now (s)':>9} {'ratio':>7}"
+    )
+    for entry in results:
+        before = baseline_times.get((entry["size"], entry["scenario"]))
+        if before is None:
+            continue
+        print(
+            f"{entry['size'] or '-':>8} {entry['scenario']:>28} {before:>11.4f}"
+            f" {entry['median']:>9.4f} {entry['median'] / before:>6.2f}x"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--sizes",
+        nargs="+",
+        default=["small", "medium"],
+        help=f"preset diagram sizes ({', '.join(SIZES)}) or 'custom'",
+    )
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--output", help="json file to save the results to")
+    parser.add_argument("--compare", help="json file of an earlier run")
+    add_size_arguments(parser)
+    args = parser.parse_args()
+
+    sizes = {
+        name: get_sizes(args) if name == "custom" else SIZES[name]
+        for name in args.sizes
+    }
+
+    results = []
+    with tempfile.TemporaryDirectory() as temp_dir:
+        use_temp_paths(temp_dir)
+
+        scenarios = run_ontology_scenarios(args.runs)
+        for scenario, timing in scenarios.items():
+            results.append({"size": None, "scenario": scenario, **timing})
+
+        for size_name, size in sizes.items():
+            content = generate_diagram(**size).encode()
+            scenarios = dict()
+            scenarios.update(run_pipeline_scenarios(content, args.runs))
+            scenarios.update(run_app_scenarios(content, args.runs))
+            for scenario, timing in scenarios.items():
+                results.append(
+                    {"size": size_name, "params": size, "scenario": scenario, **timing}
+                )
+
+    print(f"{'size':>8} {'scenario':>28} {'min (s)':>9} {'median (s)':>11}")
+    for entry in results:
+        print(
+            f"{entry['size'] or '-':>8} {entry['scenario']:>28} {entry['min']:>9.4f}"
+            f" {entry['median']:>11.4f}"
+        )
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare_results(results, json.load(f))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(
+                {
+                    "results_version": RESULTS_VERSION,
+                    "version": get_version(),
+                    "revision": get_git_revision(),
+                    "timestamp": datetime.now(timezone.utc).isoformat(),
+                    "python": platform.python_version(),
+                    "platform": platform.platform(),
+                    "runs": args.runs,
+                    "results": results,
+                },
+                f,
+                indent=2,
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+# time the imports of the app and of the library entry points in fresh
+# interpreters with python -X importtime, and fail when a heavy module that is
+# only needed later (plotting, label fallback, diagram parsing) is imported
+# again or when an import got slower than an earlier run allows
+# run from the repository root with:
+#   python -m benchmarks.bench_imports --output imports.json
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import sys
+from datetime import datetime, timezone
+
+from benchmarks.bench_end_to_end import (
+    REPOSITORY_PATH,
+    get_git_revision,
+    get_version,
+)
+
+RESULTS_VERSION = 1
+
+# modules whose import should stay cheap and the modules they must not load
+TARGETS = {
+    "visto.visualizer.build_graph": [
+        "matplotlib",
+        "bs4",
+        "pandas",
+        "cemento",
+        "dash",
+        "plotly",
+    ],
+    "visto.cli": ["matplotlib", "bs4", "pandas", "cemento", "dash", "plotly"],
+    "app": ["matplotlib", "bs4", "pandas", "cemento", "plotly.express"],
+}
+
+
+def parse_importtime(output):
+    # one line per module: self and cumulative time in microseconds, the name
+    # is indented by its import depth
+    modules = dict()
+    for line in output.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:") :].split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            # the header line
+            continue
+        name = fields[2].rstrip()
+        depth = (len(name) - len(name.lstrip())) // 2
+        modules[name.strip()] = {
+            "self": int(fields[0]),
+            "cumulative": int(fields[1]),
+            "depth": depth,
+        }
+    return modules
+
+
+def time_import(target):
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {target}"],
+        cwd=REPOSITORY_PATH,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return parse_importtime(result.stderr)
+
+
+def get_loaded(modules, names):
+    return [
+        name
+        for name in names
+        if any(module == name or module.startswith(f"{name}.") for module in modules)
+    ]
+
+
+def get_heaviest(modules, target, num_modules):
+    # the modules imported directly by the target, as costly as their subtree.
+    # importtime lists a module after everything it imported, so the subtree
+    # is made of the lines before the target up to the previous sibling
+    names = list(modules)
+    target_depth = modules[target]["depth"]
+    children = []
+    for name in reversed(names[: names.index(target)]):
+        if modules[name]["depth"] <= target_depth:
+            break
+        if modules[name]["depth"] == target_depth + 1:
+            children.append((name, modules[name]["cumulative"]))
+    return sorted(children, key=lambda child: child[1], reverse=True)[:num_modules]
+
+
+def run_target(target, forbidden, runs, num_modules):
+    times = []
+    for _ in range(runs):
+        modules = time_import(target)
+        times.append(modules[target]["cumulative"] / 1000)
+    return {
+        "target": target,
+        "runs": runs,
+        "min": min(times),
+        "median": statistics.median(times),
+        "num_modules": len(modules),
+        "forbidden": get_loaded(modules, forbidden),
+        "heaviest": [
+            {"module": name, "cumulative": cumulative / 1000}
+            for name, cumulative in get_heaviest(modules, target, num_modules)
+        ],
+    }
+
+
+def compare_results(results, baseline, max_ratio):
+    # median ratios against an earlier run, above 1 means slower now
+    baseline_times = {entry["target"]: entry["median"] for entry in baseline["results"]}
+    print(f"\ncompared to {baseline.get('revision') or 'baseline'}")
+    print(f"{'target':>30} {'before (ms)':>12} {'now (ms)':>10} {'ratio':>7}")
+    regressions = []
+    for entry in results:
+        before = baseline_times.get(entry["target"])
+        if before is None:
+            continue
+        ratio = entry["median"] / before
+        print(
+            f"{entry['target']:>30} {before:>12.1f} {entry['median']:>10.1f}"
+            f" {ratio:>6.2f}x"
+        )
+        if ratio > max_ratio:
+            regressions.append(entry["target"])
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--targets", nargs="+", default=list(TARGETS), help="modules to import"
+    )
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument(
+        "--heaviest", type=int, default=5, help="direct imports listed per target"
+    )
+    parser.add_argument("--output", help="json file to save the results to")
+    parser.add_argument("--compare", help="json file of an earlier run")
+    parser.add_argument(
+        "--max-ratio",
+        type=float,
+        default=1.25,
+        help="fail when an import is this much slower than in the compared run",
+    )
+    args = parser.parse_args()
+
+    results = [
+        run_target(target, TARGETS.get(target, []), args.runs, args.heaviest)
+        for target in args.targets
+    ]
+
+    print(f"{'target':>30} {'min (ms)':>10} {'median (ms)':>12} {'modules':>8}")
+    for entry in results:
+        print(
+            f"{entry['target']:>30} {entry['min']:>10.1f} {entry['median']:>12.1f}"
+            f" {entry['num_modules']:>8}"
+        )
+        for heavy in entry["heaviest"]:
+            print(f"{'':>30}   {heavy['module']:<34} {heavy['cumulative']:>8.1f}")
+
+    failures = []
+    for entry in results:
+        if entry["forbidden"]:
+            failures.append(
+                f"{entry['target']} imports {', '.join(entry['forbidden'])}"
+            )
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare_results(results, json.load(f), args.max_ratio)
+        failures.extend(
+            f"{target} is more than {args.max_ratio:.2f}x slower to import"
+            for target in regressions
+        )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(
+                {
+                    "results_version": RESULTS_VERSION,
+                    "version": get_version(),
+                    "revision": get_git_revision(),
+                    "timestamp": datetime.now(timezone.utc).isoformat(),
+                    "python": platform.python_version(),
+                    "platform": platform.platform(),
+                    "runs": args.runs,
+                    "results": results,
+                },
+                f,
+                indent=2,
+            )
+
+    if failures:
+        print()
+        for failure in failures:
+            print(f"failed: {failure}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
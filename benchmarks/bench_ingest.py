@@ -0,0 +1,88 @@
+# compare row-wise and bulk ingestion of cemento relationship tables
+# run from the repository root with: python -m benchmarks.bench_ingest
+import argparse
+from collections import defaultdict
+from pathlib import Path
+from timeit import repeat
+
+import networkx as nx
+import pandas as pd
+from cemento.draw_io.read_diagram import ReadDiagram
+
+from visto.connector.edge_table import graph_from_relationships
+
+REPO_PATH = Path(__file__).parent.parent
+TEMPLATE_PATH = REPO_PATH / "visto" / "ontologies" / "motor" / "motor_ref.drawio"
+EDGE_WEIGHT = defaultdict(int, {"mds:bind": 2, "mds:define": 3, "mds:link": 4})
+
+
+def enlarge_relationships(rels_df, factor):
+    # replicate the table with suffixed labels and ids to keep the copies disjoint
+    copies = []
+    for copy_idx in range(factor):
+        rels_copy = rels_df.copy()
+        for column in ["parent", "child", "parent_id", "child_id", "rel_id"]:
+            rels_copy[column] = rels_copy[column] + f"-{copy_idx}"
+        copies.append(rels_copy)
+    return pd.concat(copies, ignore_index=True)
+
+
+def ingest_rowwise(rels_df):
+    graph = nx.DiGraph()
+    for _, row in rels_df.iterrows():
+        graph.add_node(row["parent_id"], content=row["parent"])
+        graph.add_node(row["child_id"], content=row["child"])
+        graph.add_edge(
+            row["parent_id"],
+            row["child_id"],
+            rel=row["rel"],
+            rel_id=row["rel_id"],
+            weight=EDGE_WEIGHT[row["rel"]],
+        )
+    return graph
+
+
+def ingest_bulk(rels_df):
+    return graph_from_relationships(
+        rels_df,
+        source="parent_id",
+        target="child_id",
+        node_attrs={"content": ("parent", "child")},
+        edge_attrs={
+            "rel": "rel",
+            "rel_id": "rel_id",
+            "weight": lambda rels: rels["rel"].map(EDGE_WEIGHT),
+        },
+    )
+
+
+def time_call(func, rels_df, runs):
+    return min(repeat(lambda: func(rels_df), number=1, repeat=runs))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--factors", type=int, nargs="+", default=[1, 10, 100, 500])
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    rels_df = ReadDiagram(str(TEMPLATE_PATH)).get_relationships()
+
+    print(f"{'edges':>10} {'iterrows (s)':>14} {'bulk (s)':>10} {'speedup':>8}")
+    for factor in args.factors:
+        enlarged_df = enlarge_relationships(rels_df, factor)
+        rowwise_graph, bulk_graph = ingest_rowwise(enlarged_df), ingest_bulk(
+            enlarged_df
+        )
+        assert nx.utils.graphs_equal(rowwise_graph, bulk_graph)
+
+        rowwise_time = time_call(ingest_rowwise, enlarged_df, args.runs)
+        bulk_time = time_call(ingest_bulk, enlarged_df, args.runs)
+        print(
+            f"{len(enlarged_df):>10} {rowwise_time:>14.4f} {bulk_time:>10.4f}"
+            f" {rowwise_time / bulk_time:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
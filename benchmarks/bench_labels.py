@@ -0,0 +1,141 @@
+# time the label parsing of build_graph against the previous bs4 parsing and
+# check that both agree on the labels of the shipped diagrams
+# run from the repository root with: python -m benchmarks.bench_labels
+import argparse
+import random
+import re
+from glob import glob
+from os import path
+from timeit import repeat
+from xml.etree import ElementTree
+
+from bs4 import BeautifulSoup as bs
+
+from visto.visualizer.build_graph import clean_term, get_term_mapping
+from visto.visualizer.labels import get_label_text
+
+REPOSITORY_PATH = path.dirname(path.dirname(path.abspath(__file__)))
+
+
+def get_term_mapping_bs4(term, symbol="[]"):
+    term_mapping = re.match(rf"(.*)\{symbol[0]}(.*)\{symbol[1]}", term)
+    if term_mapping:
+        result = tuple(
+            bs(text, "html.parser").get_text().strip() for text in term_mapping.groups()
+        )
+        term_class, content = result[0], result[1].split("|")
+        if len(content) > 1:
+            return term_class, content[0], content[1]
+        return term_class, content[0]
+    return None
+
+
+def clean_term_bs4(term):
+    term = bs(term, "html.parser").get_text().strip()
+    term_mapping = re.match(r"(.*)\[(.*)\]", term)
+    if term_mapping:
+        return term_mapping.group(1)
+    return term
+
+
+def read_labels():
+    file_paths = glob(path.join(REPOSITORY_PATH, "in", "*.drawio")) + glob(
+        path.join(REPOSITORY_PATH, "visto", "ontologies", "**", "*.drawio"),
+        recursive=True,
+    )
+    labels = set()
+    for file_path in file_paths:
+        for element in ElementTree.parse(file_path).iter():
+            label = element.get("value") or element.get("label")
+            if label:
+                labels.add(label)
+    return file_paths, sorted(labels)
+
+
+def generate_labels(num_labels, num_unique, seed=0):
+    # term labels as drawn in the diagrams, about half of them styled
+    rng = random.Random(seed)
+    unique_labels = []
+    for idx in range(num_unique):
+        label = f"term {idx}[template_{idx % 7}|term_{idx}]"
+        if rng.random() < 0.5:
+            name, mapping = label.split("[")
+            label = (
+                f'{name}<div><span style="font-size: 11px;">[{mapping}</span><br></div>'
+            )
+        unique_labels.append(label)
+    return [rng.choice(unique_labels) for _ in range(num_labels)]
+
+
+def check_labels(labels):
+    mismatches = []
+    for label in labels:
+        if (
+            get_label_text(label) != bs(label, "html.parser").get_text()
+            or get_term_mapping(label) != get_term_mapping_bs4(label)
+            or get_term_mapping(label, symbol="()")
+            != get_term_mapping_bs4(label, symbol="()")
+            or clean_term(label) != clean_term_bs4(label)
+        ):
+            mismatches.append(label)
+    return mismatches
+
+
+def clear_caches():
+    get_label_text.cache_clear()
+    get_term_mapping.cache_clear()
+    clean_term.cache_clear()
+
+
+def time_call(func, runs):
+    return min(repeat(func, number=1, repeat=runs))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--labels", type=int, default=100_000)
+    parser.add_argument("--unique", type=int, default=20_000)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    file_paths, shipped_labels = read_labels()
+    mismatches = check_labels(shipped_labels)
+    print(
+        f"checked {len(shipped_labels)} labels of {len(file_paths)} diagrams,"
+        f" {len(mismatches)} mismatches"
+    )
+    for label in mismatches:
+        print(f"  {label!r}")
+
+    labels = generate_labels(args.labels, args.unique)
+
+    def parse_bs4():
+        for label in labels:
+            get_term_mapping_bs4(label)
+            clean_term_bs4(label)
+
+    def parse_uncached():
+        for label in labels:
+            clear_caches()
+            get_term_mapping(label)
+            clean_term(label)
+
+    def parse():
+        clear_caches()
+        for label in labels:
+            get_term_mapping(label)
+            clean_term(label)
+
+    print(f"\n{args.labels} labels, {args.unique} unique")
+    print(f"{'parser':>12} {'time (s)':>9} {'labels/s':>10}")
+    for name, func in [
+        ("bs4", parse_bs4),
+        ("regex", parse_uncached),
+        ("memoized", parse),
+    ]:
+        elapsed = time_call(func, args.runs)
+        print(f"{name:>12} {elapsed:>9.3f} {args.labels / elapsed:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
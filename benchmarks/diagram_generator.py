@@ -0,0 +1,231 @@
+# generate synthetic experiment diagrams from the shipped templates
+# run from the repository root with:
+#   python -m benchmarks.diagram_generator out.drawio --components 20 --binds 4
+import argparse
+from xml.sax.saxutils import quoteattr
+
+from visto.connector.data_ref import DataRef
+
+AXES = ["x", "y", "z"]
+# templates the generated terms are instantiated from
+TEMPLATES = ["hutch", "setup", "motor_stack", "motor", "thermocouple"]
+
+NODE_SIZE = 80
+NODE_SPACING = 280
+COMPONENT_HEIGHT = 400
+AREA_MARGIN = 100
+
+
+class DiagramGenerator:
+    # lays out an experiment as draw.io cells: one hutch area holding setup
+    # areas, each setup holds motor stacks (the components) and sensors
+
+    def __init__(self, html_labels=True):
+        self._cells = []
+        self._num_cells = 0
+        self._num_uids = 0
+        self._html_labels = html_labels
+
+    def _get_cell_id(self):
+        self._num_cells += 1
+        return f"gen-{self._num_cells}"
+
+    def _get_uid(self):
+        self._num_uids += 1
+        return 1000 + self._num_uids
+
+    def add_vertex(self, label, x, y, width=NODE_SIZE, height=NODE_SIZE, area=False):
+        cell_id = self._get_cell_id()
+        if area:
+            style = "rounded=0;whiteSpace=wrap;html=1;fillColor=none;verticalAlign=top;"
+        else:
+            style = "ellipse;whiteSpace=wrap;html=1;"
+        self._cells.append(
+            f'<mxCell id="{cell_id}" value={quoteattr(label)} style="{style}"'
+            f' parent="1" vertex="1"><mxGeometry x="{x}" y="{y}" width="{width}"'
+            f' height="{height}" as="geometry" /></mxCell>'
+        )
+        return cell_id
+
+    def add_edge(self, source_id, target_id, rel):
+        edge_id = self._get_cell_id()
+        self._cells.append(
+            f'<mxCell id="{edge_id}" style="endArrow=classic;html=1;" parent="1"'
+            f' source="{source_id}" target="{target_id}" edge="1">'
+            f'<mxGeometry relative="1" as="geometry" /></mxCell>'
+        )
+        label_id = self._get_cell_id()
+        self._cells.append(
+            f'<mxCell id="{label_id}" value="{rel}" style="edgeLabel;html=1;align=center;"'
+            f' parent="{edge_id}" vertex="1" connectable="0"><mxGeometry relative="1"'
+            f' as="geometry"><mxPoint as="offset" /></mxGeometry></mxCell>'
+        )
+        return edge_id
+
+    def get_term_label(self, name, template, self_term):
+        # styled labels are what draw.io writes once a term label is formatted
+        if self._html_labels:
+            return (
+                f'{name}<div><span style="font-size: 11px;">[{template}|{self_term}]'
+                f"</span><br></div>"
+            )
+        return f"{name}[{template}|{self_term}]"
+
+    def add_component(self, name, x, y, binds, adopts, links, places):
+        # a motor stack bound to its motors, motors are placed one after the other
+        stack_id = self.add_vertex(
+            self.get_term_label(f"{name} stack", "motor_stack", "stack_"), x, y
+        )
+        motor_ids = []
+        for motor_idx in range(binds):
+            motor_x = x + (motor_idx + 1) * NODE_SPACING
+            motor_id = self.add_vertex(
+                self.get_term_label(f"{name}M{motor_idx} motor", "motor", "motor_"),
+                motor_x,
+                y,
+            )
+            self.add_edge(stack_id, motor_id, "mds:bind")
+            if motor_idx < adopts:
+                axis = AXES[motor_idx % len(AXES)]
+                adopt_id = self.add_vertex(f"motor {axis}_", motor_x, y + 120)
+                self.add_edge(motor_id, adopt_id, "mds:adopt")
+            if motor_idx < links:
+                link_id = self.add_vertex(f"{self._get_uid()}", motor_x + 100, y + 120)
+                self.add_edge(motor_id, link_id, "mds:link")
+            motor_ids.append(motor_id)
+
+        for prev_id, next_id in list(zip(motor_ids, motor_ids[1:]))[:places]:
+            self.add_edge(prev_id, next_id, "mds:place")
+
+    def add_sensor(self, name, x, y):
+        # a thermocouple with a linked temperature and a defined sample
+        sensor_id = self.add_vertex(
+            self.get_term_label(f"{name} thermo", "thermocouple", "thermocouple_"), x, y
+        )
+        link_id = self.add_vertex(f"{self._get_uid()} (temperature_)", x + 120, y)
+        self.add_edge(sensor_id, link_id, "mds:link")
+        define_id = self.add_vertex("K-type (sample_)", x + 220, y)
+        self.add_edge(sensor_id, define_id, "mds:define")
+
+    def generate(
+        self, components=4, areas=2, binds=3, defines=1, links=3, adopts=3, places=2
+    ):
+        # components are spread over the setup areas, each area also holds
+        # `defines` sensors with one definition each
+        areas = max(areas, 1)
+        area_components = [
+            len(range(area_idx, components, areas)) for area_idx in range(areas)
+        ]
+        area_width = (binds + 1) * NODE_SPACING + AREA_MARGIN
+        sensor_height = NODE_SIZE + 40 if defines else 0
+        area_heights = [
+            num_components * COMPONENT_HEIGHT + defines * sensor_height + AREA_MARGIN
+            for num_components in area_components
+        ]
+
+        hutch_height = sum(area_heights) + (areas + 1) * AREA_MARGIN // 2 + AREA_MARGIN
+        self.add_vertex(
+            "~H0 hutch [hutch|hutch_]",
+            0,
+            0,
+            area_width + AREA_MARGIN,
+            hutch_height,
+            area=True,
+        )
+
+        area_y = AREA_MARGIN
+        component_idx = 0
+        for area_idx, (num_components, area_height) in enumerate(
+            zip(area_components, area_heights)
+        ):
+            area_x = AREA_MARGIN // 2
+            self.add_vertex(
+                f"~S{area_idx} setup [setup|setup_]",
+                area_x,
+                area_y,
+                area_width,
+                area_height,
+                area=True,
+            )
+            y = area_y + AREA_MARGIN
+            for _ in range(num_components):
+                self.add_component(
+                    f"S{area_idx}K{component_idx}",
+                    area_x + 40,
+                    y,
+                    binds,
+                    adopts,
+                    links,
+                    places,
+                )
+                component_idx += 1
+                y += COMPONENT_HEIGHT
+            for sensor_idx in range(defines):
+                self.add_sensor(f"S{area_idx}T{sensor_idx}", area_x + 40, y)
+                y += sensor_height
+            area_y += area_height + AREA_MARGIN // 2
+
+        return self.to_xml()
+
+    def to_xml(self):
+        cells = "\n".join(self._cells)
+        return (
+            '<mxfile host="visto-benchmarks"><diagram name="Page-1" id="generated">'
+            '<mxGraphModel dx="1000" dy="1000" grid="1" gridSize="10" page="1"'
+            ' pageWidth="850" pageHeight="1100"><root><mxCell id="0" /><mxCell id="1" parent="0" />\n'
+            f"{cells}\n</root></mxGraphModel></diagram></mxfile>"
+        )
+
+
+def check_templates():
+    # the generated diagrams only make sense with the shipped templates
+    ref = DataRef()
+    for name in TEMPLATES:
+        ref.get_ontology_path(name)
+
+
+def generate_diagram(html_labels=True, **sizes):
+    check_templates()
+    return DiagramGenerator(html_labels=html_labels).generate(**sizes)
+
+
+def add_size_arguments(parser):
+    parser.add_argument("--components", type=int, default=4)
+    parser.add_argument("--areas", type=int, default=2)
+    parser.add_argument("--binds", type=int, default=3, help="motors per component")
+    parser.add_argument("--defines", type=int, default=1, help="sensors per area")
+    parser.add_argument(
+        "--links", type=int, default=3, help="linked motors per component"
+    )
+    parser.add_argument(
+        "--adopts", type=int, default=3, help="adopting motors per component"
+    )
+    parser.add_argument("--places", type=int, default=2, help="mds:place chain length")
+
+
+def get_sizes(args):
+    return {
+        "components": args.components,
+        "areas": args.areas,
+        "binds": args.binds,
+        "defines": args.defines,
+        "links": args.links,
+        "adopts": args.adopts,
+        "places": args.places,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("output_path")
+    parser.add_argument("--plain-labels", action="store_true")
+    add_size_arguments(parser)
+    args = parser.parse_args()
+
+    content = generate_diagram(html_labels=not args.plain_labels, **get_sizes(args))
+    with open(args.output_path, "w") as f:
+        f.write(content)
+
+
+if __name__ == "__main__":
+    main()
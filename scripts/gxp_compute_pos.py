@@ -1,12 +1,11 @@
 import pandas as pd
 import networkx as nx
 
+from visto.connector.edge_table import graph_from_relationships
+
 if __name__ == "__main__":
     rels_df = pd.read_excel("/Users/gabriel/dev/aps/onto-connector/out/E-hutch.xlsx")
-    ex_graph = nx.DiGraph()
-    for _, row in rels_df.iterrows():
-        parent, child, rel = row['parent'], row['child'], row['rel']
-        ex_graph.add_edge(parent, child, rel=rel)
+    ex_graph = graph_from_relationships(rels_df, edge_attrs={"rel": "rel"})
 
     placements = [(parent,child) for parent, child, data in ex_graph.edges(data=True) if data['rel'] == "mds:place"]
     chain_graphs = nx.DiGraph(placements)
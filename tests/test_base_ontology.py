@@ -0,0 +1,44 @@
+import networkx as nx
+import pytest
+
+from visto.connector.base_ontology import order_substitutions
+
+
+def apply_one_by_one(graph, ordered):
+    for old, new in ordered:
+        nx.relabel_nodes(graph, {old: new}, copy=False)
+    return graph
+
+
+def test_chains_are_applied_from_their_tail():
+    substitutions = {"a": "b", "b": "c", "c": "d"}
+    ordered = order_substitutions(substitutions)
+
+    assert ordered == [("c", "d"), ("b", "c"), ("a", "b")]
+    graph = nx.DiGraph([("a", "b"), ("b", "c"), ("x", "a")])
+    expected = nx.relabel_nodes(graph, substitutions)
+    result = apply_one_by_one(graph, ordered)
+    assert sorted(result.edges()) == sorted(expected.edges())
+
+
+def test_branches_and_independent_renames_are_all_kept():
+    substitutions = {"a": "c", "b": "c2", "c": "d", "x": "y", "same": "same"}
+    ordered = order_substitutions(substitutions)
+
+    # identity renames are dropped, every other rename is listed once
+    assert sorted(ordered) == sorted(
+        (old, new) for old, new in substitutions.items() if old != new
+    )
+    assert ordered.index(("c", "d")) < ordered.index(("a", "c"))
+
+
+@pytest.mark.parametrize(
+    "substitutions, cycle",
+    [
+        ({"a": "b", "b": "a"}, "a -> b -> a"),
+        ({"x": "a", "a": "b", "b": "c", "c": "a"}, "a -> b -> c -> a"),
+    ],
+)
+def test_cycles_are_reported(substitutions, cycle):
+    with pytest.raises(ValueError, match=cycle):
+        order_substitutions(substitutions)
@@ -0,0 +1,136 @@
+import json
+import shutil
+from os import path
+
+import pytest
+
+from visto import cli
+from visto.visualizer.snapshot import read_snapshot
+
+DIAGRAM_PATH = path.join(path.dirname(__file__), "..", "in", "tutorial_3.drawio")
+
+
+@pytest.fixture
+def diagrams(tmp_path, monkeypatch):
+    # keep the workers away from the configured template cache
+    monkeypatch.setattr(cli.VisualizerRef, "get_template_cache_path", lambda self: None)
+    input_path = tmp_path / "in"
+    (input_path / "nested").mkdir(parents=True)
+    shutil.copy(DIAGRAM_PATH, input_path / "first.drawio")
+    shutil.copy(DIAGRAM_PATH, input_path / "nested" / "second.drawio")
+    (input_path / "notes.txt").write_text("not a diagram")
+    return input_path
+
+
+def compile_diagrams(input_path, output_path, **kwargs):
+    return cli.compile_diagrams(
+        [str(input_path)],
+        str(output_path),
+        "csv",
+        num_workers=1,
+        verbose=False,
+        **kwargs,
+    )
+
+
+def test_find_diagrams_searches_folders_and_drops_duplicates(diagrams):
+    file_paths = cli.find_diagrams(
+        [str(diagrams), str(diagrams / "first.drawio"), str(diagrams / "*.txt")]
+    )
+    assert file_paths == [
+        str(diagrams / "first.drawio"),
+        str(diagrams / "nested" / "second.drawio"),
+    ]
+
+
+def test_output_folders_mirror_the_input_layout(diagrams, tmp_path):
+    file_paths = cli.find_diagrams([str(diagrams)])
+    assert cli.get_output_folders(file_paths, "out") == {
+        file_paths[0]: path.join("out", "first"),
+        file_paths[1]: path.join("out", "nested", "second"),
+    }
+
+
+def test_unchanged_diagrams_are_skipped(diagrams, tmp_path):
+    output_path = tmp_path / "out"
+    results, num_skipped, _, _ = compile_diagrams(diagrams, output_path)
+    assert num_skipped == 0
+    assert [result for result in results if "error" in result] == []
+    outputs = sorted(output for result in results for output in result["outputs"])
+    assert outputs and all(path.exists(output) for output in outputs)
+
+    results, num_skipped, _, _ = compile_diagrams(diagrams, output_path)
+    assert (results, num_skipped) == ([], 2)
+
+    # an edited diagram and a diagram with missing outputs are compiled again
+    with open(diagrams / "first.drawio", "a") as f:
+        f.write("\n")
+    with open(output_path / cli.MANIFEST_NAME) as f:
+        manifest = json.load(f)
+    second_path = str(diagrams / "nested" / "second.drawio")
+    for output in manifest["diagrams"][second_path]["outputs"]:
+        shutil.move(output, f"{output}.moved")
+
+    results, num_skipped, _, _ = compile_diagrams(diagrams, output_path)
+    assert num_skipped == 0
+    assert sorted(result["file_path"] for result in results) == [
+        str(diagrams / "first.drawio"),
+        second_path,
+    ]
+
+    results, num_skipped, _, _ = compile_diagrams(diagrams, output_path, force=True)
+    assert (len(results), num_skipped) == (2, 0)
+
+
+def test_requesting_snapshots_compiles_again(diagrams, tmp_path):
+    output_path = tmp_path / "out"
+    snapshot_path = tmp_path / "snapshots"
+    compile_diagrams(diagrams, output_path)
+
+    results, num_skipped, _, _ = compile_diagrams(
+        diagrams, output_path, snapshot_path=str(snapshot_path)
+    )
+    assert num_skipped == 0
+    snapshot_file_paths = sorted(snapshot_path.iterdir())
+    # both diagrams have the same content and share one snapshot
+    assert len(snapshot_file_paths) == 1
+    graphs = read_snapshot(snapshot_file_paths[0])
+    assert graphs["experiment_graph"].number_of_nodes() > 0
+
+    results, num_skipped, _, _ = compile_diagrams(
+        diagrams, output_path, snapshot_path=str(snapshot_path)
+    )
+    assert (results, num_skipped) == ([], 2)
+
+
+def test_shared_snapshots_are_kept_for_unchanged_diagrams(diagrams, tmp_path):
+    output_path = tmp_path / "out"
+    snapshot_path = tmp_path / "snapshots"
+    compile_diagrams(diagrams, output_path, snapshot_path=str(snapshot_path))
+    (shared_file_path,) = snapshot_path.iterdir()
+
+    with open(diagrams / "first.drawio", "a") as f:
+        f.write("\n")
+    results, num_skipped, _, _ = compile_diagrams(
+        diagrams, output_path, snapshot_path=str(snapshot_path)
+    )
+    assert [result["file_path"] for result in results] == [
+        str(diagrams / "first.drawio")
+    ]
+    assert num_skipped == 1
+    # the second diagram still refers to the snapshot of the old content
+    assert shared_file_path.exists()
+    assert len(list(snapshot_path.iterdir())) == 2
+
+    results, num_skipped, _, _ = compile_diagrams(
+        diagrams, output_path, snapshot_path=str(snapshot_path)
+    )
+    assert (results, num_skipped) == ([], 2)
+
+
+def test_manifests_of_other_versions_are_ignored(tmp_path):
+    manifest_path = tmp_path / cli.MANIFEST_NAME
+    manifest_path.write_text(json.dumps({"version": -1, "diagrams": {"a": {}}}))
+    assert cli.read_manifest(str(manifest_path)) == {}
+    manifest_path.write_text("{")
+    assert cli.read_manifest(str(manifest_path)) == {}
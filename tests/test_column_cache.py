@@ -0,0 +1,102 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from visto.visualizer.column_cache import ColumnCache
+
+
+def get_values(cache, source_path, indices):
+    return [
+        (name, list(np.asarray(values, dtype=object)))
+        for name, values in cache.get_columns(source_path, indices)
+    ]
+
+
+def get_expected(source_path, indices):
+    df = pd.read_csv(source_path)
+    return [
+        (str(df.columns[idx]), list(df.iloc[:, idx].astype(object))) for idx in indices
+    ]
+
+
+def count_calls(monkeypatch, name):
+    calls = []
+    method = getattr(ColumnCache, name)
+
+    def counted(self, *args):
+        calls.append(args)
+        return method(self, *args)
+
+    monkeypatch.setattr(ColumnCache, name, counted)
+    return calls
+
+
+def test_only_the_requested_columns_are_converted(tmp_path):
+    source_path = tmp_path / "source.csv"
+    source_path.write_text("t,x,label\n0,1.5,a\n1,2.5,b\n2,3.5,a\n")
+    cache = ColumnCache(str(tmp_path / "columns"))
+
+    assert cache.get_column_names(str(source_path)) == ["t", "x", "label"]
+    assert get_values(cache, source_path, [2]) == [("label", ["a", "b", "a"])]
+    (table_dir,) = os.listdir(tmp_path / "columns")
+    assert sorted(os.listdir(tmp_path / "columns" / table_dir)) == [
+        "2.bin",
+        "2.json",
+        "manifest.json",
+    ]
+    assert get_values(cache, source_path, [1, 0]) == get_expected(source_path, [1, 0])
+
+
+def test_appended_rows_are_added_to_the_converted_columns(tmp_path, monkeypatch):
+    source_path = tmp_path / "source.csv"
+    source_path.write_text("t,x,label\n0,1.5,a\n1,2.5,b\n")
+    cache = ColumnCache(str(tmp_path / "columns"))
+    assert get_values(cache, source_path, [0, 2]) == get_expected(source_path, [0, 2])
+
+    created = count_calls(monkeypatch, "_create")
+    converted = count_calls(monkeypatch, "_convert")
+    with open(source_path, "a") as f:
+        # the last row is still being written
+        f.write("2,3.5,c\n3,4.5,a\n4,5.")
+    assert get_values(cache, source_path, [0, 2]) == get_expected(source_path, [0, 2])
+    assert not created and not converted
+
+    with open(source_path, "a") as f:
+        f.write("5,b\n")
+    # the incomplete row was converted, so the file is converted again
+    assert get_values(cache, source_path, [2, 0]) == get_expected(source_path, [2, 0])
+    assert len(created) == 1
+
+    with open(source_path, "a") as f:
+        f.write("5,6.5,d\n")
+    # a new cache reads the columns written by the first one
+    other_cache = ColumnCache(str(tmp_path / "columns"))
+    assert get_values(other_cache, source_path, [2]) == get_expected(source_path, [2])
+    assert get_values(other_cache, source_path, [1]) == get_expected(source_path, [1])
+    assert len(created) == 1
+    assert len(converted) == 2
+
+
+def test_rewritten_files_are_converted_again(tmp_path):
+    source_path = tmp_path / "source.csv"
+    source_path.write_text("t,x\n0,1\n1,2\n")
+    cache = ColumnCache(str(tmp_path / "columns"))
+    assert get_values(cache, source_path, [1]) == [("x", [1.0, 2.0])]
+
+    source_path.write_text("t,y\n0,5\n1,6\n2,7\n")
+    assert get_values(cache, source_path, [1]) == [("y", [5.0, 6.0, 7.0])]
+
+    source_path.write_text("t,y\n0,5\n")
+    assert get_values(cache, source_path, [1]) == [("y", [5.0])]
+
+
+def test_rows_after_a_header_only_file_decide_the_kind(tmp_path):
+    source_path = tmp_path / "source.csv"
+    source_path.write_text("t,label\n")
+    cache = ColumnCache(str(tmp_path / "columns"))
+    assert get_values(cache, source_path, [1]) == [("label", [])]
+
+    with open(source_path, "a") as f:
+        f.write("0,a\n1,b\n")
+    assert get_values(cache, source_path, [1]) == [("label", ["a", "b"])]
@@ -0,0 +1,84 @@
+import os
+
+from visto.visualizer.graph_store import GraphStore
+
+
+def get_entry(num_nodes):
+    return {"linked_nodes": set(range(num_nodes))}
+
+
+def test_entries_are_written_on_put_and_shared_between_stores(tmp_path):
+    first = GraphStore(spill_dir=str(tmp_path))
+    first.put(get_entry(3), graph_id="a")
+    assert len(os.listdir(tmp_path)) == 1
+
+    # e.g. another app process or the app after a restart
+    second = GraphStore(spill_dir=str(tmp_path))
+    assert "a" in second
+    assert second.get("a") == get_entry(3)
+    # reading an entry keeps its file for the other processes
+    assert len(os.listdir(tmp_path)) == 1
+
+
+def test_evicted_entries_are_read_back(tmp_path):
+    evicted = []
+    store = GraphStore(max_entries=1, spill_dir=str(tmp_path))
+    store.add_evict_callback(evicted.append)
+    store.put(get_entry(1), graph_id="a")
+    store.put(get_entry(2), graph_id="b")
+
+    assert evicted == ["a"]
+    assert len(store) == 1
+    assert store.get("a") == get_entry(1)
+    assert evicted == ["a", "b"]
+
+
+def test_the_loader_is_asked_for_unknown_entries(tmp_path):
+    requested = []
+
+    def load(graph_id):
+        requested.append(graph_id)
+        return get_entry(4) if graph_id == "snapshot" else None
+
+    store = GraphStore(spill_dir=str(tmp_path))
+    store.set_loader(load)
+    assert store.get("snapshot") == get_entry(4)
+    assert store.get("snapshot") == get_entry(4)
+    assert store.get("expired") is None
+    assert store.get(None) is None
+    assert requested == ["snapshot", "expired"]
+    # loaded entries are written like any other
+    assert "snapshot" in GraphStore(spill_dir=str(tmp_path))
+
+
+def test_without_a_spill_dir_evicted_entries_are_gone():
+    store = GraphStore(max_entries=1)
+    store.put(get_entry(1), graph_id="a")
+    store.put(get_entry(2), graph_id="b")
+    assert store.get("a") is None
+    assert store.get("b") == get_entry(2)
+
+
+def test_only_the_most_recently_used_files_are_kept(tmp_path):
+    store = GraphStore(spill_dir=str(tmp_path), max_spilled=2)
+    for idx, graph_id in enumerate("abc"):
+        store.put(get_entry(idx), graph_id=graph_id)
+        # distinct modification times on coarse file systems
+        os.utime(store._get_spill_path(graph_id), ns=(idx, idx))
+
+    store.put(get_entry(3), graph_id="d")
+    assert sorted(os.listdir(tmp_path)) == sorted(
+        os.path.basename(store._get_spill_path(graph_id)) for graph_id in "cd"
+    )
+
+
+def test_discard_removes_the_file(tmp_path):
+    discarded = []
+    store = GraphStore(spill_dir=str(tmp_path))
+    store.add_evict_callback(discarded.append)
+    store.put(get_entry(1), graph_id="a")
+    store.discard("a")
+
+    assert discarded == ["a"]
+    assert "a" not in store
+    assert os.listdir(tmp_path) == []
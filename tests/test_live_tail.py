@@ -0,0 +1,45 @@
+from visto.visualizer import live_tail
+from visto.visualizer.live_tail import get_live_tail, start_live_tail, stop_live_tail
+
+
+def write_csv(path, rows):
+    with open(path, "a") as f:
+        f.writelines(f"{row},{row * 2}\n" for row in rows)
+
+
+def test_only_appended_rows_are_read(tmp_path):
+    source_path = tmp_path / "source.csv"
+    source_path.write_text("t,x\n")
+    write_csv(source_path, range(5))
+
+    tail_id, tail = start_live_tail(str(source_path), [0, 1], capacity=3)
+    tail.read()
+    assert list(tail.get_values(1)) == [4, 6, 8]
+
+    write_csv(source_path, range(5, 7))
+    new_values = tail.read()
+    assert list(new_values[0]) == [5, 6]
+    assert list(tail.get_values(1)) == [8, 10, 12]
+    assert tail.read() is None
+    stop_live_tail(tail_id)
+
+
+def test_stopped_and_idle_tails_are_dropped(tmp_path, monkeypatch):
+    source_path = tmp_path / "source.csv"
+    source_path.write_text("t,x\n")
+
+    stopped_id, _ = start_live_tail(str(source_path), [0])
+    stop_live_tail(stopped_id)
+    assert get_live_tail(stopped_id) is None
+
+    idle_id, _ = start_live_tail(str(source_path), [0])
+    read_id, read_tail = start_live_tail(str(source_path), [0])
+    monkeypatch.setattr(live_tail, "LIVE_TAIL_TTL", 0)
+    assert get_live_tail(idle_id) is None
+    assert get_live_tail(read_id) is None
+
+    monkeypatch.setattr(live_tail, "LIVE_TAIL_TTL", 60)
+    read_id, read_tail = start_live_tail(str(source_path), [0])
+    read_tail.read()
+    assert get_live_tail(read_id) is read_tail
+    stop_live_tail(read_id)
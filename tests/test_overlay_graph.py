@@ -0,0 +1,130 @@
+import networkx as nx
+import pytest
+
+from visto.connector.data_ref import DataRef
+from visto.connector.ontology import Ontology
+from visto.connector.overlay_graph import OverlayGraph, compose_into
+
+
+def get_base():
+    base = nx.DiGraph()
+    base.add_node("a", kind="class")
+    base.add_edge("a", "b", rel="rdf:type")
+    base.add_edge("b", "c", rel="pmd:characteristic")
+    base.add_edge("c", "d", rel="pmd:characteristic")
+    return base
+
+
+def assert_same_graph(overlay, graph):
+    assert sorted(overlay.nodes(data=True)) == sorted(graph.nodes(data=True))
+    assert sorted(overlay.edges(data=True)) == sorted(graph.edges(data=True))
+    materialized = overlay.materialize()
+    assert sorted(materialized.nodes(data=True)) == sorted(graph.nodes(data=True))
+    assert sorted(materialized.edges(data=True)) == sorted(graph.edges(data=True))
+
+
+def test_changes_never_reach_the_shared_base():
+    base = get_base()
+    expected = nx.DiGraph(base)
+    overlay = OverlayGraph(base)
+    overlay.relabel({"b": "b2"})
+    overlay.add_edge("d", "e", rel="pmd:relatesTo")
+    overlay.remove_nodes_from(["c"])
+    overlay.compose(nx.DiGraph([("x", "y")]))
+
+    assert sorted(base.nodes(data=True)) == sorted(expected.nodes(data=True))
+    assert sorted(base.edges(data=True)) == sorted(expected.edges(data=True))
+    # a second overlay of the same base starts from the unmodified graph
+    assert_same_graph(OverlayGraph(base), expected)
+
+
+def test_matches_the_materialized_graph_after_edits():
+    overlay = OverlayGraph(get_base())
+    graph = get_base()
+
+    assert overlay.relabel({"b": "b2"})
+    nx.relabel_nodes(graph, {"b": "b2"}, copy=False)
+    overlay.add_edge("b2", "e", rel="pmd:relatesTo")
+    graph.add_edge("b2", "e", rel="pmd:relatesTo")
+    overlay.remove_nodes_from(["c"])
+    graph.remove_nodes_from(["c"])
+
+    assert_same_graph(overlay, graph)
+    assert overlay.has_node("b2") and not overlay.has_node("b")
+    assert "c" not in overlay
+    assert overlay.successors("b2") == ["e"]
+
+
+def test_chained_renames_list_the_tail_first():
+    overlay = OverlayGraph(get_base())
+    graph = get_base()
+    mapping = {"c": "e", "b": "c", "a": "b"}
+
+    assert overlay.relabel(mapping)
+    nx.relabel_nodes(graph, mapping, copy=False)
+
+    assert_same_graph(overlay, graph)
+
+
+def test_renaming_back_restores_the_base_label():
+    overlay = OverlayGraph(get_base())
+    assert overlay.relabel({"b": "b2"})
+    assert overlay.relabel({"b2": "b"})
+
+    assert overlay.get_renames() == {}
+    assert_same_graph(overlay, get_base())
+
+
+def test_merging_renames_are_refused():
+    overlay = OverlayGraph(get_base())
+    # both would end up as a single node, the caller has to materialize
+    assert not overlay.relabel({"b": "c"})
+    assert not overlay.relabel({"a": "e", "b": "e"})
+    assert_same_graph(overlay, get_base())
+
+
+def test_delta_attributes_take_precedence():
+    overlay = OverlayGraph(get_base())
+    overlay.compose(nx.DiGraph([("a", "b", {"rel": "rdfs:subClassOf"})]))
+    graph = compose_into(
+        get_base(), nx.DiGraph([("a", "b", {"rel": "rdfs:subClassOf"})])
+    )
+
+    assert_same_graph(overlay, graph)
+    # the edge is listed once, with the attributes of the composed graph
+    assert [
+        attrs for parent, child, attrs in overlay.edges(data=True) if parent == "a"
+    ] == [{"rel": "rdfs:subClassOf"}]
+
+
+def test_traversals_follow_base_and_delta_edges():
+    overlay = OverlayGraph(get_base())
+    overlay.relabel({"c": "c2"})
+    overlay.add_edge("d", "e")
+    graph = nx.relabel_nodes(get_base(), {"c": "c2"})
+    graph.add_edge("d", "e")
+
+    assert overlay.descendants("a") == nx.descendants(graph, "a")
+    assert overlay.shortest_path("a", "e") == nx.shortest_path(graph, "a", "e")
+    with pytest.raises(nx.NetworkXNoPath):
+        overlay.shortest_path("e", "a")
+    with pytest.raises(nx.NodeNotFound):
+        overlay.shortest_path("a", "c")
+    with pytest.raises(nx.NetworkXError):
+        overlay.successors("c")
+
+
+def test_ontologies_of_one_template_do_not_share_changes():
+    template = DataRef().get_template("motor")
+    template_nodes = sorted(template.nodes())
+    template_edges = sorted(template.edges(data=True))
+
+    first = Ontology("m1 motor", "motor_", "motor")
+    second = Ontology("m2 motor", "motor_", "motor")
+    first.define("n*_", "3")
+
+    assert "3" in first.get_graph() and "n*_" not in first.get_graph()
+    assert "n*_" in second.get_graph() and "3" not in second.get_graph()
+    assert "m1 motor" not in second.get_graph()
+    assert sorted(template.nodes()) == template_nodes
+    assert sorted(template.edges(data=True)) == template_edges
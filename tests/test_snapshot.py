@@ -0,0 +1,133 @@
+import pickle
+import struct
+
+import networkx as nx
+import pytest
+
+from visto.visualizer.compact_graph import CompactGraph
+from visto.visualizer.snapshot import (
+    PREAMBLE,
+    SNAPSHOT_MAGIC,
+    SNAPSHOT_VERSION,
+    read_snapshot,
+    write_snapshot,
+)
+
+
+def get_graph():
+    graph = nx.DiGraph(name="experiment")
+    graph.add_node("~H0 hutch", type="pmdao:hutch", is_rank=False)
+    graph.add_node("pmd:Location", is_rank=True)
+    graph.add_node("H0M1 motor", resource="db-1", position=-1.5, axes=3)
+    graph.add_edge("pmd:Location", "~H0 hutch", rel="rdf:type", is_rank=True)
+    graph.add_edge("~H0 hutch", "H0M1 motor", rel="mds:place", is_rank=False)
+    graph.add_edge("H0M1 motor", "~H0 hutch", rel="pmd:relatesTo", weight=None)
+    graph.add_node("ümlaut ✓")
+    return graph
+
+
+def assert_same_graph(compact_graph, graph):
+    assert list(compact_graph.nodes(data=True)) == list(graph.nodes(data=True))
+    assert list(compact_graph.edges(data=True)) == list(graph.edges(data=True))
+
+
+@pytest.fixture
+def snapshot_path(tmp_path):
+    graph = get_graph()
+    file_path = tmp_path / "graphs.vsnap"
+    write_snapshot(
+        file_path,
+        {
+            "experiment_graph": CompactGraph.from_networkx(graph),
+            "var_only_graph": CompactGraph.from_networkx(
+                graph.subgraph(["~H0 hutch", "H0M1 motor"])
+            ),
+            "linked_nodes": {"H0M1 motor", "~H0 hutch"},
+            "term_ref": {"motor_": "H0M1 motor"},
+            "roots": ["~H0 hutch"],
+        },
+        metadata={"source": "test.drawio"},
+    )
+    return file_path
+
+
+def test_round_trip_keeps_graphs_and_values(snapshot_path):
+    graphs = read_snapshot(snapshot_path)
+    graph = get_graph()
+
+    assert_same_graph(graphs["experiment_graph"], graph)
+    assert graphs["experiment_graph"].graph == {"name": "experiment"}
+    assert_same_graph(
+        graphs["var_only_graph"], graph.subgraph(["~H0 hutch", "H0M1 motor"])
+    )
+    assert graphs["linked_nodes"] == {"H0M1 motor", "~H0 hutch"}
+    assert graphs["term_ref"] == {"motor_": "H0M1 motor"}
+    assert graphs["roots"] == ["~H0 hutch"]
+
+
+def test_read_graphs_answer_queries(snapshot_path):
+    experiment_graph = read_snapshot(snapshot_path)["experiment_graph"]
+    graph = get_graph()
+
+    assert experiment_graph.nodes["H0M1 motor"]["position"] == -1.5
+    assert experiment_graph.get_edge_data("H0M1 motor", "~H0 hutch") == {
+        "rel": "pmd:relatesTo",
+        "weight": None,
+    }
+    assert experiment_graph.descendants("pmd:Location") == nx.descendants(
+        graph, "pmd:Location"
+    )
+    assert list(experiment_graph.get_roots()) == [
+        node for node in graph if graph.in_degree(node) == 0
+    ]
+
+
+def test_read_graphs_detach_from_the_file(snapshot_path):
+    experiment_graph = read_snapshot(snapshot_path)["experiment_graph"]
+    copied = pickle.loads(pickle.dumps(experiment_graph))
+    snapshot_path.unlink()
+
+    assert_same_graph(copied, get_graph())
+    assert_same_graph(experiment_graph.to_networkx(), get_graph())
+
+
+def test_equal_entries_give_equal_files(tmp_path):
+    entries = {"linked_nodes": {"b", "a", "c"}}
+    write_snapshot(tmp_path / "first.vsnap", entries)
+    write_snapshot(tmp_path / "second.vsnap", {"linked_nodes": {"c", "a", "b"}})
+    assert (tmp_path / "first.vsnap").read_bytes() == (
+        tmp_path / "second.vsnap"
+    ).read_bytes()
+
+
+def test_other_files_are_rejected(snapshot_path, tmp_path):
+    other_path = tmp_path / "other.vsnap"
+    other_path.write_bytes(b"")
+    with pytest.raises(ValueError, match="not a snapshot"):
+        read_snapshot(other_path)
+
+    other_path.write_bytes(b"PK\x03\x04" + snapshot_path.read_bytes()[4:])
+    with pytest.raises(ValueError, match="not a snapshot"):
+        read_snapshot(other_path)
+
+
+def test_other_versions_are_rejected(snapshot_path):
+    data = bytearray(snapshot_path.read_bytes())
+    _, _, header_size = PREAMBLE.unpack_from(data)
+    PREAMBLE.pack_into(data, 0, SNAPSHOT_MAGIC, SNAPSHOT_VERSION + 1, header_size)
+    snapshot_path.write_bytes(bytes(data))
+    with pytest.raises(ValueError, match="snapshot version"):
+        read_snapshot(snapshot_path)
+
+
+def test_unsupported_values_are_refused(tmp_path):
+    graph = nx.DiGraph()
+    graph.add_node("a", position=(1, 2))
+    with pytest.raises(TypeError, match="tuple"):
+        write_snapshot(
+            tmp_path / "graphs.vsnap", {"graph": CompactGraph.from_networkx(graph)}
+        )
+    with pytest.raises(TypeError, match="int"):
+        write_snapshot(tmp_path / "graphs.vsnap", {"count": 3})
+    # nothing is left behind by a failed write
+    assert list(tmp_path.iterdir()) == []
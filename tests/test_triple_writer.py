@@ -0,0 +1,84 @@
+import csv
+
+import pytest
+
+from visto.visualizer.triple_writer import (
+    BackgroundTripleWriter,
+    CsvTripleWriter,
+    NTriplesTripleWriter,
+    TurtleTripleWriter,
+    get_triple_writer,
+)
+
+# rank edges go from the class to its subclasses and instances
+RELS = [
+    ("pmd:ValueObject", "pmd:Location", "rdfs:subClassOf", True),
+    ("mds:motor", "motor_", "rdf:type", True),
+    ("motor_", "pmd:Location", "pmd:characteristic", False),
+]
+
+
+def read_triples(file_path):
+    with open(file_path, encoding="utf-8") as f:
+        return [line.rstrip("\n") for line in f if line.strip()]
+
+
+def test_turtle_states_rank_edges_from_the_subclass(tmp_path):
+    file_path = tmp_path / "rels.ttl"
+    TurtleTripleWriter().write(file_path, RELS)
+    triples = read_triples(file_path)
+    assert "pmd:Location rdfs:subClassOf pmd:ValueObject ." in triples
+    assert "<urn:visto:motor_> rdf:type <urn:visto:mds/motor> ." in triples
+    assert "<urn:visto:motor_> pmd:characteristic pmd:Location ." in triples
+    assert "@prefix pmd: <https://w3id.org/pmd/co/> ." in triples
+
+
+def test_ntriples_states_rank_edges_from_the_subclass(tmp_path):
+    file_path = tmp_path / "rels.nt"
+    NTriplesTripleWriter().write(file_path, RELS)
+    assert read_triples(file_path) == [
+        "<https://w3id.org/pmd/co/Location> "
+        "<http://www.w3.org/2000/01/rdf-schema#subClassOf> "
+        "<https://w3id.org/pmd/co/ValueObject> .",
+        "<urn:visto:motor_> "
+        "<http://www.w3.org/1999/02/22-rdf-syntax-ns#type> "
+        "<urn:visto:mds/motor> .",
+        "<urn:visto:motor_> "
+        "<https://w3id.org/pmd/co/characteristic> "
+        "<https://w3id.org/pmd/co/Location> .",
+    ]
+
+
+def test_turtle_quotes_names_that_are_not_prefixed_names(tmp_path):
+    file_path = tmp_path / "rels.ttl"
+    TurtleTripleWriter().write(
+        file_path, [("~H0 hutch", "pmd:Some Thing", "pmd:relatesTo", False)]
+    )
+    assert (
+        "<urn:visto:~H0%20hutch> pmd:relatesTo <https://w3id.org/pmd/co/Some%20Thing> ."
+        in read_triples(file_path)
+    )
+
+
+def test_csv_keeps_the_edge_direction_and_rank_flag(tmp_path):
+    file_path = tmp_path / "rels.csv"
+    CsvTripleWriter().write(file_path, iter(RELS))
+    with open(file_path, newline="", encoding="utf-8") as f:
+        rows = list(csv.reader(f))
+    assert rows[0] == ["parent", "child", "rel", "is_rank"]
+    assert rows[1] == ["pmd:ValueObject", "pmd:Location", "rdfs:subClassOf", "True"]
+    assert len(rows) == len(RELS) + 1
+
+
+def test_background_writer_surfaces_errors_on_close(tmp_path):
+    writer = BackgroundTripleWriter(CsvTripleWriter())
+    writer.write(tmp_path / "missing" / "rels.csv", RELS)
+    with pytest.raises(OSError):
+        writer.close()
+
+
+def test_unknown_format_is_a_value_error():
+    with pytest.raises(ValueError, match="Unknown triple format") as info:
+        get_triple_writer("rdfxml")
+    assert info.value.__cause__ is None
+    assert info.value.__suppress_context__
@@ -0,0 +1,302 @@
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from glob import glob
+from os import path
+
+from visto.connector.ontology_registry import ontology_registry
+from visto.connector.template_cache import template_cache
+from visto.visualizer.build_graph import build_graph, get_build_key
+from visto.visualizer.display_graphs import freeze_display_graphs, get_display_graphs
+from visto.visualizer.snapshot import SNAPSHOT_EXTENSION, write_snapshot
+from visto.visualizer.triple_writer import TRIPLE_WRITERS
+from visto.visualizer.visualizer_ref import VisualizerRef
+
+MANIFEST_NAME = ".visto-manifest.json"
+MANIFEST_VERSION = 1
+
+
+def find_diagrams(inputs):
+    # expand files, folders (searched recursively) and glob patterns
+    file_paths = []
+    for input_path in inputs:
+        if path.isdir(input_path):
+            matches = glob(path.join(input_path, "**", "*.drawio"), recursive=True)
+        elif path.isfile(input_path):
+            matches = [input_path]
+        else:
+            matches = glob(input_path, recursive=True)
+        file_paths.extend(
+            path.abspath(match)
+            for match in sorted(matches)
+            if match.endswith(".drawio")
+        )
+    return list(dict.fromkeys(file_paths))
+
+
+def get_output_folders(file_paths, output_path):
+    # mirror the input layout below the output folder, one folder per diagram
+    if not file_paths:
+        return dict()
+    base_path = path.commonpath([path.dirname(file_path) for file_path in file_paths])
+    return {
+        file_path: path.join(
+            output_path, path.splitext(path.relpath(file_path, base_path))[0]
+        )
+        for file_path in file_paths
+    }
+
+
+def read_manifest(manifest_path):
+    try:
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return dict()
+    if manifest.get("version") != MANIFEST_VERSION:
+        return dict()
+    return manifest.get("diagrams", dict())
+
+
+def write_manifest(manifest_path, diagrams):
+    temp_path = f"{manifest_path}.{os.getpid()}.tmp"
+    with open(temp_path, "w") as f:
+        json.dump({"version": MANIFEST_VERSION, "diagrams": diagrams}, f, indent=2)
+    os.replace(temp_path, manifest_path)
+
+
+def is_unchanged(entry, build_key, triple_format, snapshot_file_path=None):
+    return (
+        entry is not None
+        and entry["build_key"] == build_key
+        and entry["format"] == triple_format
+        and (snapshot_file_path is None or snapshot_file_path in entry["outputs"])
+        and all(path.exists(output) for output in entry["outputs"])
+    )
+
+
+def remove_outputs(entry, keep=()):
+    # outputs of an earlier run may be named after roots that no longer exist
+    for output in entry["outputs"] if entry is not None else []:
+        if output in keep:
+            continue
+        try:
+            os.remove(output)
+        except OSError:
+            pass
+
+
+def _init_worker(template_cache_path, search_paths):
+    # workers share parsed templates through the on-disk template cache
+    template_cache.set_cache_dir(template_cache_path)
+    for search_path in search_paths:
+        ontology_registry.add_search_path(search_path)
+
+
+def compile_diagram(file_path, output_folder, triple_format, snapshot_file_path=None):
+    start = time.perf_counter()
+    os.makedirs(output_folder, exist_ok=True)
+    root_ontologies = build_graph(
+        file_path, triple_format=triple_format, output_path=output_folder
+    )
+    outputs = sorted(
+        output
+        for output in (
+            path.join(output_folder, file_name)
+            for file_name in os.listdir(output_folder)
+        )
+        if path.isfile(output)
+    )
+    num_relations = sum(
+        root_ontology.get_graph().number_of_edges()
+        for root_ontology in root_ontologies.values()
+    )
+    if snapshot_file_path is not None:
+        # the graphs as the app shows them, it opens the snapshot instead of
+        # building the diagram again
+        graphs = freeze_display_graphs(get_display_graphs(root_ontologies))
+        write_snapshot(snapshot_file_path, graphs, metadata={"source": file_path})
+        outputs.append(snapshot_file_path)
+    return {
+        "outputs": outputs,
+        "num_relations": num_relations,
+        "time": time.perf_counter() - start,
+    }
+
+
+def format_summary(results, num_skipped, wall_time, num_workers):
+    num_compiled = sum(1 for result in results if "error" not in result)
+    num_failed = len(results) - num_compiled
+    num_relations = sum(result.get("num_relations", 0) for result in results)
+    num_bytes = sum(result["size"] for result in results if "error" not in result)
+    build_time = sum(result.get("time", 0) for result in results)
+
+    lines = [
+        f"compiled {num_compiled}, skipped {num_skipped} unchanged, failed {num_failed}"
+        f" in {wall_time:.2f} s with {num_workers} workers",
+    ]
+    if num_compiled and wall_time > 0:
+        lines.append(
+            f"{num_compiled / wall_time:.2f} diagrams/s,"
+            f" {num_relations / wall_time:.0f} relations/s,"
+            f" {num_bytes / wall_time / 1e6:.2f} MB/s,"
+            f" {build_time / num_compiled:.2f} s per diagram"
+        )
+    return "\n".join(lines)
+
+
+def compile_diagrams(
+    inputs,
+    output_path,
+    triple_format,
+    num_workers=None,
+    force=False,
+    verbose=True,
+    snapshot_path=None,
+):
+    file_paths = find_diagrams(inputs)
+    output_folders = get_output_folders(file_paths, output_path)
+    os.makedirs(output_path, exist_ok=True)
+    if snapshot_path is not None:
+        os.makedirs(snapshot_path, exist_ok=True)
+    manifest_path = path.join(output_path, MANIFEST_NAME)
+    manifest = read_manifest(manifest_path)
+
+    start = time.perf_counter()
+    pending = []
+    # snapshots are named by content, diagrams with the same content share one
+    kept_outputs = set()
+    build_keys = dict()
+    snapshot_file_paths = dict()
+    for file_path in file_paths:
+        with open(file_path, "rb") as f:
+            build_keys[file_path] = get_build_key(f.read())
+        if snapshot_path is not None:
+            # named like the graph ids of the app
+            snapshot_file_paths[file_path] = path.join(
+                path.abspath(snapshot_path),
+                f"{build_keys[file_path]}{SNAPSHOT_EXTENSION}",
+            )
+        entry = manifest.get(file_path)
+        if not force and is_unchanged(
+            entry,
+            build_keys[file_path],
+            triple_format,
+            snapshot_file_paths.get(file_path),
+        ):
+            kept_outputs.update(entry["outputs"])
+            continue
+        pending.append(file_path)
+    for file_path in pending:
+        remove_outputs(manifest.get(file_path), keep=kept_outputs)
+    num_skipped = len(file_paths) - len(pending)
+
+    num_workers = num_workers or os.cpu_count() or 1
+    num_workers = max(min(num_workers, len(pending)), 1)
+    results = []
+    with ProcessPoolExecutor(
+        max_workers=num_workers,
+        initializer=_init_worker,
+        initargs=(
+            VisualizerRef().get_template_cache_path(),
+            ontology_registry.get_search_paths(),
+        ),
+    ) as executor:
+        futures = {
+            executor.submit(
+                compile_diagram,
+                file_path,
+                output_folders[file_path],
+                triple_format,
+                snapshot_file_paths.get(file_path),
+            ): file_path
+            for file_path in pending
+        }
+        try:
+            for future in as_completed(futures):
+                file_path = futures[future]
+                result = {"file_path": file_path, "size": path.getsize(file_path)}
+                try:
+                    result.update(future.result())
+                except Exception as e:
+                    # one broken diagram must not stop the batch
+                    result["error"] = f"{type(e).__name__}: {e}"
+                    manifest.pop(file_path, None)
+                else:
+                    manifest[file_path] = {
+                        "build_key": build_keys[file_path],
+                        "format": triple_format,
+                        "outputs": result["outputs"],
+                    }
+                results.append(result)
+
+                if verbose:
+                    status = (
+                        f"failed: {result['error']}"
+                        if "error" in result
+                        else f"{result['time']:.2f} s, {len(result['outputs'])} files"
+                    )
+                    print(f"[{len(results)}/{len(pending)}] {file_path} ({status})")
+        finally:
+            # keep the progress of an interrupted batch
+            write_manifest(manifest_path, manifest)
+
+    wall_time = time.perf_counter() - start
+    return results, num_skipped, wall_time, num_workers
+
+
+def main():
+    visualizer_ref = VisualizerRef()
+    parser = argparse.ArgumentParser(
+        description="Compile experiment diagrams to triples."
+    )
+    parser.add_argument(
+        "inputs", nargs="+", help="diagram files, folders or glob patterns"
+    )
+    parser.add_argument(
+        "-o",
+        "--output",
+        default=visualizer_ref.get_triple_output_path(),
+        help="output folder, one subfolder is created per diagram",
+    )
+    parser.add_argument(
+        "-f",
+        "--format",
+        choices=list(TRIPLE_WRITERS),
+        default=visualizer_ref.get_triple_format(),
+    )
+    parser.add_argument(
+        "-j", "--jobs", type=int, default=None, help="number of worker processes"
+    )
+    parser.add_argument(
+        "--force", action="store_true", help="also compile unchanged diagrams"
+    )
+    parser.add_argument(
+        "--snapshots",
+        default=visualizer_ref.get_snapshot_path(),
+        help="folder to write graph snapshots to, the app opens these instantly",
+    )
+    parser.add_argument("-q", "--quiet", action="store_true")
+    args = parser.parse_args()
+    for search_path in visualizer_ref.get_ontology_search_paths():
+        ontology_registry.add_search_path(search_path)
+
+    results, num_skipped, wall_time, num_workers = compile_diagrams(
+        args.inputs,
+        args.output,
+        args.format,
+        num_workers=args.jobs,
+        force=args.force,
+        verbose=not args.quiet,
+        snapshot_path=args.snapshots,
+    )
+    print(format_summary(results, num_skipped, wall_time, num_workers))
+    if any("error" in result for result in results):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
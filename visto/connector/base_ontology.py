@@ -1,10 +1,36 @@
 import networkx as nx
-import pandas as pd
 from bidict import bidict
-from cemento.draw_io.read_diagram import ReadDiagram
-from cemento.tree import Tree
 
 from visto.connector.data_ref import DataRef
+from visto.connector.overlay_graph import OverlayGraph, compose_into
+
+
+def order_substitutions(substitutions):
+    # order the renames so that applying them one after the other gives the same
+    # result as substituting all of them at once, i.e. rename chains such as
+    # {a: b, b: c} apply b -> c before a -> b
+    pending = {old: new for old, new in substitutions.items() if old != new}
+    ordered = []
+    done = set()
+    for start in pending:
+        chain = []
+        visiting = set()
+        node = start
+        while node in pending and node not in done:
+            if node in visiting:
+                cycle = chain[chain.index(node) :] + [node]
+                raise ValueError(
+                    f"Cannot apply cyclic substitutions: {' -> '.join(cycle)}"
+                )
+            visiting.add(node)
+            chain.append(node)
+            node = pending[node]
+
+        for node in reversed(chain):
+            ordered.append((node, pending[node]))
+            done.add(node)
+
+    return ordered
 
 
 class BaseOntology:
@@ -16,6 +42,7 @@ class BaseOntology:
         self._self_term = self_term
         self._term_ref = bidict()
         self._graph = None
+        self._overlay = None
         self._parent = None
         self.graph_vars = None
 
@@ -25,53 +52,64 @@ class BaseOntology:
         if base_ontology is not None:
             self.set_base_ontology(base_ontology)
 
-        # populate term reference with initial values
-        for graph_var in self.get_graph_vars():
+        # populate term reference with initial values, the variables of an
+        # unmodified template are known to the registry
+        if base_ontology is not None:
+            graph_vars = self.get_ref().get_graph_vars(base_ontology)
+        else:
+            graph_vars = self.get_graph_vars()
+        for graph_var in graph_vars:
             self._term_ref[graph_var] = graph_var
 
     def _define_graph(self):
-        base_ontology_path = self.get_ref().get_ontology_path(self.get_base_ontology())
-        ontology = ReadDiagram(base_ontology_path, inverted_rank_arrows=False)
-
-        rels_df = ontology.get_relationships()
-
-        # generate graph from edge table
-        graph = nx.DiGraph()
-        for _, row in rels_df.iterrows():
-            parent, child, rel, is_rank = (
-                row["parent"],
-                row["child"],
-                row["rel"],
-                row["is_rank"],
-            )
-            graph.add_edge(parent, child, rel=rel, is_rank=is_rank)
-
-        # determine rank type for each node
-        node_is_rank = {node: (":" in node) for node in graph.nodes()}
-        nx.set_node_attributes(graph, node_is_rank, "is_rank")
-
-        # determine node type from root
-        term_type = dict()
-        ranked_edges = [edge for edge in graph.edges(data=True) if edge[2]["is_rank"]]
-        ranked_graph = nx.DiGraph(ranked_edges)
-        tree = Tree(graph=ranked_graph)
-        for _, subtree in enumerate(tree.get_subgraphs()):
-            subgraph = subtree.get_graph()
-            root = next(nx.topological_sort(subgraph))
-            for node in subgraph.nodes():
-                term_type[node] = root
-        nx.set_node_attributes(graph, term_type, "type")
-
-        self.set_graph(graph)
+        template = self.get_ref().get_template(self.get_base_ontology())
+        # reference the shared template and only record changes on top of it
+        self._graph = None
+        self._overlay = OverlayGraph(template)
+
+    def _get_graph_view(self):
+        if self._overlay is not None:
+            return self._overlay
+        return self._graph
 
     def _replace_node(self, node, replacement, ignore_ref=False):
-        if node == replacement:
+        self._replace_nodes({node: replacement}, ignore_ref=ignore_ref)
+
+    def _replace_nodes(self, substitutions, ignore_ref=False):
+        substitutions = order_substitutions(substitutions)
+        if not substitutions:
             return
 
-        nx.relabel_nodes(self.get_graph(), {node: replacement}, copy=False)
+        # apply the whole mapping at once instead of relabeling node by node
+        mapping = dict(substitutions)
+        overlay = self._overlay
+        if overlay is None or not overlay.relabel(mapping):
+            nx.relabel_nodes(self.get_graph(), mapping, copy=False)
 
         if not ignore_ref:
-            self.set_term(node, replacement)
+            self._term_ref.update(substitutions)
+
+    def _compose_graph(self, graph):
+        if self._overlay is not None:
+            self._overlay.compose(graph)
+            return
+
+        compose_into(self.get_graph(), graph)
+
+    def compose(self, other):
+        # merge the graph of another ontology into this one in place, the
+        # accumulated graph is never copied and the other graph is read as is
+        compose_into(self.get_graph(), other._get_graph_view())
+
+    def _descendants(self, node):
+        if self._overlay is not None:
+            return self._overlay.descendants(node)
+        return nx.descendants(self.get_graph(), node)
+
+    def _shortest_path(self, source, target):
+        if self._overlay is not None:
+            return self._overlay.shortest_path(source, target)
+        return nx.shortest_path(self.get_graph(), source, target)
 
     def get_name(self):
         return self._name
@@ -80,10 +118,18 @@ class BaseOntology:
         return self._base_ontology
 
     def get_graph(self):
+        # materialize a private graph on first access (copy-on-write)
+        if self._overlay is not None:
+            self._graph = self._overlay.materialize()
+            self._overlay = None
         return self._graph
 
     def set_graph(self, graph):
         self._graph = graph
+        self._overlay = None
+
+    def is_materialized(self):
+        return self._overlay is None
 
     def get_parent(self):
         return self._parent
@@ -117,23 +163,22 @@ class BaseOntology:
         return self._term_ref.inverse[value]
 
     def get_nodes(self, include_rank=True):
+        graph = self._get_graph_view()
         if not include_rank:
-            return [node for node in self.get_graph().nodes() if ":" not in node]
-        return self.get_graph().nodes()
+            return [node for node in graph.nodes() if ":" not in node]
+        return graph.nodes()
 
     def set_base_ontology(self, base_ontology):
         self._define_graph()
 
+    def iter_rels(self):
+        # stream the relationships without building an intermediate table
+        for parent, child, data in self._get_graph_view().edges(data=True):
+            yield parent, child, data["rel"], data["is_rank"]
+
     def get_rels(self):
-        entries = []
-        for edge in self.get_graph().edges(data=True):
-            parent, child, data = edge
-            entries.append(
-                {
-                    "parent": parent,
-                    "child": child,
-                    "rel": data["rel"],
-                    "is_rank": data["is_rank"],
-                }
-            )
-        return pd.DataFrame(entries)
+        import pandas as pd
+
+        return pd.DataFrame(
+            list(self.iter_rels()), columns=["parent", "child", "rel", "is_rank"]
+        )
@@ -1,30 +1,32 @@
-import os
-from os import path
-from pathlib import Path
+from visto.connector.ontology_registry import ontology_registry
 
 
 class DataRef:
+    # view on the process-wide ontology registry, the template folders are
+    # scanned once per process instead of once per instance
 
-    def __init__(self):
-        self._ontology_paths = None
+    def __init__(self, registry=None):
+        self._registry = ontology_registry if registry is None else registry
 
-        current_file_folder = Path(__file__)
-        # retrieve the ontology path from the grandparent folder
-        self._ontology_folder_path = current_file_folder.parent.parent / "ontologies"
-        self._set_ontology_paths()
+    def get_ontology_path(self, name):
+        return self._registry.get_path(name)
 
-    def _set_ontology_paths(self):
-        ontology_paths = dict()
-        for root, _, files in os.walk(self._get_ontology_folder_path()):
-            for file in files:
-                file_name = file.split(".")[0]
-                file_path = path.join(root, file)
-                ontology_paths[file_name] = file_path
+    def get_ontology_versions(self):
+        # identify the current state of every template file
+        return self._registry.get_versions()
 
-        self._ontology_paths = ontology_paths
+    def get_template(self, name):
+        return self._registry.get_template(name)
 
-    def get_ontology_path(self, name):
-        return self._ontology_paths[name]
+    def get_graph_vars(self, name):
+        return self._registry.get_graph_vars(name)
+
+    def get_registry(self):
+        return self._registry
 
-    def _get_ontology_folder_path(self):
-        return self._ontology_folder_path
+    def __reduce__(self):
+        # ontologies are pickled for worker processes, keep referring to the
+        # registry of the receiving process
+        if self._registry is ontology_registry:
+            return DataRef, ()
+        return DataRef, (self._registry,)
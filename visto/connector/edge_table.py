@@ -0,0 +1,60 @@
+import networkx as nx
+
+
+def _get_column(rels_df, values):
+    # accept a column name, a function of the table or values aligned with the rows
+    if isinstance(values, str):
+        return rels_df[values].tolist()
+    if callable(values):
+        values = values(rels_df)
+    if hasattr(values, "tolist"):
+        return values.tolist()
+    return list(values)
+
+
+def add_relationships(
+    graph,
+    rels_df,
+    source="parent",
+    target="child",
+    edge_attrs=None,
+    node_attrs=None,
+):
+    if rels_df.empty:
+        return graph
+
+    sources = rels_df[source].tolist()
+    targets = rels_df[target].tolist()
+
+    if node_attrs:
+        # interleave parent and child entries to keep the row-wise insertion order
+        node_entries = dict()
+        node_columns = {
+            attr: (
+                _get_column(rels_df, source_values),
+                _get_column(rels_df, target_values),
+            )
+            for attr, (source_values, target_values) in node_attrs.items()
+        }
+        for idx, (parent, child) in enumerate(zip(sources, targets)):
+            parent_attrs = node_entries.setdefault(parent, dict())
+            for attr, (source_values, _) in node_columns.items():
+                parent_attrs[attr] = source_values[idx]
+            child_attrs = node_entries.setdefault(child, dict())
+            for attr, (_, target_values) in node_columns.items():
+                child_attrs[attr] = target_values[idx]
+        graph.add_nodes_from(node_entries.items())
+
+    if edge_attrs:
+        attr_names = list(edge_attrs.keys())
+        attr_columns = [_get_column(rels_df, edge_attrs[attr]) for attr in attr_names]
+        edge_data = (dict(zip(attr_names, values)) for values in zip(*attr_columns))
+        graph.add_edges_from(zip(sources, targets, edge_data))
+    else:
+        graph.add_edges_from(zip(sources, targets))
+
+    return graph
+
+
+def graph_from_relationships(rels_df, **kwargs):
+    return add_relationships(nx.DiGraph(), rels_df, **kwargs)
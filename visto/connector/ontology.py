@@ -32,14 +32,12 @@ class Ontology(BaseOntology):
         self._replace_node(curr_self_term, self.get_name())
 
     def graph_map(self, substitutions, ignore_ref=False):
-        for key, value in substitutions.items():
-            self._replace_node(key, value, ignore_ref=ignore_ref)
+        self._replace_nodes(substitutions, ignore_ref=ignore_ref)
 
     def _self_term_map(self):
         substitutions = dict()
-        graph = self.get_graph()
         self_name = self.get_name()
-        for node in nx.descendants(graph, self_name):
+        for node in self._descendants(self_name):
             if node.endswith("_") and "*" not in node:
                 substitutions[node] = f"{self_name} {node[:-1]}"
         self.graph_map(substitutions)
@@ -59,7 +57,7 @@ class Ontology(BaseOntology):
         if variable is None:
             characteristics = {
                 child
-                for parent, child, data in self.get_graph().edges(data=True)
+                for parent, child, data in self._get_graph_view().edges(data=True)
                 if data["rel"] == "pmd:characteristic"
             }
             if len(characteristics) != 1:
@@ -78,10 +76,10 @@ class Ontology(BaseOntology):
             )
 
         variable = self.get_term(variable)
-        self.set_graph(nx.compose(self.get_graph(), link_ontology.get_graph().copy()))
+        self._compose_graph(link_ontology.get_graph())
         # TODO: replace with less fixed solution, i.e. get rid of the string hardcodes
         db_identifier = "db_identifier_"
-        self.get_graph().add_edge(
+        self._get_graph_view().add_edge(
             variable, db_identifier, rel="pmd:resource", is_rank=False
         )
         self._replace_node(db_identifier, str(uid), ignore_ref=True)
@@ -91,14 +89,11 @@ class Ontology(BaseOntology):
         child_onto.set_parent(self)
         # add child
         self.add_child(child_onto)
-        # get relevant graphs
-        parent_graph = self.get_graph()
-        child_graph = child_onto.get_graph()
         # find the connecting path to the child
         parent_term = self.get_self_term()
         child_term = child_onto.get_term(child_onto.get_self_term())
         # keep the path nodes
-        path = nx.shortest_path(child_graph, parent_term, child_term)
+        path = child_onto._shortest_path(parent_term, child_term)
         keep_nodes = set([child_onto.get_term_key(node) for node in path])
         # set the second to the last term (i.e. ancestor of child term) as the connector
         self.set_child_connector(path[-2])
@@ -116,11 +111,12 @@ class Ontology(BaseOntology):
         if self.is_component():
             child_onto._parent_map()
 
-        self.set_graph(nx.compose(parent_graph, child_graph))
+        # the parent keeps a full graph that the child is merged into in place
+        self.compose(child_onto)
 
     # TODO: impermanent solution. Please replace with modular ontology-driven OOP later
     def adopt(self, ref, model):
-        ref_graph = ref.get_graph().copy()
+        ref_graph = ref.get_graph()
         # save the model node and its descendants
         keep_nodes = {model}
         keep_nodes |= set(nx.descendants(ref_graph, model))
@@ -135,16 +131,14 @@ class Ontology(BaseOntology):
         for node in keep_nodes:
             extra_nodes |= set(nx.ancestors(rank_graph, node))
         keep_nodes |= extra_nodes
-        # remove nodes that are not marked to keep
-        ref_graph.remove_nodes_from(
-            [node for node in ref_graph.nodes() if node not in keep_nodes]
-        )
+        # only copy the nodes marked to keep instead of the whole reference graph
+        ref_graph = ref_graph.subgraph(keep_nodes).copy()
         # relabel node model to current node name and combine graphs
         nx.relabel_nodes(ref_graph, {model: self.get_name()}, copy=False)
-        self.set_graph(nx.compose(self.get_graph(), ref_graph))
+        self._compose_graph(ref_graph)
         # remove the template placeholder variables from the original graph
 
-        self.get_graph().remove_nodes_from(
+        self._get_graph_view().remove_nodes_from(
             [node for node in self.get_nodes() if "*" in node]
         )
         # rename the added variables using the newly connected current term
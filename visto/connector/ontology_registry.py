@@ -0,0 +1,166 @@
+import os
+import time
+from os import path
+from pathlib import Path
+from threading import Lock
+
+from visto.connector.template_cache import template_cache
+
+TEMPLATE_EXTENSION = ".drawio"
+# seconds between checks of the scanned folders for added or removed templates
+CHECK_INTERVAL = 2.0
+
+
+class DuplicateTemplateError(KeyError):
+    pass
+
+
+def get_default_search_path():
+    # the templates shipped with the package
+    return str(Path(__file__).parent.parent / "ontologies")
+
+
+class OntologyRegistry:
+    # indexes the templates of every search path by name. the folders are only
+    # scanned on the first lookup and again once one of them changed, i.e. a
+    # template was added, removed or renamed. a name found in more than one
+    # file is ambiguous and cannot be looked up until one of them is removed
+
+    def __init__(self, search_paths=None):
+        if search_paths is None:
+            search_paths = [get_default_search_path()]
+        self._search_paths = [path.abspath(search_path) for search_path in search_paths]
+        self._paths = None
+        self._duplicates = None
+        self._folder_versions = None
+        self._last_check = 0.0
+        self._metadata = dict()
+        self._lock = Lock()
+
+    def _scan(self):
+        paths = dict()
+        duplicates = dict()
+        folder_versions = dict()
+        for search_path in self._search_paths:
+            for root, _, files in os.walk(search_path):
+                folder_versions[root] = os.stat(root).st_mtime_ns
+                for file in sorted(files):
+                    if not file.endswith(TEMPLATE_EXTENSION):
+                        continue
+                    file_name = file.split(".")[0]
+                    file_path = path.join(root, file)
+                    if file_name in paths:
+                        duplicates.setdefault(file_name, [paths[file_name]])
+                        duplicates[file_name].append(file_path)
+                    else:
+                        paths[file_name] = file_path
+            if not path.isdir(search_path):
+                # pick up the folder once it is created
+                folder_versions[search_path] = None
+
+        self._paths = paths
+        self._duplicates = duplicates
+        self._folder_versions = folder_versions
+        self._last_check = time.monotonic()
+
+    def _is_stale(self):
+        for folder_path, version in self._folder_versions.items():
+            try:
+                if os.stat(folder_path).st_mtime_ns != version:
+                    return True
+            except OSError:
+                if version is not None:
+                    return True
+        return False
+
+    def _get_index(self):
+        with self._lock:
+            if self._paths is None:
+                self._scan()
+            elif time.monotonic() - self._last_check > CHECK_INTERVAL:
+                if self._is_stale():
+                    self._scan()
+                    self._metadata.clear()
+                else:
+                    self._last_check = time.monotonic()
+            return self._paths, self._duplicates
+
+    def get_path(self, name):
+        paths, duplicates = self._get_index()
+        if name in duplicates:
+            raise DuplicateTemplateError(
+                f"The template {name} is defined more than once: {', '.join(duplicates[name])}."
+            )
+        try:
+            return paths[name]
+        except KeyError:
+            raise KeyError(
+                f"Unknown template {name}. Please add {name}{TEMPLATE_EXTENSION} to one of {', '.join(self._search_paths)}."
+            ) from None
+
+    def get_names(self):
+        paths, duplicates = self._get_index()
+        return sorted(name for name in paths if name not in duplicates)
+
+    def get_duplicates(self):
+        _, duplicates = self._get_index()
+        return {name: list(file_paths) for name, file_paths in duplicates.items()}
+
+    def get_versions(self):
+        # identify the current state of every template file
+        paths, _ = self._get_index()
+        versions = []
+        for name, file_path in sorted(paths.items()):
+            stat = os.stat(file_path)
+            versions.append((name, stat.st_mtime_ns, stat.st_size))
+        return versions
+
+    def get_template(self, name):
+        return template_cache.get_template(name, self.get_path(name))
+
+    def get_metadata(self, name):
+        # derived once per parsed template, the template cache decides when a
+        # template file has to be parsed again
+        template = self.get_template(name)
+        with self._lock:
+            entry = self._metadata.get(name)
+            if entry is not None and entry[0] is template:
+                return entry[1]
+
+        graph_vars = frozenset(node for node in template.nodes() if node.endswith("_"))
+        metadata = {"path": self.get_path(name), "graph_vars": graph_vars}
+        with self._lock:
+            self._metadata[name] = (template, metadata)
+        return metadata
+
+    def get_graph_vars(self, name):
+        return self.get_metadata(name)["graph_vars"]
+
+    def add_search_path(self, search_path):
+        search_path = path.abspath(search_path)
+        with self._lock:
+            if search_path in self._search_paths:
+                return
+            self._search_paths.append(search_path)
+            self._paths = None
+            self._metadata.clear()
+
+    def get_search_paths(self):
+        with self._lock:
+            return list(self._search_paths)
+
+    def invalidate(self):
+        with self._lock:
+            self._paths = None
+            self._metadata.clear()
+
+    def __getstate__(self):
+        # only the search paths travel, the index is rebuilt on first use
+        return {"search_paths": self.get_search_paths()}
+
+    def __setstate__(self, state):
+        self.__init__(state["search_paths"])
+
+
+# process-wide registry shared by every ontology instance
+ontology_registry = OntologyRegistry()
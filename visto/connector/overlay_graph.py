@@ -0,0 +1,220 @@
+from collections import deque
+
+import networkx as nx
+
+
+def compose_into(graph, other):
+    # same result as nx.compose(graph, other) without copying graph, attributes
+    # of other take precedence. other may be a networkx graph or an overlay
+    graph.add_nodes_from(other.nodes(data=True))
+    graph.add_edges_from(other.edges(data=True))
+    return graph
+
+
+class OverlayGraph:
+
+    def __init__(self, base):
+        # the base graph is shared between instances and must never be modified
+        self._base = base
+        # base node -> current label, only for renamed nodes
+        self._labels = dict()
+        # current label -> base node, only for renamed nodes
+        self._origins = dict()
+        self._removed = set()
+        # nodes and edges added on top of the base graph, keyed by current labels
+        self._delta = nx.DiGraph()
+
+    def _get_base_node(self, label):
+        base_node = self._origins.get(label)
+        if base_node is not None:
+            return base_node
+        if (
+            label in self._base
+            and label not in self._labels
+            and label not in self._removed
+        ):
+            return label
+        return None
+
+    def _get_label(self, base_node):
+        return self._labels.get(base_node, base_node)
+
+    def get_base(self):
+        return self._base
+
+    def get_renames(self):
+        return dict(self._labels)
+
+    def get_removed(self):
+        return set(self._removed)
+
+    def get_delta(self):
+        return self._delta
+
+    def has_node(self, label):
+        return self._get_base_node(label) is not None or label in self._delta
+
+    def __contains__(self, label):
+        return self.has_node(label)
+
+    def __iter__(self):
+        return iter(self.nodes())
+
+    def nodes(self, data=False):
+        delta = self._delta
+        entries = []
+        for base_node, attrs in self._base.nodes(data=True):
+            if base_node in self._removed:
+                continue
+            label = self._get_label(base_node)
+            if data:
+                if label in delta:
+                    attrs = {**attrs, **delta.nodes[label]}
+                entries.append((label, attrs))
+            else:
+                entries.append(label)
+
+        for label, attrs in delta.nodes(data=True):
+            if self._get_base_node(label) is not None:
+                continue
+            entries.append((label, attrs) if data else label)
+
+        return entries
+
+    def edges(self, data=False):
+        delta = self._delta
+        entries = []
+        for parent, child, attrs in self._base.edges(data=True):
+            if parent in self._removed or child in self._removed:
+                continue
+            parent, child = self._get_label(parent), self._get_label(child)
+            if data:
+                if delta.has_edge(parent, child):
+                    attrs = {**attrs, **delta[parent][child]}
+                entries.append((parent, child, attrs))
+            else:
+                entries.append((parent, child))
+
+        for parent, child, attrs in delta.edges(data=True):
+            base_parent = self._get_base_node(parent)
+            base_child = self._get_base_node(child)
+            if (
+                base_parent is not None
+                and base_child is not None
+                and self._base.has_edge(base_parent, base_child)
+            ):
+                continue
+            entries.append((parent, child, attrs) if data else (parent, child))
+
+        return entries
+
+    def successors(self, label):
+        base_node = self._get_base_node(label)
+        if base_node is None and label not in self._delta:
+            raise nx.NetworkXError(f"The node {label} is not in the graph.")
+
+        successors = dict()
+        if base_node is not None:
+            for child in self._base.successors(base_node):
+                if child not in self._removed:
+                    successors[self._get_label(child)] = True
+        if label in self._delta:
+            for child in self._delta.successors(label):
+                successors[child] = True
+        return list(successors)
+
+    def descendants(self, label):
+        if not self.has_node(label):
+            raise nx.NetworkXError(f"The node {label} is not in the graph.")
+
+        seen = {label}
+        queue = deque([label])
+        while queue:
+            for child in self.successors(queue.popleft()):
+                if child not in seen:
+                    seen.add(child)
+                    queue.append(child)
+        seen.discard(label)
+        return seen
+
+    def shortest_path(self, source, target):
+        if not self.has_node(source):
+            raise nx.NodeNotFound(f"Source {source} is not in G")
+        if not self.has_node(target):
+            raise nx.NodeNotFound(f"Target {target} is not in G")
+
+        # unweighted breadth-first search from the source
+        previous = {source: None}
+        queue = deque([source])
+        while queue:
+            node = queue.popleft()
+            if node == target:
+                path = []
+                while node is not None:
+                    path.append(node)
+                    node = previous[node]
+                return path[::-1]
+            for child in self.successors(node):
+                if child not in previous:
+                    previous[child] = node
+                    queue.append(child)
+
+        raise nx.NetworkXNoPath(f"No path between {source} and {target}.")
+
+    def relabel(self, mapping):
+        # the mapping is applied in order, so chained renames have to list the
+        # tail of the chain first (see order_substitutions). renames are only
+        # kept as an overlay when they do not merge nodes, otherwise the caller
+        # has to fall back to a materialized graph
+        targets = set()
+        for old, new in mapping.items():
+            if old == new or not self.has_node(old):
+                continue
+            if new in targets or (self.has_node(new) and new not in mapping):
+                return False
+            targets.add(new)
+
+        delta_mapping = dict()
+        for old, new in mapping.items():
+            if old == new:
+                continue
+
+            base_node = self._get_base_node(old)
+            if base_node is not None:
+                if self._origins.get(old) == base_node:
+                    del self._origins[old]
+                if new == base_node:
+                    self._labels.pop(base_node, None)
+                else:
+                    self._labels[base_node] = new
+                    self._origins[new] = base_node
+
+            if old in self._delta:
+                delta_mapping[old] = new
+
+        if delta_mapping:
+            nx.relabel_nodes(self._delta, delta_mapping, copy=False)
+
+        return True
+
+    def add_edge(self, parent, child, **attrs):
+        self._delta.add_edge(parent, child, **attrs)
+
+    def compose(self, graph):
+        compose_into(self._delta, graph)
+
+    def remove_nodes_from(self, labels):
+        for label in list(labels):
+            base_node = self._get_base_node(label)
+            if base_node is not None:
+                self._removed.add(base_node)
+                self._labels.pop(base_node, None)
+                self._origins.pop(label, None)
+            if label in self._delta:
+                self._delta.remove_node(label)
+
+    def materialize(self):
+        graph = nx.DiGraph()
+        graph.add_nodes_from(self.nodes(data=True))
+        graph.add_edges_from(self.edges(data=True))
+        return graph
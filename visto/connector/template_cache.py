@@ -0,0 +1,188 @@
+import os
+import pickle
+from hashlib import sha1
+from os import path
+from threading import Lock
+
+import networkx as nx
+
+from visto.connector.edge_table import graph_from_relationships
+
+# bump whenever the layout of the cached template graphs changes
+TEMPLATE_CACHE_VERSION = 2
+
+
+def read_template_graph(file_path):
+    # cemento pulls in pandas, cached templates are loaded without it
+    from cemento.draw_io.read_diagram import ReadDiagram
+
+    ontology = ReadDiagram(file_path, inverted_rank_arrows=False)
+
+    rels_df = ontology.get_relationships()
+    # relationships come out of cemento in set order, sort them so that the
+    # node order and the derived rank types are the same on every parse
+    if not rels_df.empty:
+        rels_df = rels_df.sort_values("rel_id", kind="stable", ignore_index=True)
+
+    # generate graph from edge table
+    graph = graph_from_relationships(
+        rels_df, edge_attrs={"rel": "rel", "is_rank": "is_rank"}
+    )
+
+    # determine rank type for each node
+    node_is_rank = {node: (":" in node) for node in graph.nodes()}
+    nx.set_node_attributes(graph, node_is_rank, "is_rank")
+
+    # determine node type from root
+    term_type = dict()
+    ranked_edges = [edge for edge in graph.edges(data=True) if edge[2]["is_rank"]]
+    ranked_graph = nx.DiGraph(ranked_edges)
+    for component in nx.weakly_connected_components(ranked_graph):
+        # components are sets, keep the graph order so the chosen root is stable
+        subgraph = nx.DiGraph()
+        subgraph.add_nodes_from(node for node in ranked_graph if node in component)
+        subgraph.add_edges_from(
+            edge for edge in ranked_graph.edges() if edge[0] in component
+        )
+        root = next(nx.topological_sort(subgraph))
+        for node in subgraph.nodes():
+            term_type[node] = root
+    nx.set_node_attributes(graph, term_type, "type")
+
+    return graph
+
+
+class TemplateCache:
+
+    def __init__(self, cache_dir=None):
+        self._templates = dict()
+        self._cache_dir = None
+        self._lock = Lock()
+        self._hits = 0
+        self._misses = 0
+        self._disk_hits = 0
+
+        if cache_dir is not None:
+            self.set_cache_dir(cache_dir)
+
+    def _get_key(self, name, file_path):
+        file_path = path.abspath(file_path)
+        return name, file_path, os.stat(file_path).st_mtime_ns
+
+    def _get_disk_path(self, key):
+        name, file_path, mtime = key
+        digest = sha1(
+            f"{TEMPLATE_CACHE_VERSION}|{file_path}|{mtime}".encode()
+        ).hexdigest()
+        return path.join(self.get_cache_dir(), f"{name}-{digest[:16]}.pickle")
+
+    def _read_disk(self, key):
+        if self.get_cache_dir() is None:
+            return None
+
+        disk_path = self._get_disk_path(key)
+        if not path.exists(disk_path):
+            return None
+
+        try:
+            with open(disk_path, "rb") as f:
+                return pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            # treat unreadable entries as misses, they are rewritten on parse
+            return None
+
+    def _write_disk(self, key, graph):
+        if self.get_cache_dir() is None:
+            return
+
+        disk_path = self._get_disk_path(key)
+        temp_path = f"{disk_path}.{os.getpid()}.tmp"
+        try:
+            with open(temp_path, "wb") as f:
+                pickle.dump(graph, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_path, disk_path)
+        except OSError:
+            # the disk tier is best-effort, the memory tier still holds the graph
+            if path.exists(temp_path):
+                os.remove(temp_path)
+
+    def get_template(self, name, file_path):
+        key = self._get_key(name, file_path)
+
+        with self._lock:
+            graph = self._templates.get(key)
+            if graph is not None:
+                self._hits += 1
+                return graph
+            self._misses += 1
+
+        graph = self._read_disk(key)
+        if graph is None:
+            graph = read_template_graph(file_path)
+            self._write_disk(key, graph)
+        else:
+            with self._lock:
+                self._disk_hits += 1
+        # templates are shared between instances, guard them against edits
+        nx.freeze(graph)
+
+        with self._lock:
+            # drop entries made stale by an edited template file
+            for stale_key in [
+                curr_key
+                for curr_key in self._templates
+                if curr_key[:2] == key[:2] and curr_key != key
+            ]:
+                del self._templates[stale_key]
+            self._templates[key] = graph
+
+        return graph
+
+    def invalidate(self, name=None):
+        with self._lock:
+            keys = [key for key in self._templates if name is None or key[0] == name]
+            for key in keys:
+                del self._templates[key]
+
+        cache_dir = self.get_cache_dir()
+        if cache_dir is None or not path.isdir(cache_dir):
+            return
+
+        for file in os.listdir(cache_dir):
+            if not file.endswith(".pickle"):
+                continue
+            if name is None or file.rsplit("-", 1)[0] == name:
+                try:
+                    os.remove(path.join(cache_dir, file))
+                except OSError:
+                    pass
+
+    def get_cache_dir(self):
+        return self._cache_dir
+
+    def set_cache_dir(self, cache_dir):
+        if cache_dir:
+            try:
+                os.makedirs(cache_dir, exist_ok=True)
+            except OSError:
+                cache_dir = None
+        self._cache_dir = cache_dir or None
+
+    def get_stats(self):
+        with self._lock:
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "disk_hits": self._disk_hits,
+                "size": len(self._templates),
+            }
+
+    def reset_stats(self):
+        with self._lock:
+            self._hits = 0
+            self._misses = 0
+            self._disk_hits = 0
+
+
+# process-wide cache shared by every ontology instance
+template_cache = TemplateCache()
@@ -1,48 +1,101 @@
+import io
 import re
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache
+from hashlib import sha256
+from itertools import repeat
 from os import path
+from time import perf_counter
 from uuid import uuid4
 
-import matplotlib.pyplot as plt
 import networkx as nx
-from bs4 import BeautifulSoup as bs
-from cemento.draw_io.read_area_diagram import ReadAreaDiagram
 from networkx.exception import NodeNotFound
 
+from visto.connector.data_ref import DataRef
+from visto.connector.edge_table import graph_from_relationships
 from visto.connector.ontology import Ontology
 from visto.connector.ref_ontology import RefOntology
+from visto.connector.template_cache import TEMPLATE_CACHE_VERSION
+from visto.visualizer.build_stats import BuildStats
+from visto.visualizer.component_cache import get_component_signature
+from visto.visualizer.labels import get_label_text
+from visto.visualizer.triple_writer import BackgroundTripleWriter, get_triple_writer
 from visto.visualizer.visualizer_ref import VisualizerRef
 
 # TODO: convert to detecting primary relationships from a config file and treating all others as secondary or ontology-related
 SECONDARY_RELS = ["mds:place"]
+# bump whenever build_graph produces different graphs for the same input
+BUILD_VERSION = 1
+# pipeline phases in the order they are reported to a progress callback
+BUILD_PHASES = ("read", "ontologies", "traversal", "export")
+
+
+@lru_cache(maxsize=None)
+def _get_bytes_area_diagram_class():
+    # cemento pulls in pandas, only load it once a diagram is read
+    from cemento.draw_io.read_area_diagram import ReadAreaDiagram
+
+    class BytesAreaDiagram(ReadAreaDiagram):
+        # reads an area diagram from memory instead of a file, cemento parses
+        # the file path more than once so every access gets a fresh stream
+
+        def __init__(self, content, name="diagram.drawio", **kwargs):
+            self._content = content
+            super().__init__(name, **kwargs)
+
+        def get_file_path(self):
+            return io.BytesIO(self._content)
+
+    return BytesAreaDiagram
+
+
+def read_area_diagram(file_path):
+    if isinstance(file_path, (bytes, bytearray)):
+        return _get_bytes_area_diagram_class()(bytes(file_path))
+
+    from cemento.draw_io.read_area_diagram import ReadAreaDiagram
+
+    return ReadAreaDiagram(file_path)
+
+
+def get_versions_key():
+    # identifies the version of the build and of the templates it may pull in
+    digest = sha256()
+    digest.update(f"{BUILD_VERSION}|{TEMPLATE_CACHE_VERSION}|".encode())
+    for name, mtime, size in DataRef().get_ontology_versions():
+        digest.update(f"{name}|{mtime}|{size}|".encode())
+    return digest.hexdigest()
+
+
+def get_build_key(content):
+    # identifies the graphs built from a diagram
+    digest = sha256(get_versions_key().encode())
+    digest.update(content)
+    return digest.hexdigest()
 
 
 def visualize_graph(graph):
-    # visualize the network for debugging
-    plt.figure(figsize=(8, 8))
-    pos = nx.planar_layout(graph)
-    labels = nx.get_node_attributes(graph, "content")
-    nx.draw(
-        graph,
-        pos,
-        labels=labels,
-        with_labels=True,
-        node_color="skyblue",
-        node_size=100,
-        edge_color="grey",
-        font_size=8,
-        font_color="black",
-    )
-    plt.show()
+    # the plotting dependencies are only loaded when debugging
+    from visto.visualizer.debug import visualize_graph
+
+    visualize_graph(graph)
+
+
+CLEAN_TERM_PATTERN = re.compile(r"(.*)\[(.*)\]")
+
+
+@lru_cache(maxsize=None)
+def _get_term_pattern(symbol):
+    return re.compile(rf"(.*)\{symbol[0]}(.*)\{symbol[1]}")
 
 
 # function to extract ontology information from ontology nodes
+@lru_cache(maxsize=65536)
 def get_term_mapping(term, symbol="[]"):
-    term_mapping = re.match(rf"(.*)\{symbol[0]}(.*)\{symbol[1]}", term)
+    term_mapping = _get_term_pattern(symbol).match(term)
     if term_mapping:
-        result = tuple(
-            bs(text, "html.parser").get_text().strip() for text in term_mapping.groups()
-        )
+        result = tuple(get_label_text(text).strip() for text in term_mapping.groups())
         term_class, content = result[0], result[1].split("|")
         if len(content) > 1:
             return term_class, content[0], content[1]
@@ -51,18 +104,157 @@ def get_term_mapping(term, symbol="[]"):
 
 
 # helper function to remove html tags in node content
+@lru_cache(maxsize=65536)
 def clean_term(term):
-    term = bs(term, "html.parser").get_text().strip()
-    term_mapping = re.match(r"(.*)\[(.*)\]", term)
+    term = get_label_text(term).strip()
+    term_mapping = CLEAN_TERM_PATTERN.match(term)
     if term_mapping:
         return term_mapping.group(1)
     return term
 
 
-def build_graph(file_path, save_triples=True):
-    # read the area diagram and retrieve relationships
-    fs_ex = ReadAreaDiagram(file_path)
+def _create_ontologies(graph, ontologies=None):
+    if ontologies is None:
+        ontologies = dict()
+
+    # create terms whenever applicable
+    # TODO: change node retrieval to a more global analog
+    for node_id, data in graph.nodes(data=True):
+        node_label = data["content"]
+        is_component = data["is_component"]
+        term_mapping = get_term_mapping(node_label)
+        if term_mapping and node_id not in ontologies:
+            name, base_ontology, self_term = term_mapping
+            ontologies[node_id] = Ontology(
+                name, self_term, base_ontology, is_component=is_component
+            )
+
+    return ontologies
+
+
+def _get_base_ontologies(graph):
+    base_ontologies = {"motor_ref", "db_identifier"}
+    for _, data in graph.nodes(data=True):
+        term_mapping = get_term_mapping(data["content"])
+        if term_mapping and len(term_mapping) > 2:
+            base_ontologies.add(term_mapping[1])
+    return base_ontologies
+
+
+def _warm_template_cache(base_ontologies, search_paths=()):
+    # parse the templates once per worker instead of once per component
+    ref = DataRef()
+    for search_path in search_paths:
+        ref.get_registry().add_search_path(search_path)
+    for base_ontology in base_ontologies:
+        try:
+            ref.get_template(base_ontology)
+        except KeyError:
+            # unknown templates are reported when the ontology is created
+            pass
+
+
+def _traverse_component(subgraph, ontologies, motor_ref, link_onto, stats=None):
+    # retrieve root (component) node
+    root = next(nx.topological_sort(subgraph))
+
+    # define and sort traversal based on edge weights
+    # only go through primary (tree-based relationships) first
+    reverse_traversal = reversed(list(nx.edge_bfs(subgraph, root)))
+    prioritized_traversal = sorted(
+        reverse_traversal,
+        key=lambda edge: subgraph.get_edge_data(edge[0], edge[1])["weight"],
+        reverse=True,
+    )
+
+    # traverse through graphs and parse node relationships
+    for parent_id, child_id in prioritized_traversal:
+        if stats is not None:
+            start = perf_counter()
+        # parent = subgraph.nodes[parent_id]["content"]
+        child = subgraph.nodes[child_id]["content"]
+        rel = subgraph.get_edge_data(parent_id, child_id)["rel"]
+
+        if rel == "mds:bind":
+            parent_onto = ontologies[parent_id]
+            child_onto = ontologies[child_id]
+            try:
+                parent_onto.bind(child_onto)
+            except NodeNotFound:
+                # TODO: save node info to list for error output later
+                # TODO: create custom errors for this script
+                pass
+
+        if rel == "mds:adopt":
+            parent_onto = ontologies[parent_id]
+            model = clean_term(child)
+            parent_onto.adopt(motor_ref, model)
+
+        if rel == "mds:define":
+            parent_onto = ontologies[parent_id]
+            value, variable = get_term_mapping(child, symbol="()")
+            parent_onto.define(variable, value)
+
+        if rel == "mds:link":
+            parent_onto = ontologies[parent_id]
+            try:
+                uid, variable = get_term_mapping(child, symbol="()")
+            except TypeError:
+                uid = child
+                variable = None
+            parent_onto.link(link_onto, uid, variable=variable)
+
+        if stats is not None:
+            stats.add(rel, perf_counter() - start, parent="components")
+
+    return root
+
+
+def _ignore_progress(phase, done, total):
+    pass
+
+
+def _build_component(subgraph, collect_stats=False):
+    # create and process the ontologies of a single weakly connected component,
+    # this is the unit of work handed to the worker pools
+    stats = BuildStats() if collect_stats else None
+    ontologies = _create_ontologies(subgraph)
+    motor_ref = RefOntology("motor_ref")
+    link_onto = RefOntology("db_identifier")
+    if stats is not None:
+        stats.lap("component ontologies", count=len(ontologies), parent="components")
+    root = _traverse_component(subgraph, ontologies, motor_ref, link_onto, stats)
+    return root, ontologies, stats
+
+
+def build_graph(
+    file_path,
+    save_triples=True,
+    max_workers=None,
+    use_processes=True,
+    triple_format=None,
+    background_writes=False,
+    progress=None,
+    return_stats=False,
+    output_path=None,
+    component_cache=None,
+):
+    # progress is called as progress(phase, done, total) between steps of each
+    # phase, an exception raised by it aborts the build. with return_stats, the
+    # timings and counts of each phase are returned as BuildStats as well
+    if progress is None:
+        progress = _ignore_progress
+    stats = BuildStats() if return_stats else None
+
+    # read the area diagram and retrieve relationships, file_path may also hold
+    # the content of the diagram as bytes
+    progress("read", 0, 1)
+    fs_ex = read_area_diagram(file_path)
     df = fs_ex.get_relationships()
+    # cemento collects relationships in sets, sort them so that node, component
+    # and traversal orders (and with them the output) do not change between runs
+    if not df.empty:
+        df = df.sort_values("rel_id", kind="stable", ignore_index=True)
 
     # create a priority table for edges
     edge_weight = defaultdict(int)
@@ -72,17 +264,19 @@ def build_graph(file_path, save_triples=True):
     edge_weight["mds:link"] = 4
     edge_weight["mds:adopt"] = 5
     # create graph representation of user diagram using relationships
-    ex_graph = nx.DiGraph()
-    for _, row in df.iterrows():
-        ex_graph.add_node(row["parent_id"], content=row["parent"])
-        ex_graph.add_node(row["child_id"], content=row["child"])
-        ex_graph.add_edge(
-            row["parent_id"],
-            row["child_id"],
-            rel=row["rel"],
-            rel_id=row["rel_id"],
-            weight=edge_weight[row["rel"]],
-        )
+    ex_graph = graph_from_relationships(
+        df,
+        source="parent_id",
+        target="child_id",
+        node_attrs={"content": ("parent", "child")},
+        edge_attrs={
+            "rel": "rel",
+            "rel_id": "rel_id",
+            "weight": lambda rels: rels["rel"].map(edge_weight),
+        },
+    )
+    if stats is not None:
+        stats.lap("read", count=len(df))
 
     # retrieve the area nodes from the graph and assign to graph
     # retrieve the area to area connections only
@@ -90,13 +284,15 @@ def build_graph(file_path, save_triples=True):
     uuid_header = str(uuid4()).split("-")[-1]
     new_rel_ct = 1
 
-    for key, values in fs_ex.get_node_designations(parse_values=True).items():
+    # designations are sets, sort them to keep the node and component order stable
+    node_designations = fs_ex.get_node_designations(parse_values=True)
+    for key, values in sorted(node_designations.items()):
         key_id, key_value = key
         # if term is isolated (does not have any relationships), add the term
         if key_id not in visited:
             ex_graph.add_node(key_id, content=key_value)
             visited.add(key_id)
-        for value_id, value in values:
+        for value_id, value in sorted(values):
             if "~" in value:
                 if value_id not in visited:
                     ex_graph.add_node(value_id, content=value)
@@ -112,6 +308,7 @@ def build_graph(file_path, save_triples=True):
                     rel=new_rel_type,
                     rel_id=new_rel_id,
                     area_connection=True,
+                    generated=True,
                     weight=edge_weight[new_rel_type],
                 )
 
@@ -161,8 +358,8 @@ def build_graph(file_path, save_triples=True):
     nx.set_node_attributes(ex_graph, is_component, "is_component")
 
     # traverse over root nodes to only connect encapsulating innermost areas
-    for node_id, area_ids in root_area_designations.items():
-        for area_id in area_ids:
+    for node_id, area_ids in sorted(root_area_designations.items()):
+        for area_id in sorted(area_ids):
             # given current subtrees, area nodes directly connected to nodes do not have children
             if len(nx.descendants(area_conn_graph, area_id)) == 0:
                 new_rel_id = f"{uuid_header}-{new_rel_ct}"
@@ -174,30 +371,25 @@ def build_graph(file_path, save_triples=True):
                     node_id,
                     rel=new_rel_type,
                     rel_id=new_rel_id,
+                    generated=True,
                     weight=edge_weight[new_rel_type],
                 )
 
-    # compute subgraphs again, to reflect new bindings
-    subgraphs = [
-        ex_graph.subgraph(c).copy() for c in nx.weakly_connected_components(ex_graph)
-    ]
-
-    motor_ref = RefOntology("motor_ref")
-    link_onto = RefOntology("db_identifier")
+    if stats is not None:
+        # area connections added to the diagram relationships
+        stats.lap("area designations", count=new_rel_ct - 1)
+        stats.increment("nodes", ex_graph.number_of_nodes())
+        stats.increment("edges", ex_graph.number_of_edges())
+        stats.increment("isolates", len(isolates))
+        stats.increment("secondary relations", len(secondary_rels))
+    progress("read", 1, 1)
+    progress("ontologies", 0, 1)
     ontologies = dict()
     root_ontologies = dict()
 
-    # create terms whenever applicable
-    # TODO: change node retrieval to a more global analog
-    for node_id, data in ex_graph.nodes(data=True):
-        node_label = data["content"]
-        is_component = data["is_component"]
-        term_mapping = get_term_mapping(node_label)
-        if term_mapping and node_id not in ontologies:
-            name, base_ontology, self_term = term_mapping
-            ontologies[node_id] = Ontology(
-                name, self_term, base_ontology, is_component=is_component
-            )
+    # only create the ontologies of isolates here, the ontologies of each
+    # component are created and processed together with their component
+    _create_ontologies(ex_graph.subgraph(isolates), ontologies)
 
     # only remove isolates once their respective ontologies have been created, if any
     ex_graph.remove_nodes_from(isolates)
@@ -206,88 +398,175 @@ def build_graph(file_path, save_triples=True):
         ex_graph.subgraph(c).copy() for c in nx.weakly_connected_components(ex_graph)
     ]
 
-    # traverse each resultant subtree and perform operations
-    for subgraph in subgraphs:
-        # retrieve root (component) node
-        root = next(nx.topological_sort(subgraph))
-
-        # define and sort traversal based on edge weights
-        # only go through primary (tree-based relationships) first
-        reverse_traversal = reversed(list(nx.edge_bfs(subgraph, root)))
-        prioritized_traversal = sorted(
-            reverse_traversal,
-            key=lambda edge: subgraph.get_edge_data(edge[0], edge[1])["weight"],
-            reverse=True,
-        )
-
-        # traverse through graphs and parse node relationships
-        for parent_id, child_id in prioritized_traversal:
-            # parent = subgraph.nodes[parent_id]["content"]
-            child = subgraph.nodes[child_id]["content"]
-            rel = subgraph.get_edge_data(parent_id, child_id)["rel"]
+    # with a component cache, components whose nodes and relationships are
+    # unchanged since an earlier build are reused instead of rebuilt
+    cached = dict()
+    if component_cache is not None:
+        salt = get_versions_key()
+        signatures = [get_component_signature(subgraph, salt) for subgraph in subgraphs]
+        for idx, signature in enumerate(signatures):
+            component = component_cache.get(signature)
+            if component is not None:
+                cached[idx] = (*component, None)
+    pending = [idx for idx in range(len(subgraphs)) if idx not in cached]
+
+    # components are independent until the secondary relationships are added,
+    # so their primary traversals can optionally run concurrently
+    use_pool = max_workers is not None and max_workers > 1 and len(pending) > 1
+    base_ontologies = _get_base_ontologies(ex_graph)
+    if not (use_pool and use_processes):
+        # worker processes load the templates themselves
+        _warm_template_cache(base_ontologies)
+    if stats is not None:
+        stats.lap("ontologies", count=len(ontologies))
+        stats.increment("templates", len(base_ontologies))
+    progress("ontologies", 1, 1)
+
+    built = dict()
+    collect_stats = stats is not None
+    progress("traversal", len(cached), len(subgraphs))
+    if use_pool:
+        if use_processes:
+            executor = ProcessPoolExecutor(
+                max_workers=max_workers,
+                initializer=_warm_template_cache,
+                initargs=(
+                    base_ontologies,
+                    DataRef().get_registry().get_search_paths(),
+                ),
+            )
+        else:
+            executor = ThreadPoolExecutor(max_workers=max_workers)
+        with executor:
+            try:
+                # map keeps the results in the order of the subgraphs
+                pending_subgraphs = [subgraphs[idx] for idx in pending]
+                for idx, component in zip(
+                    pending,
+                    executor.map(
+                        _build_component, pending_subgraphs, repeat(collect_stats)
+                    ),
+                ):
+                    built[idx] = component
+                    progress("traversal", len(cached) + len(built), len(subgraphs))
+            except BaseException:
+                # do not wait for components that have not started yet
+                executor.shutdown(wait=False, cancel_futures=True)
+                raise
+    else:
+        for idx in pending:
+            built[idx] = _build_component(subgraphs[idx], collect_stats)
+            progress("traversal", len(cached) + len(built), len(subgraphs))
+
+    if component_cache is not None:
+        # store the components before the secondary pass modifies their roots
+        for idx, (root, component_ontologies, _) in built.items():
+            component_cache.put(signatures[idx], (root, component_ontologies))
+
+    components = [
+        cached[idx] if idx in cached else built[idx] for idx in range(len(subgraphs))
+    ]
+    for _, component_ontologies, component_stats in components:
+        ontologies.update(component_ontologies)
+        if component_stats is not None:
+            stats.merge(component_stats)
+    if stats is not None:
+        stats.lap("components", count=len(components))
+        # report components by the label of their root
+        for idx, (root, _, _) in enumerate(components):
+            stats.add_note(
+                "reused components" if idx in cached else "rebuilt components",
+                clean_term(ex_graph.nodes[root]["content"]).strip(),
+            )
 
-            if rel == "mds:bind":
+    if save_triples:
+        visualizer_ref = VisualizerRef()
+        if output_path is None:
+            output_path = visualizer_ref.get_triple_output_path()
+        if triple_format is None:
+            triple_format = visualizer_ref.get_triple_format()
+        triple_writer = get_triple_writer(triple_format)
+        if background_writes:
+            triple_writer = BackgroundTripleWriter(triple_writer)
+
+    # go over secondary (non-localized) traversals once all components are built.
+    # each component still only sees the components before it as built, like
+    # when the pass followed its own traversal: children in later components
+    # are composed as they are before their traversal
+    component_positions = {
+        node: position
+        for position, subgraph in enumerate(subgraphs)
+        for node in subgraph
+    }
+    untraversed_children = _create_ontologies(
+        ex_graph.subgraph(
+            child_id
+            for _, child_id, _ in secondary_rels
+            if child_id in component_positions
+        )
+    )
+    progress("export", 0, len(components))
+    try:
+        for position, (root, _, _) in enumerate(components):
+            if stats is not None:
+                start = perf_counter()
+            root_ontology = ontologies[root]
+
+            for parent_id, child_id, data in secondary_rels:
                 parent_onto = ontologies[parent_id]
                 child_onto = ontologies[child_id]
-                try:
-                    parent_onto.bind(child_onto)
-                except NodeNotFound:
-                    # TODO: save node info to list for error output later
-                    # TODO: create custom errors for this script
-                    pass
-
-            if rel == "mds:adopt":
-                parent_onto = ontologies[parent_id]
-                model = clean_term(child)
-                parent_onto.adopt(motor_ref, model)
-
-            if rel == "mds:define":
-                parent_onto = ontologies[parent_id]
-                value, variable = get_term_mapping(child, symbol="()")
-                parent_onto.define(variable, value)
-
-            if rel == "mds:link":
-                parent_onto = ontologies[parent_id]
-                try:
-                    uid, variable = get_term_mapping(child, symbol="()")
-                except TypeError:
-                    uid = child
-                    variable = None
-                parent_onto.link(link_onto, uid, variable=variable)
-
-        root_ontology = ontologies[root]
-
-        # go over secondary (non-localized) traversals next
-        for parent_id, child_id, data in secondary_rels:
-            parent_onto = ontologies[parent_id]
-            child_onto = ontologies[child_id]
-
-            # if the child ended up being an isolate, first, add its respective ontology graph to the root graph
-            if child_onto.get_name() not in root_ontology.get_graph().nodes():
-                root_ontology.set_graph(
-                    nx.compose(root_ontology.get_graph(), child_onto.get_graph())
-                )
-
-            if data["rel"] == "mds:place":
-                new_rel_id = f"{uuid_header}-{new_rel_ct}"
-                new_rel_ct += 1
-
-                # proceed to connect the ontologies
-                root_ontology.get_graph().add_edge(
-                    parent_onto.get_name(),
-                    child_onto.get_name(),
-                    rel=data["rel"],
-                    rel_id=new_rel_id,
-                    is_rank=False,
+                if component_positions.get(child_id, -1) > position:
+                    child_onto = untraversed_children[child_id]
+
+                # if the child ended up being an isolate, first, add its respective ontology graph to the root graph
+                if child_onto.get_name() not in root_ontology.get_graph().nodes():
+                    root_ontology.compose(child_onto)
+
+                if data["rel"] == "mds:place":
+                    new_rel_id = f"{uuid_header}-{new_rel_ct}"
+                    new_rel_ct += 1
+
+                    # proceed to connect the ontologies
+                    root_ontology.get_graph().add_edge(
+                        parent_onto.get_name(),
+                        child_onto.get_name(),
+                        rel=data["rel"],
+                        rel_id=new_rel_id,
+                        is_rank=False,
+                    )
+
+            if stats is not None:
+                end = perf_counter()
+                stats.add("secondary relations", end - start, count=len(secondary_rels))
+                start = end
+
+            if save_triples:
+                # save each resultant subtree in a separate file, the root graph is
+                # not modified after this point so it can be written in the background
+                save_file_name = root_ontology.get_name().replace("~", "").strip()
+                save_file_path = triple_writer.get_file_path(
+                    path.join(output_path, save_file_name)
                 )
-
-        if save_triples:
-            # save each resultant subtree in a separate file
-            output_path = VisualizerRef().get_triple_output_path()
-            save_file_name = root_ontology.get_name().replace("~", "").strip()
-            save_file_path = path.join(output_path, f"{save_file_name}.xlsx")
-            root_ontology.get_rels().to_excel(save_file_path)
-
-        root_ontologies[root] = root_ontology
-
+                triple_writer.write(save_file_path, root_ontology.iter_rels())
+                if stats is not None:
+                    stats.add("export", perf_counter() - start)
+
+            root_ontologies[root] = root_ontology
+            progress("export", len(root_ontologies), len(components))
+    except BaseException:
+        if save_triples and background_writes:
+            triple_writer.cancel()
+        raise
+
+    if save_triples and background_writes:
+        # wait for pending writes before handing out the graphs
+        if stats is not None:
+            start = perf_counter()
+        triple_writer.close()
+        if stats is not None:
+            stats.add("export", perf_counter() - start, count=0)
+
+    if stats is not None:
+        stats.finish()
+        return root_ontologies, stats
     return root_ontologies
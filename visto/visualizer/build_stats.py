@@ -0,0 +1,116 @@
+from time import perf_counter
+
+# values listed per note in the table
+MAX_NOTES = 20
+
+
+class BuildStats:
+    # wall times and counts per build phase. nested entries (e.g. the relation
+    # types of the traversal) are summed over the components, so they can add
+    # up to more than their parent when components are processed concurrently
+
+    def __init__(self):
+        self._phases = dict()
+        self._counters = dict()
+        self._notes = dict()
+        self._start = perf_counter()
+        self._lap_start = self._start
+        self._total_time = None
+
+    def add(self, name, seconds, count=1, parent=None):
+        phase = self._phases.setdefault(
+            name, {"time": 0.0, "count": 0, "parent": parent}
+        )
+        phase["time"] += seconds
+        phase["count"] += count
+
+    def lap(self, name, count=1, parent=None):
+        # top-level phases run one after the other, each lap ends the current
+        # phase and starts the next one
+        end = perf_counter()
+        self.add(name, end - self._lap_start, count=count, parent=parent)
+        self._lap_start = end
+
+    def increment(self, name, value=1):
+        self._counters[name] = self._counters.get(name, 0) + value
+
+    def add_note(self, name, value):
+        # values worth listing by name, e.g. the components that were rebuilt
+        self._notes.setdefault(name, []).append(value)
+
+    def get_notes(self, name):
+        return list(self._notes.get(name, []))
+
+    def merge(self, other):
+        # add the entries collected by a component, e.g. in a worker process
+        for name, phase in other._phases.items():
+            self.add(name, phase["time"], count=phase["count"], parent=phase["parent"])
+        for name, value in other._counters.items():
+            self.increment(name, value)
+        for name, values in other._notes.items():
+            self._notes.setdefault(name, []).extend(values)
+
+    def finish(self):
+        self._total_time = perf_counter() - self._start
+
+    def get_total_time(self):
+        if self._total_time is None:
+            return perf_counter() - self._start
+        return self._total_time
+
+    def get_time(self, name):
+        return self._phases[name]["time"]
+
+    def get_count(self, name):
+        return self._phases[name]["count"]
+
+    def get_counter(self, name):
+        return self._counters.get(name, 0)
+
+    def to_dict(self):
+        return {
+            "total_time": self.get_total_time(),
+            "phases": {name: dict(phase) for name, phase in self._phases.items()},
+            "counters": dict(self._counters),
+            "notes": {name: list(values) for name, values in self._notes.items()},
+        }
+
+    def _get_children(self, parent):
+        return [
+            name for name, phase in self._phases.items() if phase["parent"] == parent
+        ]
+
+    def format_table(self):
+        total_time = self.get_total_time()
+        lines = [f"{'phase':<28} {'count':>8} {'time (s)':>10} {'share':>7}"]
+
+        def add_lines(parent, depth):
+            for name in self._get_children(parent):
+                phase = self._phases[name]
+                share = phase["time"] / total_time if total_time else 0
+                label = f"{'  ' * depth}{name}"
+                lines.append(
+                    f"{label:<28} {phase['count']:>8} {phase['time']:>10.4f}"
+                    f" {share:>7.1%}"
+                )
+                add_lines(name, depth + 1)
+
+        add_lines(None, 0)
+        lines.append(f"{'total':<28} {'':>8} {total_time:>10.4f} {1:>7.1%}")
+
+        if self._counters:
+            lines.append("")
+            lines.append(f"{'counter':<28} {'value':>8}")
+            for name, value in self._counters.items():
+                lines.append(f"{name:<28} {value:>8}")
+
+        for name, values in self._notes.items():
+            lines.append("")
+            listed = ", ".join(map(str, values[:MAX_NOTES]))
+            if len(values) > MAX_NOTES:
+                listed += ", ..."
+            lines.append(f"{name} ({len(values)}): {listed}")
+        return "\n".join(lines)
+
+    def __str__(self):
+        return self.format_table()
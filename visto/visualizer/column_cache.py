@@ -0,0 +1,454 @@
+import json
+import os
+import warnings
+from hashlib import sha1
+from os import path
+from threading import Lock
+
+import numpy as np
+
+# pandas is imported by the functions that read or convert columns, the app
+# does not need it before the first plot
+
+# bump whenever the layout of the converted columns changes
+COLUMN_CACHE_VERSION = 2
+CHUNK_SIZE = 1_000_000
+FINGERPRINT_SIZE = 1 << 16
+
+
+COLUMN_DTYPES = {
+    "float": np.float64,
+    "datetime": np.dtype("datetime64[ns]"),
+    "category": np.int32,
+}
+
+
+def get_column_kind(values):
+    import pandas as pd
+
+    if pd.api.types.is_numeric_dtype(values):
+        return "float"
+
+    # only probe a sample, non-date text would otherwise be parsed row by row
+    sample = values.dropna().iloc[:100]
+    if len(sample):
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            try:
+                if pd.to_datetime(sample, errors="coerce").notna().all():
+                    return "datetime"
+            except (TypeError, ValueError):
+                pass
+    return "category"
+
+
+def convert_values(values, kind):
+    # later chunks may hold entries of another kind, plot those as gaps
+    import pandas as pd
+
+    if kind == "float":
+        return pd.to_numeric(values, errors="coerce").to_numpy(dtype=np.float64)
+    if kind == "datetime":
+        return pd.to_datetime(values, errors="coerce").to_numpy(dtype="datetime64[ns]")
+    return values.astype(object).where(values.notna(), None).to_numpy()
+
+
+class BoundedReader:
+    # file object that ends at the given byte offset, so that pandas only
+    # parses the rows before it
+
+    def __init__(self, f, num_bytes):
+        self._file = f
+        self._num_bytes = num_bytes
+
+    def read(self, size=-1):
+        if size < 0 or size > self._num_bytes:
+            size = self._num_bytes
+        data = self._file.read(size)
+        self._num_bytes -= len(data)
+        return data
+
+
+def get_fingerprint(f, end):
+    # hash of the first and last bytes before end, a file is only treated as
+    # appended to when these did not change
+    f.seek(0)
+    digest = sha1(f.read(min(end, FINGERPRINT_SIZE)))
+    f.seek(max(end - FINGERPRINT_SIZE, 0))
+    digest.update(f.read(min(end, FINGERPRINT_SIZE)))
+    return digest.hexdigest()
+
+
+def get_file_state(f, stat):
+    f.seek(max(stat.st_size - 1, 0))
+    return {
+        "size": stat.st_size,
+        "mtime": stat.st_mtime_ns,
+        "is_complete": f.read(1) == b"\n",
+        "fingerprint": get_fingerprint(f, stat.st_size),
+    }
+
+
+def is_current(manifest, stat):
+    return manifest is not None and (manifest["size"], manifest["mtime"]) == (
+        stat.st_size,
+        stat.st_mtime_ns,
+    )
+
+
+def write_json(file_path, data):
+    temp_path = f"{file_path}.{os.getpid()}.tmp"
+    with open(temp_path, "w") as f:
+        json.dump(data, f)
+    os.replace(temp_path, file_path)
+
+
+class ColumnWriter:
+    # writes the chunks of one csv column to a raw binary file after its
+    # first num_rows values: numeric columns are stored as float64, timestamps
+    # as datetime64 and all others as int32 codes into categories
+
+    def __init__(self, file_path, kind, categories=None, num_rows=0):
+        self._file = open(file_path, "r+b" if num_rows else "wb")
+        self._file.seek(num_rows * np.dtype(COLUMN_DTYPES[kind]).itemsize)
+        self._file.truncate()
+        self._categories = None
+        self._category_codes = None
+        self.kind = kind
+        if kind == "category":
+            self._categories = list(categories or [])
+            self._category_codes = {
+                value: code for code, value in enumerate(self._categories)
+            }
+
+    def write(self, values):
+        import pandas as pd
+
+        if self.kind in ("float", "datetime"):
+            values = convert_values(values, self.kind)
+        else:
+            codes, uniques = pd.factorize(values.astype(str).where(values.notna()))
+            category_codes = self._category_codes
+            for value in uniques:
+                if value not in category_codes:
+                    category_codes[value] = len(self._categories)
+                    self._categories.append(value)
+            # the trailing -1 maps missing entries (code -1) to missing codes
+            lookup = np.array(
+                [category_codes[value] for value in uniques] + [-1], dtype=np.int32
+            )
+            values = lookup[codes]
+        values.tofile(self._file)
+
+    def close(self):
+        self._file.close()
+        return self._categories
+
+
+class ColumnCache:
+    # converts the columns of a csv file into binary files that are
+    # memory-mapped on lookup, so that plotting a column does not re-read the
+    # csv. only the requested columns are converted, and rows appended to the
+    # csv are added to the converted columns instead of starting over
+
+    def __init__(self, cache_dir=None):
+        self._cache_dir = None
+        self._tables = dict()
+        self._lock = Lock()
+
+        if cache_dir is not None:
+            self.set_cache_dir(cache_dir)
+
+    def _get_table_path(self, source_path):
+        digest = sha1(f"{COLUMN_CACHE_VERSION}|{source_path}".encode()).hexdigest()
+        stem = path.splitext(path.basename(source_path))[0]
+        return path.join(self.get_cache_dir(), f"{stem}-{digest[:16]}")
+
+    def _read_manifest(self, table_path):
+        manifest_path = path.join(table_path, "manifest.json")
+        if not path.exists(manifest_path):
+            return None
+        with open(manifest_path) as f:
+            return json.load(f)
+
+    def _write_manifest(self, table_path, manifest):
+        write_json(path.join(table_path, "manifest.json"), manifest)
+
+    def _read_rows(self, source_path, start, end, indices, num_columns):
+        import pandas as pd
+
+        if end <= start:
+            return
+        with open(source_path, "rb") as f:
+            f.seek(start)
+            # positional names, the header may hold duplicate names
+            yield from pd.read_csv(
+                BoundedReader(f, end - start),
+                header=None,
+                names=list(range(num_columns)),
+                usecols=sorted(indices),
+                chunksize=CHUNK_SIZE,
+            )
+
+    def _create(self, table_path, source_path, stat):
+        import pandas as pd
+
+        names = [str(name) for name in pd.read_csv(source_path, nrows=0).columns]
+        with open(source_path, "rb") as f:
+            f.readline()
+            data_offset = f.tell()
+            file_state = get_file_state(f, stat)
+
+        manifest = dict(
+            file_state,
+            names=names,
+            data_offset=data_offset,
+            num_rows=None,
+            columns=dict(),
+        )
+        os.makedirs(table_path, exist_ok=True)
+        self._write_manifest(table_path, manifest)
+        # the columns of a previous version of the file
+        for file_name in os.listdir(table_path):
+            if file_name != "manifest.json":
+                try:
+                    os.remove(path.join(table_path, file_name))
+                except OSError:
+                    pass
+        return manifest
+
+    def _is_appended(self, source_path, manifest, stat):
+        # rows can only be added when the converted part ended with a newline
+        # and is still the start of the file, columns converted from the
+        # header alone have no kind yet
+        if not manifest["is_complete"] or stat.st_size <= manifest["size"]:
+            return False
+        if manifest["num_rows"] == 0:
+            return False
+        with open(source_path, "rb") as f:
+            return get_fingerprint(f, manifest["size"]) == manifest["fingerprint"]
+
+    def _append(self, table_path, source_path, manifest, stat):
+        # convert the rows after the last converted byte of each column
+        columns = manifest["columns"]
+        num_rows = manifest["num_rows"]
+        writers = dict()
+        try:
+            for key, kind in columns.items():
+                categories = None
+                if kind == "category":
+                    with open(path.join(table_path, f"{key}.json")) as f:
+                        categories = json.load(f)
+                writers[int(key)] = ColumnWriter(
+                    path.join(table_path, f"{key}.bin"),
+                    kind,
+                    categories=categories,
+                    num_rows=num_rows,
+                )
+
+            if writers:
+                for chunk in self._read_rows(
+                    source_path,
+                    manifest["size"],
+                    stat.st_size,
+                    writers,
+                    len(manifest["names"]),
+                ):
+                    for idx, writer in writers.items():
+                        writer.write(chunk[idx])
+                    num_rows += len(chunk)
+
+            for idx, writer in writers.items():
+                categories = writer.close()
+                if categories is not None:
+                    write_json(path.join(table_path, f"{idx}.json"), categories)
+        finally:
+            for writer in writers.values():
+                writer.close()
+
+        with open(source_path, "rb") as f:
+            file_state = get_file_state(f, stat)
+        manifest = dict(manifest, num_rows=num_rows, **file_state)
+        self._write_manifest(table_path, manifest)
+        return manifest
+
+    def _convert(self, table_path, source_path, manifest, indices):
+        # convert the given columns up to the last converted byte
+        indices = sorted(indices)
+        temp_paths = {
+            idx: path.join(table_path, f"{idx}.bin.{os.getpid()}.tmp")
+            for idx in indices
+        }
+        writers = dict()
+        num_rows = 0
+        try:
+            for chunk in self._read_rows(
+                source_path,
+                manifest["data_offset"],
+                manifest["size"],
+                indices,
+                len(manifest["names"]),
+            ):
+                if not writers:
+                    # the first rows decide the kind of each column
+                    writers = {
+                        idx: ColumnWriter(temp_paths[idx], get_column_kind(chunk[idx]))
+                        for idx in indices
+                    }
+                for idx, writer in writers.items():
+                    writer.write(chunk[idx])
+                num_rows += len(chunk)
+
+            if not writers:
+                # header only
+                writers = {
+                    idx: ColumnWriter(temp_paths[idx], "float") for idx in indices
+                }
+
+            columns = dict()
+            for idx, writer in writers.items():
+                categories = writer.close()
+                if categories is not None:
+                    # categories are only loaded together with their column
+                    write_json(path.join(table_path, f"{idx}.json"), categories)
+                os.replace(temp_paths[idx], path.join(table_path, f"{idx}.bin"))
+                columns[str(idx)] = writer.kind
+        finally:
+            for writer in writers.values():
+                writer.close()
+            for temp_path in temp_paths.values():
+                if path.exists(temp_path):
+                    os.remove(temp_path)
+
+        manifest = dict(
+            manifest,
+            num_rows=num_rows,
+            columns=dict(manifest["columns"], **columns),
+        )
+        self._write_manifest(table_path, manifest)
+        return manifest
+
+    def _get_table(self, source_path, indices=()):
+        source_path = path.abspath(source_path)
+        with self._lock:
+            table = self._tables.get(source_path)
+            if table is None:
+                table = {
+                    "path": self._get_table_path(source_path),
+                    "manifest": None,
+                    "columns": dict(),
+                    "lock": Lock(),
+                }
+                self._tables[source_path] = table
+
+        with table["lock"]:
+            stat = os.stat(source_path)
+            if not is_current(table["manifest"], stat):
+                # another process may have brought the columns up to date
+                table_path = table["path"]
+                manifest = self._read_manifest(table_path)
+                if is_current(manifest, stat):
+                    pass
+                elif manifest is not None and self._is_appended(
+                    source_path, manifest, stat
+                ):
+                    manifest = self._append(table_path, source_path, manifest, stat)
+                else:
+                    manifest = self._create(table_path, source_path, stat)
+                table["manifest"] = manifest
+                table["columns"] = dict()
+
+            missing = {
+                idx for idx in indices if str(idx) not in table["manifest"]["columns"]
+            }
+            if missing:
+                table["manifest"] = self._convert(
+                    table["path"], source_path, table["manifest"], missing
+                )
+        return table
+
+    def _load_column(self, table, idx):
+        import pandas as pd
+
+        column = table["columns"].get(idx)
+        if column is not None:
+            return column
+
+        manifest = table["manifest"]
+        kind = manifest["columns"][str(idx)]
+        dtype = COLUMN_DTYPES[kind]
+        num_rows = manifest["num_rows"]
+        if num_rows:
+            values = np.memmap(
+                path.join(table["path"], f"{idx}.bin"),
+                dtype=dtype,
+                mode="r",
+                shape=(num_rows,),
+            )
+        else:
+            values = np.empty(0, dtype=dtype)
+
+        if kind == "category":
+            with open(path.join(table["path"], f"{idx}.json")) as f:
+                categories = json.load(f)
+            values = pd.Categorical.from_codes(values, categories=categories)
+
+        column = (manifest["names"][idx], values)
+        table["columns"][idx] = column
+        return column
+
+    def get_column(self, source_path, idx):
+        # returns the column name and its (memory-mapped) values
+        import pandas as pd
+
+        if self.get_cache_dir() is None:
+            df = pd.read_csv(source_path, usecols=[idx])
+            return str(df.columns[0]), df.iloc[:, 0].to_numpy()
+
+        return self._load_column(self._get_table(source_path, [idx]), idx)
+
+    def get_columns(self, source_path, indices):
+        import pandas as pd
+
+        if self.get_cache_dir() is None:
+            # read all requested columns in one pass over the file
+            usecols = sorted(set(indices))
+            df = pd.read_csv(source_path, usecols=usecols)
+            positions = {idx: pos for pos, idx in enumerate(usecols)}
+            return [
+                (str(df.columns[positions[idx]]), df.iloc[:, positions[idx]].to_numpy())
+                for idx in indices
+            ]
+
+        table = self._get_table(source_path, indices)
+        return [self._load_column(table, idx) for idx in indices]
+
+    def get_column_names(self, source_path):
+        import pandas as pd
+
+        if self.get_cache_dir() is None:
+            return [str(name) for name in pd.read_csv(source_path, nrows=0).columns]
+
+        return list(self._get_table(source_path)["manifest"]["names"])
+
+    def invalidate(self, source_path=None):
+        with self._lock:
+            if source_path is None:
+                self._tables.clear()
+            else:
+                self._tables.pop(path.abspath(source_path), None)
+
+    def get_cache_dir(self):
+        return self._cache_dir
+
+    def set_cache_dir(self, cache_dir):
+        if cache_dir:
+            try:
+                os.makedirs(cache_dir, exist_ok=True)
+            except OSError:
+                cache_dir = None
+        self._cache_dir = cache_dir or None
+
+
+# process-wide cache shared by the plotter callbacks
+column_cache = ColumnCache()
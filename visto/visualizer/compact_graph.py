@@ -0,0 +1,557 @@
+from array import array
+from collections.abc import Set
+
+import networkx as nx
+
+
+def _get_typecode(max_value):
+    # smallest unsigned array type that holds every code
+    for typecode in ("B", "H", "I"):
+        if max_value < 1 << (8 * array(typecode).itemsize):
+            return typecode
+    return "Q"
+
+
+def _to_array(values):
+    return array(_get_typecode(max(values, default=0)), values)
+
+
+def _copy_array(values):
+    if not isinstance(values, memoryview):
+        return values
+    copied = array(values.format)
+    copied.frombytes(values.cast("B"))
+    return copied
+
+
+class CompactNodeView(Set):
+    # the nodes of a compact graph, behaves like the networkx node view:
+    # iterate, test membership, look up attributes with graph.nodes[node] and
+    # call it for the (node, data) pairs
+
+    def __init__(self, graph):
+        self._graph = graph
+
+    @classmethod
+    def _from_iterable(cls, nodes):
+        # results of set operations are plain sets
+        return set(nodes)
+
+    def __iter__(self):
+        return iter(self._graph._names)
+
+    def __len__(self):
+        return len(self._graph._names)
+
+    def __contains__(self, node):
+        return self._graph.has_node(node)
+
+    def __getitem__(self, node):
+        return self._graph._get_node_data(self._graph.get_node_id(node))
+
+    def __call__(self, data=False, default=None):
+        if data is False:
+            return self
+        return self._graph._iter_node_data(range(len(self)), data, default)
+
+
+class CompactGraph:
+    # read-only directed graph for the assembled experiment graphs. nodes are
+    # integer ids into a list of node names, adjacency is kept in both
+    # directions as CSR arrays (the neighbors of node i are
+    # targets[offsets[i]:offsets[i + 1]]) and attribute values are interned,
+    # so every edge costs a few bytes instead of its own dict. node and
+    # successor order follow the networkx graph it was frozen from
+
+    def __init__(
+        self,
+        names,
+        out_offsets,
+        out_targets,
+        in_offsets,
+        in_sources,
+        in_edges,
+        node_columns,
+        edge_columns,
+        values,
+        graph_attrs=None,
+    ):
+        self._names = names
+        self._out_offsets = out_offsets
+        self._out_targets = out_targets
+        self._in_offsets = in_offsets
+        self._in_sources = in_sources
+        # edge id (position in the out arrays) of every in entry
+        self._in_edges = in_edges
+        # attribute name -> value code per node or edge, 0 if it is not set
+        self._node_columns = node_columns
+        self._edge_columns = edge_columns
+        self._values = values
+        self.graph = dict(graph_attrs or {})
+        self._index = None
+
+    @classmethod
+    def from_networkx(cls, graph):
+        if not graph.is_directed() or graph.is_multigraph():
+            raise TypeError("Only simple directed graphs can be frozen.")
+
+        names = list(graph.nodes())
+        index = {name: node_id for node_id, name in enumerate(names)}
+        # code 0 is reserved for unset attributes. values are keyed with their
+        # type so that e.g. True and 1 keep their own entries
+        values = [None]
+        codes = dict()
+
+        def intern(value):
+            key = (type(value), value)
+            code = codes.get(key)
+            if code is None:
+                code = codes[key] = len(values)
+                values.append(value)
+            return code
+
+        node_columns = dict()
+        for node_id, (_, data) in enumerate(graph.nodes(data=True)):
+            for attr, value in data.items():
+                column = node_columns.get(attr)
+                if column is None:
+                    column = node_columns[attr] = [0] * len(names)
+                column[node_id] = intern(value)
+
+        out_offsets = [0]
+        out_targets = []
+        edge_ids = dict()
+        edge_entries = []
+        for parent_id, parent in enumerate(names):
+            for child, data in graph.adj[parent].items():
+                child_id = index[child]
+                edge_ids[parent_id, child_id] = len(out_targets)
+                out_targets.append(child_id)
+                edge_entries.append(
+                    [(attr, intern(value)) for attr, value in data.items()]
+                )
+            out_offsets.append(len(out_targets))
+
+        edge_columns = dict()
+        for edge_id, entries in enumerate(edge_entries):
+            for attr, code in entries:
+                column = edge_columns.get(attr)
+                if column is None:
+                    column = edge_columns[attr] = [0] * len(out_targets)
+                column[edge_id] = code
+
+        in_offsets = [0]
+        in_sources = []
+        in_edges = []
+        for child_id, child in enumerate(names):
+            for parent in graph.pred[child]:
+                parent_id = index[parent]
+                in_sources.append(parent_id)
+                in_edges.append(edge_ids[parent_id, child_id])
+            in_offsets.append(len(in_sources))
+
+        compact = cls(
+            names,
+            _to_array(out_offsets),
+            _to_array(out_targets),
+            _to_array(in_offsets),
+            _to_array(in_sources),
+            _to_array(in_edges),
+            {attr: _to_array(column) for attr, column in node_columns.items()},
+            {attr: _to_array(column) for attr, column in edge_columns.items()},
+            values,
+            graph.graph,
+        )
+        compact._index = index
+        return compact
+
+    def to_networkx(self):
+        # successors keep their order, predecessors are ordered by the edges
+        graph = nx.DiGraph()
+        graph.graph.update(self.graph)
+        graph.add_nodes_from(self.nodes(data=True))
+        graph.add_edges_from(self.edges(data=True))
+        return graph
+
+    def _get_index(self):
+        if self._index is None:
+            self._index = {name: node_id for node_id, name in enumerate(self._names)}
+        return self._index
+
+    def get_node_id(self, node):
+        node_id = self._get_index().get(node)
+        if node_id is None:
+            raise nx.NodeNotFound(f"The node {node} is not in the graph.")
+        return node_id
+
+    def get_node_name(self, node_id):
+        return self._names[node_id]
+
+    def _get_node_data(self, node_id):
+        values = self._values
+        return {
+            attr: values[column[node_id]]
+            for attr, column in self._node_columns.items()
+            if column[node_id]
+        }
+
+    def _get_edge_data(self, edge_id):
+        values = self._values
+        return {
+            attr: values[column[edge_id]]
+            for attr, column in self._edge_columns.items()
+            if column[edge_id]
+        }
+
+    def _iter_node_data(self, node_ids, data, default):
+        names = self._names
+        if data is True:
+            return (
+                (names[node_id], self._get_node_data(node_id)) for node_id in node_ids
+            )
+        column = self._node_columns.get(data)
+        values = self._values
+        return (
+            (
+                (names[node_id], values[column[node_id]])
+                if column is not None and column[node_id]
+                else (names[node_id], default)
+            )
+            for node_id in node_ids
+        )
+
+    def _iter_edges(self, edge_items, data, default):
+        # edge_items are (parent id, child id, edge id) triples
+        names = self._names
+        if data is False:
+            return (
+                (names[parent_id], names[child_id])
+                for parent_id, child_id, _ in edge_items
+            )
+        if data is True:
+            return (
+                (names[parent_id], names[child_id], self._get_edge_data(edge_id))
+                for parent_id, child_id, edge_id in edge_items
+            )
+        column = self._edge_columns.get(data)
+        values = self._values
+        return (
+            (
+                names[parent_id],
+                names[child_id],
+                (
+                    values[column[edge_id]]
+                    if column is not None and column[edge_id]
+                    else default
+                ),
+            )
+            for parent_id, child_id, edge_id in edge_items
+        )
+
+    def _iter_edge_items(self):
+        offsets, targets = self._out_offsets, self._out_targets
+        for parent_id in range(len(self._names)):
+            for edge_id in range(offsets[parent_id], offsets[parent_id + 1]):
+                yield parent_id, targets[edge_id], edge_id
+
+    def get_successor_ids(self, node_id):
+        return self._out_targets[
+            self._out_offsets[node_id] : self._out_offsets[node_id + 1]
+        ]
+
+    def get_predecessor_ids(self, node_id):
+        return self._in_sources[
+            self._in_offsets[node_id] : self._in_offsets[node_id + 1]
+        ]
+
+    @property
+    def nodes(self):
+        return CompactNodeView(self)
+
+    def edges(self, data=False, default=None):
+        return self._iter_edges(self._iter_edge_items(), data, default)
+
+    def has_node(self, node):
+        try:
+            return node in self._get_index()
+        except TypeError:
+            # unhashable
+            return False
+
+    def has_edge(self, parent, child):
+        index = self._get_index()
+        if parent not in index or child not in index:
+            return False
+        return index[child] in self.get_successor_ids(index[parent])
+
+    def get_edge_data(self, parent, child, default=None):
+        index = self._get_index()
+        if parent not in index or child not in index:
+            return default
+        parent_id, child_id = index[parent], index[child]
+        for edge_id in range(
+            self._out_offsets[parent_id], self._out_offsets[parent_id + 1]
+        ):
+            if self._out_targets[edge_id] == child_id:
+                return self._get_edge_data(edge_id)
+        return default
+
+    def __contains__(self, node):
+        return self.has_node(node)
+
+    def __iter__(self):
+        return iter(self._names)
+
+    def __len__(self):
+        return len(self._names)
+
+    def number_of_nodes(self):
+        return len(self._names)
+
+    def number_of_edges(self):
+        return len(self._out_targets)
+
+    def successors(self, node):
+        names = self._names
+        return (
+            names[child_id]
+            for child_id in self.get_successor_ids(self.get_node_id(node))
+        )
+
+    def predecessors(self, node):
+        names = self._names
+        return (
+            names[parent_id]
+            for parent_id in self.get_predecessor_ids(self.get_node_id(node))
+        )
+
+    def out_degree(self, node):
+        node_id = self.get_node_id(node)
+        return self._out_offsets[node_id + 1] - self._out_offsets[node_id]
+
+    def in_degree(self, node):
+        node_id = self.get_node_id(node)
+        return self._in_offsets[node_id + 1] - self._in_offsets[node_id]
+
+    def degree(self, node):
+        return self.out_degree(node) + self.in_degree(node)
+
+    def get_edges_by_rel(self, rel, attr="rel"):
+        # (parent, child) pairs of one relationship, found by comparing codes
+        column = self._edge_columns.get(attr)
+        if column is None:
+            return []
+        codes = {
+            code
+            for code, value in enumerate(self._values)
+            if code and value == rel and type(value) is type(rel)
+        }
+        return list(
+            self._iter_edges(
+                (item for item in self._iter_edge_items() if column[item[2]] in codes),
+                False,
+                None,
+            )
+        )
+
+    def get_roots(self):
+        # nodes without predecessors, in node order
+        offsets = self._in_offsets
+        return [
+            name
+            for node_id, name in enumerate(self._names)
+            if offsets[node_id] == offsets[node_id + 1]
+        ]
+
+    def _walk(self, node, get_neighbor_ids, cutoff=None):
+        # breadth first, returns node id -> distance in visiting order
+        distances = {self.get_node_id(node): 0}
+        level = [self.get_node_id(node)]
+        depth = 0
+        while level and (cutoff is None or depth < cutoff):
+            depth += 1
+            next_level = []
+            for node_id in level:
+                for neighbor_id in get_neighbor_ids(node_id):
+                    if neighbor_id not in distances:
+                        distances[neighbor_id] = depth
+                        next_level.append(neighbor_id)
+            level = next_level
+        return distances
+
+    def descendants(self, node):
+        names = self._names
+        node_id = self.get_node_id(node)
+        return {
+            names[other_id]
+            for other_id in self._walk(node, self.get_successor_ids)
+            if other_id != node_id
+        }
+
+    def ancestors(self, node):
+        names = self._names
+        node_id = self.get_node_id(node)
+        return {
+            names[other_id]
+            for other_id in self._walk(node, self.get_predecessor_ids)
+            if other_id != node_id
+        }
+
+    def ego_graph(self, node, radius=1):
+        # same nodes as nx.ego_graph: everything reachable within radius
+        names = self._names
+        return self.subgraph(
+            names[node_id]
+            for node_id in self._walk(node, self.get_successor_ids, cutoff=radius)
+        )
+
+    def subgraph(self, nodes):
+        return CompactSubgraph(self, nodes)
+
+    def get_condensation(self):
+        # strongly connected components (iterative tarjan) in topological
+        # order, returns the component index of every node id and the member
+        # ids of every component
+        num_nodes = len(self._names)
+        offsets, targets = self._out_offsets, self._out_targets
+        order = [-1] * num_nodes
+        low = [0] * num_nodes
+        on_stack = bytearray(num_nodes)
+        stack = []
+        components = []
+        counter = 0
+        for root_id in range(num_nodes):
+            if order[root_id] != -1:
+                continue
+            order[root_id] = low[root_id] = counter
+            counter += 1
+            stack.append(root_id)
+            on_stack[root_id] = 1
+            work = [[root_id, offsets[root_id]]]
+            while work:
+                entry = work[-1]
+                node_id, position = entry
+                if position < offsets[node_id + 1]:
+                    entry[1] += 1
+                    child_id = targets[position]
+                    if order[child_id] == -1:
+                        order[child_id] = low[child_id] = counter
+                        counter += 1
+                        stack.append(child_id)
+                        on_stack[child_id] = 1
+                        work.append([child_id, offsets[child_id]])
+                    elif on_stack[child_id]:
+                        low[node_id] = min(low[node_id], order[child_id])
+                    continue
+
+                work.pop()
+                if work:
+                    parent_id = work[-1][0]
+                    low[parent_id] = min(low[parent_id], low[node_id])
+                if low[node_id] == order[node_id]:
+                    members = []
+                    while True:
+                        member_id = stack.pop()
+                        on_stack[member_id] = 0
+                        members.append(member_id)
+                        if member_id == node_id:
+                            break
+                    components.append(members)
+
+        # tarjan completes a component after every component it reaches
+        components.reverse()
+        component_of = [0] * num_nodes
+        for component_id, members in enumerate(components):
+            for member_id in members:
+                component_of[member_id] = component_id
+        return component_of, components
+
+    def get_parts(self):
+        # the constructor arguments, e.g. to write the graph to a snapshot
+        return {
+            "names": self._names,
+            "out_offsets": self._out_offsets,
+            "out_targets": self._out_targets,
+            "in_offsets": self._in_offsets,
+            "in_sources": self._in_sources,
+            "in_edges": self._in_edges,
+            "node_columns": self._node_columns,
+            "edge_columns": self._edge_columns,
+            "values": self._values,
+            "graph_attrs": self.graph,
+        }
+
+    def __getstate__(self):
+        # the name index is rebuilt on first use. graphs read from a snapshot
+        # are backed by the mapped file, pickles get copies of its contents
+        state = self.__dict__.copy()
+        state["_index"] = None
+        for key, value in state.items():
+            if isinstance(value, dict):
+                state[key] = {
+                    attr: _copy_array(column) for attr, column in value.items()
+                }
+            else:
+                state[key] = _copy_array(value)
+        state["_names"] = list(self._names)
+        state["_values"] = list(self._values)
+        return state
+
+
+class CompactSubgraph:
+    # induced subgraph view of a compact graph. nodes and edges come out in the
+    # same order as from a networkx subgraph view, so serializing either gives
+    # the same elements
+
+    def __init__(self, graph, nodes):
+        self._graph = graph
+        index = graph._get_index()
+        # built like networkx builds its node filter, set iteration order
+        # depends on how the set was filled
+        keep = set(node for node in nodes if node in index)
+        self._keep = keep
+        if 2 * len(keep) < len(graph):
+            self._node_ids = [index[node] for node in keep]
+        else:
+            self._node_ids = [
+                node_id for node_id, name in enumerate(graph._names) if name in keep
+            ]
+        self._id_set = set(self._node_ids)
+
+    def _iter_edge_items(self):
+        offsets, targets = self._graph._out_offsets, self._graph._out_targets
+        id_set = self._id_set
+        for parent_id in self._node_ids:
+            for edge_id in range(offsets[parent_id], offsets[parent_id + 1]):
+                if targets[edge_id] in id_set:
+                    yield parent_id, targets[edge_id], edge_id
+
+    def nodes(self, data=False, default=None):
+        if data is False:
+            return [self._graph._names[node_id] for node_id in self._node_ids]
+        return self._graph._iter_node_data(self._node_ids, data, default)
+
+    def edges(self, data=False, default=None):
+        return self._graph._iter_edges(self._iter_edge_items(), data, default)
+
+    def __contains__(self, node):
+        node_id = self._graph._get_index().get(node)
+        return node_id is not None and node_id in self._id_set
+
+    def __iter__(self):
+        return iter(self.nodes())
+
+    def __len__(self):
+        return len(self._node_ids)
+
+    def number_of_nodes(self):
+        return len(self._node_ids)
+
+    def number_of_edges(self):
+        return sum(1 for _ in self._iter_edge_items())
+
+    def to_networkx(self):
+        graph = nx.DiGraph()
+        graph.add_nodes_from(self.nodes(data=True))
+        graph.add_edges_from(self.edges(data=True))
+        return graph
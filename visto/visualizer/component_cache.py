@@ -0,0 +1,66 @@
+import pickle
+from collections import OrderedDict
+from hashlib import sha256
+from threading import Lock
+
+
+def get_component_signature(subgraph, salt=""):
+    # a component is identified by its node ids and rel_ids, it only has to be
+    # rebuilt once one of its labels, relationships or roles changed. edges
+    # added by the build get new rel_ids every time so only their ends count
+    digest = sha256(salt.encode())
+    for node_id, data in sorted(subgraph.nodes(data=True)):
+        digest.update(
+            f"n|{node_id}|{data['content']}|{data.get('is_component')}\n".encode()
+        )
+    edges = sorted(
+        (
+            parent_id,
+            child_id,
+            data["rel"],
+            "" if data.get("generated") else data["rel_id"],
+        )
+        for parent_id, child_id, data in subgraph.edges(data=True)
+    )
+    for parent_id, child_id, rel, rel_id in edges:
+        digest.update(f"e|{parent_id}|{child_id}|{rel}|{rel_id}\n".encode())
+    return digest.hexdigest()
+
+
+class ComponentCache:
+    # built components (root node id and ontologies) keyed by their signature,
+    # entries are kept pickled: the secondary pass modifies the root ontologies,
+    # so every build needs its own copy
+
+    def __init__(self, max_entries=1024):
+        self._components = OrderedDict()
+        self._max_entries = max_entries
+        self._lock = Lock()
+
+    def get(self, signature):
+        with self._lock:
+            data = self._components.get(signature)
+            if data is None:
+                return None
+            self._components.move_to_end(signature)
+        return pickle.loads(data)
+
+    def put(self, signature, component):
+        data = pickle.dumps(component, protocol=pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self._components[signature] = data
+            self._components.move_to_end(signature)
+            while len(self._components) > self._max_entries:
+                self._components.popitem(last=False)
+
+    def invalidate(self):
+        with self._lock:
+            self._components.clear()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._components)
+
+
+# process-wide cache shared by the uploads of the app
+component_cache = ComponentCache()
@@ -17,6 +17,30 @@ no_node_modal = html.Div(
     ]
 )
 
+expired_graph_modal = html.Div(
+    [
+        dbc.Modal(
+            [
+                dbc.ModalHeader(dbc.ModalTitle("Graph Expired")),
+                dbc.ModalBody(
+                    "The graph of this import is no longer available on the server. "
+                    "Please import the diagram again."
+                ),
+                dbc.ModalFooter(
+                    dbc.Button(
+                        "Close",
+                        id="expired-graph-close",
+                        className="ms-auto",
+                        n_clicks=0,
+                    )
+                ),
+            ],
+            id="expired-graph-modal",
+            is_open=False,
+        ),
+    ]
+)
+
 navbar = dbc.NavbarSimple(
     children=[
         dbc.DropdownMenu(
@@ -53,4 +77,30 @@ navbar = dbc.NavbarSimple(
     color="light",
     dark=False,
     links_left=True,
-)
\ No newline at end of file
+)
+
+build_progress = html.Div(
+    [
+        dbc.Row(
+            [
+                dbc.Col(html.Small(id="build-progress-label"), width="auto"),
+                dbc.Col(dbc.Progress(id="build-progress", value=0)),
+                dbc.Col(
+                    dbc.Button(
+                        "Cancel",
+                        id="build-cancel",
+                        size="sm",
+                        color="secondary",
+                        n_clicks=0,
+                    ),
+                    width="auto",
+                ),
+            ],
+            align="center",
+            className="m-2",
+        ),
+        dcc.Interval(id="build-interval", interval=500, disabled=True),
+    ],
+    id="build-progress-area",
+    style={"display": "none"},
+)
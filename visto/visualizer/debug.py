@@ -0,0 +1,21 @@
+import matplotlib.pyplot as plt
+import networkx as nx
+
+
+def visualize_graph(graph):
+    # visualize the network for debugging
+    plt.figure(figsize=(8, 8))
+    pos = nx.planar_layout(graph)
+    labels = nx.get_node_attributes(graph, "content")
+    nx.draw(
+        graph,
+        pos,
+        labels=labels,
+        with_labels=True,
+        node_color="skyblue",
+        node_size=100,
+        edge_color="grey",
+        font_size=8,
+        font_color="black",
+    )
+    plt.show()
@@ -0,0 +1,42 @@
+import networkx as nx
+
+from visto.visualizer.compact_graph import CompactGraph
+
+
+def get_display_graphs(root_ontologies):
+    # only get the first subtree for debugging
+    root_ontology = list(root_ontologies.values())[0]
+    experiment_graph = root_ontology.get_graph()
+    # get all the linked nodes
+    linked_nodes = {
+        (parent, child)
+        for parent, child, data in experiment_graph.edges(data=True)
+        if data["rel"] == "pmd:resource"
+    }
+    # delete child nodes of this relationship for better viewing
+    to_remove = {child for (parent, child) in linked_nodes}
+    new_node_values = {parent: child for parent, child in linked_nodes}
+    linked_nodes = {parent for (parent, child) in linked_nodes}
+
+    experiment_graph.remove_nodes_from(to_remove)
+    nx.set_node_attributes(experiment_graph, new_node_values, "resource")
+
+    # only get the instance variables for display
+    var_only_graph = experiment_graph.subgraph(
+        [node for node in experiment_graph if ":" not in node or node.startswith("ex:")]
+    )
+
+    return {
+        "experiment_graph": experiment_graph,
+        "var_only_graph": var_only_graph,
+        "linked_nodes": linked_nodes,
+        "term_ref": dict(root_ontology.get_term_ref()),
+    }
+
+
+def freeze_display_graphs(display_graphs):
+    # the app only queries the graphs, freeze them into the compact form
+    return {
+        key: CompactGraph.from_networkx(value) if isinstance(value, nx.Graph) else value
+        for key, value in display_graphs.items()
+    }
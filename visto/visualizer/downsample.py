@@ -0,0 +1,156 @@
+import numpy as np
+
+MAX_PLOT_POINTS = 4000
+
+
+def as_numeric(values):
+    # float view of a column for the decimation geometry, missing entries are nan
+    import pandas as pd
+
+    if isinstance(values, pd.Categorical):
+        codes = values.codes.astype(np.float64)
+        codes[values.codes < 0] = np.nan
+        return codes
+
+    values = np.asarray(values)
+    if np.issubdtype(values.dtype, np.datetime64):
+        numeric = values.view(np.int64).astype(np.float64)
+        numeric[np.isnat(values)] = np.nan
+        return numeric
+    if np.issubdtype(values.dtype, np.number) or values.dtype == bool:
+        return values.astype(np.float64, copy=False)
+    # other text is spaced by its position
+    return np.arange(len(values), dtype=np.float64)
+
+
+def min_max(x, y, num_points):
+    # indices of the minimum and maximum of each bucket, in x order, keeps the
+    # envelope of the signal (spikes) at the cost of a jagged line
+    num_rows = len(y)
+    if num_rows <= num_points:
+        return np.arange(num_rows)
+
+    num_buckets = max(num_points // 2, 1)
+    bucket_size = num_rows // num_buckets
+    num_full = num_buckets * bucket_size
+    buckets = y[:num_full].reshape(num_buckets, bucket_size)
+    offsets = np.arange(num_buckets) * bucket_size
+    # treat nan as neither a minimum nor a maximum
+    min_idx = np.argmin(np.where(np.isnan(buckets), np.inf, buckets), axis=1) + offsets
+    max_idx = np.argmax(np.where(np.isnan(buckets), -np.inf, buckets), axis=1) + offsets
+
+    indices = [min_idx, max_idx]
+    if num_full < num_rows:
+        tail = y[num_full:]
+        if not np.isnan(tail).all():
+            indices.append(
+                np.array([np.nanargmin(tail), np.nanargmax(tail)]) + num_full
+            )
+        else:
+            indices.append(np.array([num_full]))
+    indices = np.unique(np.concatenate(indices))
+    # always keep the end points so that the full range stays visible
+    return np.union1d(indices, [0, num_rows - 1])
+
+
+def get_bucket_means(values, bounds):
+    # nan-aware mean of each [bounds[i], bounds[i + 1]) segment
+    present = ~np.isnan(values)
+    sums = np.add.reduceat(np.where(present, values, 0.0), bounds[:-1])
+    counts = np.add.reduceat(present, bounds[:-1])
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return sums / counts
+
+
+def lttb(x, y, num_points):
+    # largest triangle three buckets: keeps the visual shape of the line with
+    # one point per bucket, the first and last points are always kept
+    num_rows = len(y)
+    if num_points >= num_rows:
+        return np.arange(num_rows)
+    if num_points < 3:
+        return np.array([0, num_rows - 1])
+
+    # num_points - 2 inner buckets followed by a bucket holding the last point
+    bounds = np.append(
+        np.linspace(1, num_rows - 1, num_points - 1).astype(np.int64), num_rows
+    )
+    x_means = get_bucket_means(x, bounds)
+    y_means = get_bucket_means(y, bounds)
+
+    indices = np.empty(num_points, dtype=np.int64)
+    indices[0] = 0
+    indices[-1] = num_rows - 1
+    selected = 0
+    for bucket in range(num_points - 2):
+        start, end = bounds[bucket], bounds[bucket + 1]
+        next_x, next_y = x_means[bucket + 1], y_means[bucket + 1]
+        prev_x, prev_y = x[selected], y[selected]
+        areas = np.abs(
+            (prev_x - next_x) * (y[start:end] - prev_y)
+            - (prev_x - x[start:end]) * (next_y - prev_y)
+        )
+        # nan points never win a bucket unless the whole bucket is nan
+        selected = start + int(np.argmax(np.nan_to_num(areas, nan=-1.0)))
+        indices[bucket + 1] = selected
+
+    return indices
+
+
+DOWNSAMPLERS = {
+    "lttb": lttb,
+    "minmax": min_max,
+}
+
+
+def get_range_indices(x, x_min, x_max):
+    # positions of the rows within [x_min, x_max]
+    values = np.asarray(x)
+    if np.issubdtype(values.dtype, np.datetime64):
+        # compare the raw nanoseconds, this avoids a float copy of the column
+        values = values.view(np.int64)
+    elif not (np.issubdtype(values.dtype, np.number) or values.dtype == bool):
+        values = as_numeric(x)
+
+    # NaT is the smallest int64, so it also ends up here
+    is_sorted = len(values) < 2 or bool((values[1:] >= values[:-1]).all())
+    if is_sorted and not (values.dtype.kind == "f" and np.isnan(values).any()):
+        start, end = 0, len(values)
+        if values.dtype.kind in "iu":
+            # a float key would make searchsorted cast the whole column, keys
+            # beyond the integer range select everything on that side
+            info = np.iinfo(values.dtype)
+            x_min, x_max = np.ceil(x_min), np.floor(x_max)
+            if x_min > info.min:
+                start = np.searchsorted(values, values.dtype.type(x_min), side="left")
+            if x_max < info.max:
+                end = np.searchsorted(values, values.dtype.type(x_max), side="right")
+        else:
+            start = np.searchsorted(values, x_min, side="left")
+            end = np.searchsorted(values, x_max, side="right")
+        return np.arange(start, max(start, end))
+    return np.flatnonzero((values >= x_min) & (values <= x_max))
+
+
+def downsample(x, y, method="lttb", num_points=MAX_PLOT_POINTS, indices=None):
+    # returns the row positions to plot, optionally restricted to a subset
+    # (e.g. the visible range) given by sorted row positions
+    if method not in DOWNSAMPLERS:
+        raise ValueError(
+            f"Unknown downsampling method {method}. Please choose one of {', '.join(DOWNSAMPLERS)}."
+        )
+
+    offset = 0
+    if indices is not None:
+        if len(indices) and indices[-1] - indices[0] + 1 == len(indices):
+            # contiguous ranges can be sliced without copying
+            offset = indices[0]
+            x, y = x[offset : indices[-1] + 1], y[offset : indices[-1] + 1]
+            indices = None
+        else:
+            x, y = x[indices], y[indices]
+
+    positions = DOWNSAMPLERS[method](as_numeric(x), as_numeric(y), num_points)
+    if indices is not None:
+        return indices[positions]
+    return offset + positions
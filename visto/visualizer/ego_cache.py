@@ -0,0 +1,97 @@
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+
+from visto.visualizer.serializers import serialize_graph
+
+
+def generate_ego_elements(graphs, node, radius=2, show_types=False):
+    experiment_graph = graphs["experiment_graph"]
+    var_only_graph = graphs["var_only_graph"]
+
+    ego_graph = var_only_graph.ego_graph(node, radius=radius)
+    if show_types:
+        ego_graph = experiment_graph.subgraph(
+            graphs["rank_index"].add_type_nodes(ego_graph.nodes())
+        )
+
+    elements = serialize_graph(
+        ego_graph, graphs["linked_nodes"], node_ids=graphs.get("node_ids")
+    )
+    for element in elements:
+        element["data"]["chosen"] = element["data"]["label"] == node
+    return elements
+
+
+class EgoCache:
+    # serialized neighborhoods keyed by (graph id, node, radius, show types),
+    # a graph id identifies one immutable version of the uploaded graphs so
+    # entries never have to be updated, only evicted
+
+    def __init__(self, max_entries=2048):
+        self._elements = OrderedDict()
+        self._max_entries = max_entries
+        self._active = set()
+        self._lock = Lock()
+        self._executor = None
+
+    def get_elements(self, graph_id, graphs, node, radius=2, show_types=False):
+        # the returned elements are shared, callers must not modify them
+        key = (graph_id, node, radius, show_types)
+        with self._lock:
+            elements = self._elements.get(key)
+            if elements is not None:
+                self._elements.move_to_end(key)
+                return elements
+
+        elements = generate_ego_elements(
+            graphs, node, radius=radius, show_types=show_types
+        )
+
+        with self._lock:
+            self._elements[key] = elements
+            while len(self._elements) > self._max_entries:
+                self._elements.popitem(last=False)
+
+        return elements
+
+    def _precompute(self, graph_id, graphs, nodes, radius):
+        for node in nodes:
+            # stop early once the graph has been evicted from the graph store
+            with self._lock:
+                if graph_id not in self._active:
+                    return
+            self.get_elements(graph_id, graphs, node, radius=radius)
+
+    def precompute(self, graph_id, graphs, num_nodes, radius=2):
+        # warm the cache for the most connected nodes on a background thread
+        if num_nodes <= 0:
+            return None
+
+        var_only_graph = graphs["var_only_graph"]
+        nodes = sorted(var_only_graph.nodes(), key=var_only_graph.degree, reverse=True)[
+            :num_nodes
+        ]
+
+        with self._lock:
+            self._active.add(graph_id)
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=1)
+            executor = self._executor
+
+        return executor.submit(self._precompute, graph_id, graphs, nodes, radius)
+
+    def invalidate(self, graph_id=None):
+        with self._lock:
+            if graph_id is None:
+                self._active.clear()
+                self._elements.clear()
+                return
+
+            self._active.discard(graph_id)
+            for key in [key for key in self._elements if key[0] == graph_id]:
+                del self._elements[key]
+
+
+# process-wide cache shared by the app callbacks
+ego_cache = EgoCache()
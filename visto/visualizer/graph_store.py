@@ -0,0 +1,236 @@
+import os
+import pickle
+from collections import OrderedDict
+from os import path
+from threading import Lock
+from uuid import uuid4
+
+# bump whenever the layout of the stored entries changes, older spilled
+# entries are then ignored
+GRAPH_STORE_VERSION = 2
+
+
+def get_entry_size(entry):
+    # approximate the memory footprint by the number of graph elements
+    size = 0
+    for value in entry.values():
+        if hasattr(value, "number_of_edges"):
+            # networkx and compact graphs
+            size += value.number_of_nodes() + value.number_of_edges()
+        elif hasattr(value, "__len__"):
+            size += len(value)
+        else:
+            size += 1
+    return size
+
+
+class GraphStore:
+    # keeps the graphs of each upload on the server so that callbacks only
+    # exchange a graph id with the browser. entries are evicted from memory in
+    # least recently used order. with a spill directory, every entry is also
+    # written to disk when it is put, so that other processes and restarts can
+    # still serve it. the loader is asked for entries that are in neither
+
+    def __init__(
+        self, max_entries=8, max_size=2_000_000, spill_dir=None, max_spilled=256
+    ):
+        self._entries = OrderedDict()
+        self._sizes = dict()
+        self._size = 0
+        self._max_entries = max_entries
+        self._max_size = max_size
+        self._max_spilled = max_spilled
+        self._spill_dir = None
+        self._evict_callbacks = []
+        self._loader = None
+        self._lock = Lock()
+
+        if spill_dir is not None:
+            self.set_spill_dir(spill_dir)
+
+    def _get_spill_path(self, graph_id):
+        return path.join(
+            self.get_spill_dir(), f"{graph_id}.v{GRAPH_STORE_VERSION}.pickle"
+        )
+
+    def _spill(self, graph_id, entry):
+        if self.get_spill_dir() is None:
+            return
+
+        spill_path = self._get_spill_path(graph_id)
+        temp_path = f"{spill_path}.{os.getpid()}.tmp"
+        try:
+            with open(temp_path, "wb") as f:
+                pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_path, spill_path)
+        except OSError:
+            # the spill tier is best-effort, the entry is then only in memory
+            if path.exists(temp_path):
+                os.remove(temp_path)
+            return
+        self._prune_spilled()
+
+    def _prune_spilled(self):
+        # drop the least recently used files, shared by all processes
+        suffix = f".v{GRAPH_STORE_VERSION}.pickle"
+        spill_dir = self.get_spill_dir()
+        try:
+            spill_paths = [
+                path.join(spill_dir, file)
+                for file in os.listdir(spill_dir)
+                if file.endswith(suffix)
+            ]
+            if len(spill_paths) <= self._max_spilled:
+                return
+            spill_paths.sort(key=lambda spill_path: os.stat(spill_path).st_mtime_ns)
+            for spill_path in spill_paths[: len(spill_paths) - self._max_spilled]:
+                os.remove(spill_path)
+        except OSError:
+            # another process removed files in the meantime
+            pass
+
+    def _load_spilled(self, graph_id):
+        if self.get_spill_dir() is None:
+            return None
+
+        spill_path = self._get_spill_path(graph_id)
+        if not path.exists(spill_path):
+            return None
+
+        try:
+            with open(spill_path, "rb") as f:
+                entry = pickle.load(f)
+            # mark the file as recently used for pruning
+            os.utime(spill_path)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None
+        return entry
+
+    def _remove_spilled(self, graph_id):
+        if self.get_spill_dir() is None:
+            return
+        try:
+            os.remove(self._get_spill_path(graph_id))
+        except OSError:
+            pass
+
+    def _insert(self, graph_id, entry):
+        # must be called with the lock held, returns the evicted entries
+        if graph_id in self._entries:
+            self._size -= self._sizes.pop(graph_id)
+            del self._entries[graph_id]
+
+        size = get_entry_size(entry)
+        self._entries[graph_id] = entry
+        self._sizes[graph_id] = size
+        self._size += size
+
+        evicted = []
+        # always keep the newest entry, even if it exceeds the budget on its own
+        while len(self._entries) > 1 and (
+            len(self._entries) > self._max_entries
+            or (self._max_size is not None and self._size > self._max_size)
+        ):
+            evicted_id, evicted_entry = self._entries.popitem(last=False)
+            self._size -= self._sizes.pop(evicted_id)
+            evicted.append((evicted_id, evicted_entry))
+        return evicted
+
+    def _evict(self, evicted):
+        # called without the lock held, the callbacks may use the store
+        for evicted_id, evicted_entry in evicted:
+            if self.get_spill_dir() is not None and not path.exists(
+                self._get_spill_path(evicted_id)
+            ):
+                # the write on put failed or the file was pruned since
+                self._spill(evicted_id, evicted_entry)
+            for callback in self._evict_callbacks:
+                callback(evicted_id)
+
+    def put(self, entry, graph_id=None):
+        if graph_id is None:
+            graph_id = uuid4().hex
+
+        self._spill(graph_id, entry)
+        with self._lock:
+            evicted = self._insert(graph_id, entry)
+        self._evict(evicted)
+
+        return graph_id
+
+    def get(self, graph_id):
+        if graph_id is None:
+            return None
+
+        with self._lock:
+            entry = self._entries.get(graph_id)
+            if entry is not None:
+                self._entries.move_to_end(graph_id)
+                return entry
+
+        entry = self._load_spilled(graph_id)
+        if entry is None:
+            if self._loader is None:
+                return None
+            entry = self._loader(graph_id)
+            if entry is None:
+                return None
+            self.put(entry, graph_id=graph_id)
+            return entry
+
+        # promote the spilled entry back to memory, the file is kept
+        with self._lock:
+            evicted = self._insert(graph_id, entry)
+        self._evict(evicted)
+
+        return entry
+
+    def discard(self, graph_id):
+        with self._lock:
+            if graph_id in self._entries:
+                self._size -= self._sizes.pop(graph_id)
+                del self._entries[graph_id]
+        self._remove_spilled(graph_id)
+        for callback in self._evict_callbacks:
+            callback(graph_id)
+
+    def set_loader(self, loader):
+        # loader(graph_id) returns the entry from another source, e.g. a
+        # prebuilt snapshot, or None when the graph id is unknown there too
+        self._loader = loader
+
+    def add_evict_callback(self, callback):
+        # called with the graph id whenever an entry leaves memory, i.e. it is
+        # evicted to the spill tier or discarded
+        self._evict_callbacks.append(callback)
+
+    def __contains__(self, graph_id):
+        with self._lock:
+            if graph_id in self._entries:
+                return True
+        return self.get_spill_dir() is not None and path.exists(
+            self._get_spill_path(graph_id)
+        )
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def get_size(self):
+        with self._lock:
+            return self._size
+
+    def get_spill_dir(self):
+        return self._spill_dir
+
+    def set_spill_dir(self, spill_dir):
+        if spill_dir:
+            try:
+                os.makedirs(spill_dir, exist_ok=True)
+            except OSError:
+                spill_dir = None
+        self._spill_dir = spill_dir or None
+
+
+# process-wide store shared by the app callbacks
+graph_store = GraphStore()
@@ -0,0 +1,131 @@
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from threading import Event, Lock
+from uuid import uuid4
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class Job:
+    # one queued call, the call receives the progress method of its job and
+    # is aborted at its next progress report once the job is cancelled
+
+    def __init__(self, job_id):
+        self.job_id = job_id
+        self._state = "queued"
+        self._phase = None
+        self._done = 0
+        self._total = 0
+        self._result = None
+        self._error = None
+        self._cancelled = Event()
+        self._lock = Lock()
+
+    def progress(self, phase, done, total):
+        if self._cancelled.is_set():
+            raise JobCancelled(self.job_id)
+        with self._lock:
+            self._phase = phase
+            self._done = done
+            self._total = total
+
+    def cancel(self):
+        self._cancelled.set()
+        with self._lock:
+            if self._state == "queued":
+                self._state = "cancelled"
+
+    def is_cancelled(self):
+        return self._cancelled.is_set()
+
+    def is_finished(self):
+        with self._lock:
+            return self._state in ("done", "failed", "cancelled")
+
+    def get_result(self):
+        return self._result
+
+    def get_status(self):
+        with self._lock:
+            return {
+                "job_id": self.job_id,
+                "state": self._state,
+                "phase": self._phase,
+                "done": self._done,
+                "total": self._total,
+                "error": self._error,
+            }
+
+    def _run(self, func, args, kwargs):
+        with self._lock:
+            if self._state != "queued":
+                return
+            self._state = "running"
+
+        try:
+            result = func(*args, progress=self.progress, **kwargs)
+        except JobCancelled:
+            state, result, error = "cancelled", None, None
+        except Exception as e:
+            state, result, error = "failed", None, str(e) or type(e).__name__
+        else:
+            state, error = "done", None
+            if self._cancelled.is_set():
+                # finished before the cancellation was noticed
+                state, result = "cancelled", None
+
+        with self._lock:
+            self._state = state
+            self._result = result
+            self._error = error
+
+
+class JobRunner:
+    # runs calls on a local thread pool and keeps their status around so that
+    # callbacks can poll it by job id, finished jobs are evicted oldest first
+
+    def __init__(self, max_workers=2, max_jobs=64):
+        self._jobs = OrderedDict()
+        self._max_workers = max_workers
+        self._max_jobs = max_jobs
+        self._executor = None
+        self._lock = Lock()
+
+    def submit(self, func, *args, **kwargs):
+        job = Job(uuid4().hex)
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self._max_workers)
+            self._jobs[job.job_id] = job
+            finished = [
+                job_id
+                for job_id, curr_job in self._jobs.items()
+                if curr_job.is_finished()
+            ]
+            for job_id in finished[: max(len(self._jobs) - self._max_jobs, 0)]:
+                del self._jobs[job_id]
+            executor = self._executor
+
+        executor.submit(job._run, func, args, kwargs)
+        return job.job_id
+
+    def get_job(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id):
+        job = self.get_job(job_id)
+        if job is not None:
+            job.cancel()
+
+    def discard(self, job_id):
+        with self._lock:
+            job = self._jobs.pop(job_id, None)
+        if job is not None:
+            job.cancel()
+
+
+# process-wide runner shared by the app callbacks
+job_runner = JobRunner()
@@ -0,0 +1,58 @@
+import re
+from functools import lru_cache
+
+# a complete start or end tag, quoted attribute values may hold any character
+TAG_PATTERN = re.compile(
+    r"""<[a-zA-Z][^\s/>]*"""
+    r"""(?:\s+[^\s"'>/=]+(?:\s*=\s*(?:"[^"]*"|'[^']*'|[^\s"'>]+))?)*\s*/?>"""
+    r"""|</[a-zA-Z][^\s/>]*\s*>"""
+)
+# elements whose content html.parser does not read as markup or whose
+# whitespace bs4 keeps as is
+SPECIAL_TAG_PATTERN = re.compile(
+    r"<\s*/?\s*(script|style|textarea|title|pre)\b", re.IGNORECASE
+)
+# the entities that html.parser and bs4 resolve to a single known character
+ENTITIES = {
+    "&amp;": "&",
+    "&lt;": "<",
+    "&gt;": ">",
+    "&quot;": '"',
+    "&nbsp;": "\xa0",
+}
+ENTITY_PATTERN = re.compile("|".join(ENTITIES))
+ASCII_SPACES = " \n\t\f\r"
+
+
+def _get_label_text_bs4(text):
+    # only the labels the fast path cannot handle need bs4
+    from bs4 import BeautifulSoup as bs
+
+    return bs(text, "html.parser").get_text()
+
+
+def _get_segment_text(segment):
+    if "&" in segment:
+        segment = ENTITY_PATTERN.sub(lambda match: ENTITIES[match.group()], segment)
+    # bs4 reduces strings of only whitespace to a single newline or space
+    if segment and not segment.strip(ASCII_SPACES):
+        return "\n" if "\n" in segment else " "
+    return segment
+
+
+@lru_cache(maxsize=65536)
+def get_label_text(text):
+    # same text as bs4's html.parser get_text, diagram labels only use a few
+    # simple tags, anything else is handed to bs4
+    if "<" not in text and "&" not in text:
+        return _get_segment_text(text)
+
+    segments = TAG_PATTERN.split(text)
+    for segment in segments:
+        if "<" in segment or (
+            "&" in segment and ENTITY_PATTERN.sub("", segment).count("&")
+        ):
+            return _get_label_text_bs4(text)
+    if SPECIAL_TAG_PATTERN.search(text):
+        return _get_label_text_bs4(text)
+    return "".join(_get_segment_text(segment) for segment in segments)
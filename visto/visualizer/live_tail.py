@@ -0,0 +1,217 @@
+import csv
+import io
+import os
+import time
+from threading import Lock
+from uuid import uuid4
+
+import numpy as np
+
+from visto.visualizer.column_cache import COLUMN_DTYPES, convert_values, get_column_kind
+
+TAIL_BLOCK_SIZE = 1 << 20
+# seconds after which a tail that is no longer read is dropped, e.g. when the
+# browser tab was closed while the live mode was on
+LIVE_TAIL_TTL = 600
+
+
+def find_tail_offset(f, start, end, num_lines):
+    # offset of the first of the last num_lines lines between start and end
+    position = end
+    num_newlines = 0
+    while position > start:
+        block_start = max(start, position - TAIL_BLOCK_SIZE)
+        f.seek(block_start)
+        block = f.read(position - block_start)
+        newline_idx = len(block)
+        while True:
+            newline_idx = block.rfind(b"\n", 0, newline_idx)
+            if newline_idx == -1:
+                break
+            num_newlines += 1
+            # the newline that ends the preceding line marks the start
+            if num_newlines > num_lines:
+                return block_start + newline_idx + 1
+        position = block_start
+    return start
+
+
+class RingBuffer:
+    # fixed-size buffer that keeps the most recent values of a column
+
+    def __init__(self, capacity, dtype):
+        self._values = np.empty(capacity, dtype=dtype)
+        self._start = 0
+        self._size = 0
+
+    def extend(self, values):
+        capacity = len(self._values)
+        values = np.asarray(values, dtype=self._values.dtype)[-capacity:]
+        num_values = len(values)
+        if not num_values:
+            return
+
+        end = (self._start + self._size) % capacity
+        num_first = min(num_values, capacity - end)
+        self._values[end : end + num_first] = values[:num_first]
+        self._values[: num_values - num_first] = values[num_first:]
+
+        num_dropped = max(self._size + num_values - capacity, 0)
+        self._start = (self._start + num_dropped) % capacity
+        self._size = min(self._size + num_values, capacity)
+
+    def get_values(self):
+        capacity = len(self._values)
+        end = self._start + self._size
+        if end <= capacity:
+            return self._values[self._start : end].copy()
+        return np.concatenate(
+            (self._values[self._start :], self._values[: end - capacity])
+        )
+
+    def get_capacity(self):
+        return len(self._values)
+
+    def __len__(self):
+        return self._size
+
+
+class LiveTail:
+    # follows a growing csv file: only the bytes appended since the last read
+    # are parsed, and the most recent samples of the followed columns are kept
+    # in ring buffers. rows are split on newlines, so quoted fields must not
+    # contain line breaks
+
+    def __init__(self, source_path, indices, capacity=10_000):
+        self._source_path = source_path
+        self._indices = list(dict.fromkeys(indices))
+        self._capacity = capacity
+        self._lock = Lock()
+        self._names = None
+        self._data_offset = None
+        self._offset = None
+        self._kinds = None
+        self._buffers = None
+        self._last_used = time.monotonic()
+
+    def _read_header(self, f):
+        f.seek(0)
+        header = f.readline()
+        if not header.endswith(b"\n"):
+            # the header itself is still being written
+            return False
+        self._names = next(csv.reader([header.decode("utf-8-sig").strip("\r\n")]))
+        self._data_offset = f.tell()
+        return True
+
+    def _reset(self, f, size):
+        # start over from the last rows of the file, e.g. after truncation
+        self._kinds = None
+        self._buffers = None
+        self._offset = find_tail_offset(f, self._data_offset, size, self._capacity)
+
+    def _parse(self, data):
+        import pandas as pd
+
+        usecols = sorted(self._indices)
+        df = pd.read_csv(
+            io.BytesIO(data),
+            header=None,
+            names=self._names,
+            usecols=usecols,
+        )
+        columns = {idx: df.iloc[:, pos] for pos, idx in enumerate(usecols)}
+
+        if self._kinds is None:
+            # the first rows decide the kind of each column, as in the column cache
+            self._kinds = {
+                idx: get_column_kind(values) for idx, values in columns.items()
+            }
+            self._buffers = {
+                idx: RingBuffer(
+                    self._capacity,
+                    object if kind == "category" else COLUMN_DTYPES[kind],
+                )
+                for idx, kind in self._kinds.items()
+            }
+
+        return {
+            idx: convert_values(values, self._kinds[idx])
+            for idx, values in columns.items()
+        }
+
+    def read(self):
+        # returns the newly appended values of each followed column, or None
+        # when no complete row was appended since the last read
+        with self._lock:
+            self._last_used = time.monotonic()
+            with open(self._source_path, "rb") as f:
+                if self._names is None and not self._read_header(f):
+                    return None
+
+                size = os.fstat(f.fileno()).st_size
+                if self._offset is None or size < self._offset:
+                    self._reset(f, size)
+
+                f.seek(self._offset)
+                data = f.read(size - self._offset)
+
+            # keep an incomplete last row for the next read
+            end = data.rfind(b"\n") + 1
+            if not data[:end].strip():
+                self._offset += end
+                return None
+
+            new_values = self._parse(data[:end])
+            self._offset += end
+            for idx, values in new_values.items():
+                self._buffers[idx].extend(values)
+            return new_values
+
+    def get_name(self, idx):
+        if self._names is None:
+            return str(idx)
+        return self._names[idx]
+
+    def get_values(self, idx):
+        with self._lock:
+            if self._buffers is None:
+                return np.empty(0)
+            return self._buffers[idx].get_values()
+
+    def get_capacity(self):
+        return self._capacity
+
+    def is_idle(self, ttl):
+        return time.monotonic() - self._last_used > ttl
+
+
+_live_tails = dict()
+_live_tails_lock = Lock()
+
+
+def _drop_idle_live_tails():
+    # fallback for tails whose plot went away without stopping them
+    for tail_id, live_tail in list(_live_tails.items()):
+        if live_tail.is_idle(LIVE_TAIL_TTL):
+            del _live_tails[tail_id]
+
+
+def start_live_tail(source_path, indices, capacity=10_000):
+    live_tail = LiveTail(source_path, indices, capacity=capacity)
+    tail_id = uuid4().hex
+    with _live_tails_lock:
+        _drop_idle_live_tails()
+        _live_tails[tail_id] = live_tail
+    return tail_id, live_tail
+
+
+def get_live_tail(tail_id):
+    with _live_tails_lock:
+        _drop_idle_live_tails()
+        return _live_tails.get(tail_id)
+
+
+def stop_live_tail(tail_id):
+    with _live_tails_lock:
+        _live_tails.pop(tail_id, None)
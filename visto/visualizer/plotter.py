@@ -1,9 +1,18 @@
+import re
+from concurrent.futures import ThreadPoolExecutor
+
 import dash_bootstrap_components as dbc
-import pandas as pd
-import plotly.express as px
-from dash import Input, Output, State, callback, dcc, html
+import numpy as np
+from dash import Input, Output, Patch, State, callback, dcc, html, no_update
+
+from visto.visualizer.column_cache import column_cache
+from visto.visualizer.downsample import downsample, get_range_indices
+from visto.visualizer.graph_store import graph_store
+from visto.visualizer.live_tail import get_live_tail, start_live_tail, stop_live_tail
 
-from visto.visualizer.serializers import read_json_graph
+# samples kept per column and refresh period of the live mode
+LIVE_BUFFER_SIZE = 10_000
+LIVE_INTERVAL = 1000
 
 input_pane = html.Div(
     [
@@ -12,8 +21,30 @@ input_pane = html.Div(
             id="x-axis-select",
             options=[],
         ),
-        dbc.Label("y-axis variable"),
-        dbc.Select(id="y-axis-select", options=[]),
+        dbc.Label("y-axis variables"),
+        dcc.Dropdown(id="y-axis-select", options=[], multi=True),
+        dbc.Label("Layout"),
+        dbc.RadioItems(
+            id="plot-layout-select",
+            options=[
+                {"label": "Overlay", "value": "overlay"},
+                {"label": "Small multiples", "value": "facets"},
+            ],
+            value="overlay",
+            inline=True,
+        ),
+        dbc.Label("Downsampling"),
+        dbc.Select(
+            id="downsample-select",
+            options=[
+                {"label": "Shape (LTTB)", "value": "lttb"},
+                {"label": "Envelope (min/max)", "value": "minmax"},
+            ],
+            value="lttb",
+        ),
+        dbc.Switch(id="live-switch", label="Live", value=False, className="mt-2"),
+        dcc.Interval(id="live-interval", interval=LIVE_INTERVAL, disabled=True),
+        dcc.Store(id="live-tail-store"),
     ]
 )
 
@@ -55,19 +86,26 @@ plotter_modal = dbc.Modal(
 @callback(
     Output("x-axis-select", "options"),
     Output("y-axis-select", "options"),
+    Output("y-axis-select", "value"),
+    Output("expired-graph-modal", "is_open", allow_duplicate=True),
     Input("for-plotting-nodes-store", "data"),
-    State("experiment-graph-store", "data"),
+    State("graph-id-store", "data"),
     prevent_initial_call=True,
 )
-def update_plotter_options(nodes_for_plotting, experiment_graph):
-    experiment_graph = read_json_graph(experiment_graph)
+def update_plotter_options(nodes_for_plotting, graph_id):
+    graphs = graph_store.get(graph_id)
+    if graphs is None:
+        return no_update, no_update, no_update, graph_id is not None
+    experiment_graph = graphs["experiment_graph"]
 
     # TODO: add discovery method for finding timestamp resource
     options = [{"label": "timestamp", "value": 0}]
     for label in nodes_for_plotting:
         value = experiment_graph.nodes[label]["resource"]
         options.append({"label": label, "value": value})
-    return options, options
+    # plot every selected variable by default
+    values = [option["value"] for option in options[1:]]
+    return options, options, values, no_update
 
 
 @callback(
@@ -79,18 +117,241 @@ def toggle_plot_buton(x_axis_value, y_axis_value):
     return not (x_axis_value and y_axis_value)
 
 
+def get_axis_value(values, axis_value):
+    # convert a plotly axis position back to the units used for decimation
+    import pandas as pd
+
+    dtype = np.asarray(values).dtype
+    if np.issubdtype(dtype, np.datetime64):
+        # in the resolution of the column, e.g. datetime64[ns]
+        return float(
+            pd.Timestamp(axis_value).to_datetime64().astype(dtype).view(np.int64)
+        )
+    return float(axis_value)
+
+
+def get_plot_data(source_file_path, x_axis_value, y_axis_values, method, x_range=None):
+    # all columns are loaded together, from the memory-mapped cache or a
+    # single csv read, and each series is decimated on its own
+    import pandas as pd
+
+    # a column is only plotted once, this keeps one trace per variable
+    y_axis_values = list(dict.fromkeys(int(value) for value in y_axis_values))
+    columns = column_cache.get_columns(
+        source_file_path, [int(x_axis_value)] + y_axis_values
+    )
+    x_name, x_values = columns[0]
+
+    indices = None
+    if x_range is not None:
+        x_min, x_max = (get_axis_value(x_values, value) for value in x_range)
+        indices = get_range_indices(x_values, x_min, x_max)
+
+    def get_series(column):
+        # only send a bounded number of points to the browser
+        y_name, y_values = column
+        series_indices = downsample(x_values, y_values, method=method, indices=indices)
+        return pd.DataFrame(
+            {
+                x_name: x_values[series_indices],
+                "value": y_values[series_indices],
+                "variable": y_name,
+            }
+        )
+
+    if len(columns) > 2:
+        with ThreadPoolExecutor(max_workers=len(columns) - 1) as executor:
+            series = list(executor.map(get_series, columns[1:]))
+    else:
+        series = [get_series(column) for column in columns[1:]]
+
+    return series, x_name
+
+
+def generate_figure(series, x_name, layout="overlay"):
+    # plotly express is slow to import, load it with the first plot
+    import pandas as pd
+    import plotly.express as px
+
+    df = pd.concat(series, ignore_index=True)
+    if layout == "facets":
+        fig = px.line(
+            df,
+            x=x_name,
+            y="value",
+            color="variable",
+            facet_row="variable",
+            height=max(250 * len(series), 450),
+        )
+        # every variable keeps its own scale, the x-axis stays shared
+        fig.update_yaxes(matches=None, title_text="")
+        fig.for_each_annotation(lambda a: a.update(text=a.text.split("=")[-1]))
+    else:
+        fig = px.line(df, x=x_name, y="value", color="variable")
+    return fig
+
+
 @callback(
     Output("variable-plot", "figure"),
+    Output("live-switch", "value"),
     Input("plot-button", "n_clicks"),
     State("x-axis-select", "value"),
     State("y-axis-select", "value"),
+    State("downsample-select", "value"),
+    State("plot-layout-select", "value"),
     State("source-file-store", "data"),
     prevent_initial_call=True,
 )
-def plot(n_clicks, x_axis_value, y_axis_value, source_file_path):
-    x_axis_value = int(x_axis_value)
-    y_axis_value = int(y_axis_value)
-    df = pd.read_csv(source_file_path, usecols=[x_axis_value, y_axis_value])
-    df_cols = df.columns.tolist()
-    fig = px.line(df, x=df_cols[0], y=df_cols[-1])
-    return fig
+def plot(n_clicks, x_axis_value, y_axis_values, method, layout, source_file_path):
+    series, x_name = get_plot_data(
+        source_file_path, x_axis_value, y_axis_values, method
+    )
+    # a new plot leaves the live mode
+    return generate_figure(series, x_name, layout=layout), False
+
+
+def get_relayout_range(relayout_data):
+    # returns whether the x-axis changed and the new range (None for autorange),
+    # facets report the zoom on any of their (matching) x-axes
+    for key, value in relayout_data.items():
+        if re.fullmatch(r"xaxis\d*\.range\[0\]", key):
+            return True, (value, relayout_data[key.replace("[0]", "[1]")])
+        if re.fullmatch(r"xaxis\d*\.range", key):
+            return True, tuple(value)
+        if re.fullmatch(r"xaxis\d*\.autorange", key) and value:
+            return True, None
+    return False, None
+
+
+@callback(
+    Output("variable-plot", "figure", allow_duplicate=True),
+    Input("variable-plot", "relayoutData"),
+    State("x-axis-select", "value"),
+    State("y-axis-select", "value"),
+    State("downsample-select", "value"),
+    State("source-file-store", "data"),
+    State("live-switch", "value"),
+    prevent_initial_call=True,
+)
+def refine_plot(
+    relayout_data, x_axis_value, y_axis_values, method, source_file_path, live
+):
+    # re-query the visible range at full resolution when zooming, live plots
+    # already hold every buffered sample
+    if live or not relayout_data or not (x_axis_value and y_axis_values):
+        return no_update
+
+    is_zoom, x_range = get_relayout_range(relayout_data)
+    if not is_zoom:
+        return no_update
+
+    try:
+        series, x_name = get_plot_data(
+            source_file_path, x_axis_value, y_axis_values, method, x_range=x_range
+        )
+    except (TypeError, ValueError):
+        # category axes report positions instead of values
+        return no_update
+
+    # only replace the trace data so that the zoomed layout is kept, the
+    # traces follow the order of the selected variables
+    patched_figure = Patch()
+    for trace_idx, df in enumerate(series):
+        patched_figure["data"][trace_idx]["x"] = df[x_name]
+        patched_figure["data"][trace_idx]["y"] = df["value"]
+    return patched_figure
+
+
+@callback(
+    Output("live-interval", "disabled"),
+    Output("live-tail-store", "data"),
+    Output("variable-plot", "figure", allow_duplicate=True),
+    Input("live-switch", "value"),
+    State("x-axis-select", "value"),
+    State("y-axis-select", "value"),
+    State("plot-layout-select", "value"),
+    State("source-file-store", "data"),
+    State("live-tail-store", "data"),
+    prevent_initial_call=True,
+)
+def toggle_live(live, x_axis_value, y_axis_values, layout, source_file_path, live_data):
+    import pandas as pd
+
+    if live_data is not None:
+        stop_live_tail(live_data["tail_id"])
+
+    if not live or not (x_axis_value and y_axis_values):
+        return True, None, no_update
+
+    x_idx = int(x_axis_value)
+    y_indices = list(dict.fromkeys(int(value) for value in y_axis_values))
+    tail_id, live_tail = start_live_tail(
+        source_file_path, [x_idx] + y_indices, capacity=LIVE_BUFFER_SIZE
+    )
+    # the first read fills the buffers with the last rows of the file
+    live_tail.read()
+
+    x_name = live_tail.get_name(x_idx)
+    x_values = live_tail.get_values(x_idx)
+    series = []
+    for y_idx in y_indices:
+        y_values = live_tail.get_values(y_idx)
+        series.append(
+            pd.DataFrame(
+                {
+                    x_name: x_values[: len(y_values)],
+                    "value": y_values,
+                    "variable": live_tail.get_name(y_idx),
+                }
+            )
+        )
+
+    live_data = {"tail_id": tail_id, "x": x_idx, "y": y_indices}
+    return False, live_data, generate_figure(series, x_name, layout=layout)
+
+
+@callback(
+    Output("live-switch", "value", allow_duplicate=True),
+    Output("live-interval", "disabled", allow_duplicate=True),
+    Output("live-tail-store", "data", allow_duplicate=True),
+    Input("plotter-modal", "is_open"),
+    Input("x-axis-select", "value"),
+    Input("y-axis-select", "value"),
+    State("live-tail-store", "data"),
+    prevent_initial_call=True,
+)
+def stop_live(is_open, x_axis_value, y_axis_values, live_data):
+    # closing the plotter or selecting other variables leaves the live mode
+    if live_data is None:
+        return no_update
+
+    stop_live_tail(live_data["tail_id"])
+    return False, True, None
+
+
+@callback(
+    Output("variable-plot", "extendData"),
+    Input("live-interval", "n_intervals"),
+    State("live-tail-store", "data"),
+    prevent_initial_call=True,
+)
+def extend_live_plot(n_intervals, live_data):
+    live_tail = get_live_tail(live_data["tail_id"]) if live_data else None
+    if live_tail is None:
+        return no_update
+
+    # only parse and send the rows appended since the last tick
+    new_values = live_tail.read()
+    if new_values is None:
+        return no_update
+
+    x_values = new_values[live_data["x"]]
+    y_indices = live_data["y"]
+    return [
+        {
+            "x": [x_values] * len(y_indices),
+            "y": [new_values[y_idx] for y_idx in y_indices],
+        },
+        list(range(len(y_indices))),
+        live_tail.get_capacity(),
+    ]
@@ -0,0 +1,94 @@
+from visto.visualizer.compact_graph import CompactGraph
+
+
+def decode_bits(bits):
+    # positions of the set bits, lowest first
+    positions = []
+    digits = bin(bits)[:1:-1]
+    position = digits.find("1")
+    while position != -1:
+        positions.append(position)
+        position = digits.find("1", position + 1)
+    return positions
+
+
+class RankIndex:
+    # precomputed type expansion of the experiment graph. the types of a node
+    # are its rank (is_rank) predecessors together with everything that reaches
+    # them, stored as integer bitsets over the node order so that expanding a
+    # set of nodes is a union of precomputed entries
+
+    def __init__(self, graph):
+        if not isinstance(graph, CompactGraph):
+            graph = CompactGraph.from_networkx(graph)
+        self._nodes = list(graph.nodes)
+
+        # nodes on a cycle share their ancestors, so compute the closure on the
+        # condensation (one entry per strongly connected component)
+        component_of, components = graph.get_condensation()
+        rank_children = dict()
+        for parent, child, is_rank in graph.edges(data="is_rank"):
+            if is_rank:
+                parent_component = component_of[graph.get_node_id(parent)]
+                rank_children.setdefault(parent_component, []).append(child)
+
+        # only the components of rank parents and their ancestors need a closure
+        parent_components = dict()
+        stack = list(rank_children)
+        while stack:
+            component = stack.pop()
+            if component in parent_components:
+                continue
+            parents = {
+                component_of[parent_id]
+                for node_id in components[component]
+                for parent_id in graph.get_predecessor_ids(node_id)
+            }
+            parents.discard(component)
+            parent_components[component] = parents
+            stack.extend(parents)
+
+        num_readers = dict.fromkeys(parent_components, 0)
+        for parents in parent_components.values():
+            for parent_component in parents:
+                num_readers[parent_component] += 1
+
+        # components are in topological order, so parents come first. a closure
+        # is dropped once every child component has read it, which keeps the
+        # bitsets in memory to the frontier of the traversal
+        closures = dict()
+        self._type_bits = dict()
+        for component in sorted(parent_components):
+            bits = 0
+            for node_id in components[component]:
+                bits |= 1 << node_id
+            for parent_component in parent_components[component]:
+                bits |= closures[parent_component]
+                num_readers[parent_component] -= 1
+                if not num_readers[parent_component]:
+                    del closures[parent_component]
+            if num_readers[component]:
+                closures[component] = bits
+
+            for child in rank_children.get(component, ()):
+                # children of a single rank parent share its closure
+                child_bits = self._type_bits.get(child)
+                self._type_bits[child] = (
+                    bits if child_bits is None else child_bits | bits
+                )
+
+    def get_type_bits(self, nodes):
+        bits = 0
+        type_bits = self._type_bits
+        for node in nodes:
+            bits |= type_bits.get(node, 0)
+        return bits
+
+    def get_types(self, node):
+        return {self._nodes[idx] for idx in decode_bits(self._type_bits.get(node, 0))}
+
+    def add_type_nodes(self, nodes):
+        # extend the nodes with the classes they are ranked under
+        nodes = set(nodes)
+        nodes.update(self._nodes[idx] for idx in decode_bits(self.get_type_bits(nodes)))
+        return nodes
@@ -1,4 +1,47 @@
 import json
+from uuid import uuid4
+
 import networkx as nx
+
+
 def read_json_graph(graph):
-    return nx.node_link_graph(json.loads(graph))
\ No newline at end of file
+    return nx.node_link_graph(json.loads(graph))
+
+
+def get_node_ids(graph, graph_id):
+    # stable element ids for every node of a stored graph
+    return {node: f"{graph_id}-{node_ct}" for node_ct, node in enumerate(graph.nodes())}
+
+
+def serialize_graph(graph, linked_nodes, node_ids=None):
+    if node_ids is None:
+        node_ids = get_node_ids(graph, str(uuid4()).split("-")[-1])
+
+    elements = []
+    for node in graph.nodes():
+        elements.append(
+            {
+                "data": {
+                    "id": node_ids[node],
+                    "label": f"{node}",
+                    "chosen": False,
+                    "is_node": True,
+                    "linked": node in linked_nodes,
+                },
+            }
+        )
+
+    for parent, child, data in graph.edges(data=True):
+        parent_id, child_id = node_ids[parent], node_ids[child]
+        elements.append(
+            {
+                "data": {
+                    "source": parent_id,
+                    "target": child_id,
+                    "label": f"{data['rel']}",
+                    "is_node": False,
+                }
+            }
+        )
+
+    return elements
@@ -0,0 +1,316 @@
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from collections.abc import Sequence
+
+from visto.visualizer.compact_graph import CompactGraph
+
+SNAPSHOT_MAGIC = b"VISTOSNP"
+# bump whenever the layout of the snapshot files changes
+SNAPSHOT_VERSION = 1
+SNAPSHOT_EXTENSION = ".vsnap"
+# magic, version and header length
+PREAMBLE = struct.Struct("<8sII")
+ALIGNMENT = 8
+
+# value tags, code 0 of every value table stands for an unset attribute
+UNSET, NONE, FALSE, TRUE, INT, FLOAT, STR = range(7)
+FLOAT_BITS = struct.Struct("<d")
+INT_BITS = struct.Struct("<q")
+
+GRAPH_ARRAYS = ("out_offsets", "out_targets", "in_offsets", "in_sources", "in_edges")
+
+
+class SnapshotStrings(Sequence):
+    # strings of a snapshot, decoded from the mapped file on access
+
+    def __init__(self, offsets, data):
+        self._offsets = offsets
+        self._data = data
+
+    def __getitem__(self, idx):
+        if not 0 <= idx < len(self):
+            raise IndexError(idx)
+        return str(self._data[self._offsets[idx] : self._offsets[idx + 1]], "utf-8")
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+
+class SnapshotNames(Sequence):
+    # node names of one graph as ids into the shared string table
+
+    def __init__(self, strings, string_ids):
+        self._strings = strings
+        self._string_ids = string_ids
+
+    def __getitem__(self, idx):
+        return self._strings[self._string_ids[idx]]
+
+    def __len__(self):
+        return len(self._string_ids)
+
+
+class SnapshotValues(Sequence):
+    # attribute values of one graph, a tag and a 64 bit payload per value
+
+    def __init__(self, strings, tags, payloads):
+        self._strings = strings
+        self._tags = tags
+        self._payloads = payloads
+
+    def __getitem__(self, code):
+        tag = self._tags[code]
+        if tag == STR:
+            return self._strings[self._payloads[code]]
+        if tag == TRUE:
+            return True
+        if tag == FALSE:
+            return False
+        if tag == INT:
+            return self._payloads[code]
+        if tag == FLOAT:
+            return FLOAT_BITS.unpack(INT_BITS.pack(self._payloads[code]))[0]
+        return None
+
+    def __len__(self):
+        return len(self._tags)
+
+
+class SnapshotWriter:
+    # collects the sections of a snapshot, strings are stored once for all
+    # entries and everything else refers to them by id
+
+    def __init__(self):
+        self._strings = []
+        self._string_ids = dict()
+        self._sections = []
+        self._size = 0
+
+    def add_string(self, value):
+        string_id = self._string_ids.get(value)
+        if string_id is None:
+            string_id = self._string_ids[value] = len(self._strings)
+            self._strings.append(value)
+        return string_id
+
+    def add_array(self, values):
+        # returns the section description stored in the header
+        if not isinstance(values, array):
+            values = array(values.format, values)
+        padding = -self._size % ALIGNMENT
+        self._sections.append(b"\0" * padding + values.tobytes())
+        self._size += padding
+        section = {
+            "offset": self._size,
+            "typecode": values.typecode,
+            "itemsize": values.itemsize,
+            "length": len(values),
+        }
+        self._size += len(values) * values.itemsize
+        return section
+
+    def add_value(self, value):
+        # tag and payload of an attribute value
+        if value is None:
+            return NONE, 0
+        if value is True:
+            return TRUE, 0
+        if value is False:
+            return FALSE, 0
+        if isinstance(value, str):
+            return STR, self.add_string(value)
+        if isinstance(value, int) and -(1 << 63) <= value < 1 << 63:
+            return INT, value
+        if isinstance(value, float):
+            return FLOAT, INT_BITS.unpack(FLOAT_BITS.pack(value))[0]
+        raise TypeError(
+            f"Values of type {type(value).__name__} cannot be stored in a snapshot."
+        )
+
+    def add_graph(self, graph):
+        parts = graph.get_parts()
+        entry = {"kind": "graph", "graph": parts["graph_attrs"]}
+        entry["names"] = self.add_array(
+            array("I", (self.add_string(name) for name in parts["names"]))
+        )
+        for name in GRAPH_ARRAYS:
+            entry[name] = self.add_array(parts[name])
+        for key in ("node_columns", "edge_columns"):
+            entry[key] = {
+                attr: self.add_array(column) for attr, column in parts[key].items()
+            }
+
+        tags, payloads = array("B"), array("q")
+        for code, value in enumerate(parts["values"]):
+            tag, payload = self.add_value(value) if code else (UNSET, 0)
+            tags.append(tag)
+            payloads.append(payload)
+        entry["value_tags"] = self.add_array(tags)
+        entry["value_payloads"] = self.add_array(payloads)
+        return entry
+
+    def add_strings(self, kind, values):
+        return {
+            "kind": kind,
+            "ids": self.add_array(
+                array("I", (self.add_string(value) for value in values))
+            ),
+        }
+
+    def add_entry(self, value):
+        if isinstance(value, CompactGraph):
+            return self.add_graph(value)
+        if isinstance(value, (set, frozenset)):
+            # sorted so that equal sets give equal files
+            return self.add_strings("set", sorted(value))
+        if isinstance(value, (list, tuple)):
+            return self.add_strings("list", value)
+        if isinstance(value, dict):
+            entry = self.add_strings("mapping", value.keys())
+            entry["values"] = self.add_strings("list", value.values())["ids"]
+            return entry
+        raise TypeError(
+            f"Entries of type {type(value).__name__} cannot be stored in a snapshot."
+        )
+
+    def write(self, file_path, entries, metadata=None):
+        header = {
+            "byteorder": sys.byteorder,
+            "metadata": metadata or {},
+            "entries": {key: self.add_entry(value) for key, value in entries.items()},
+        }
+        # the string table goes last, every entry has added its strings by now
+        encoded = [value.encode("utf-8") for value in self._strings]
+        offsets = [0]
+        for value in encoded:
+            offsets.append(offsets[-1] + len(value))
+        header["strings"] = {
+            "offsets": self.add_array(array("Q", offsets)),
+            "data": self.add_array(array("B", b"".join(encoded))),
+        }
+
+        header_data = json.dumps(header).encode("utf-8")
+        header_data += b" " * (-(PREAMBLE.size + len(header_data)) % ALIGNMENT)
+        temp_path = f"{file_path}.{os.getpid()}.tmp"
+        try:
+            with open(temp_path, "wb") as f:
+                f.write(
+                    PREAMBLE.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, len(header_data))
+                )
+                f.write(header_data)
+                for section in self._sections:
+                    f.write(section)
+            # readers that mapped the previous file keep their copy
+            os.replace(temp_path, file_path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+
+def write_snapshot(file_path, entries, metadata=None):
+    # entries map names to compact graphs, sets, lists or dicts of strings,
+    # metadata has to be json serializable
+    SnapshotWriter().write(file_path, entries, metadata=metadata)
+
+
+class SnapshotReader:
+    # maps a snapshot file and hands out its arrays as views of the mapping,
+    # nothing is copied or decoded until it is accessed
+
+    def __init__(self, file_path):
+        with open(file_path, "rb") as f:
+            try:
+                self._buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                # empty file
+                raise ValueError(f"{file_path} is not a snapshot.") from None
+        view = memoryview(self._buffer)
+
+        if len(view) < PREAMBLE.size:
+            raise ValueError(f"{file_path} is not a snapshot.")
+        magic, version, header_size = PREAMBLE.unpack_from(view)
+        if magic != SNAPSHOT_MAGIC:
+            raise ValueError(f"{file_path} is not a snapshot.")
+        if version != SNAPSHOT_VERSION:
+            raise ValueError(
+                f"{file_path} has snapshot version {version}, expected {SNAPSHOT_VERSION}."
+            )
+        header_end = PREAMBLE.size + header_size
+        self._header = json.loads(bytes(view[PREAMBLE.size : header_end]))
+        self._data = view[header_end:]
+        self._swap = self._header["byteorder"] != sys.byteorder
+
+        strings = self._header["strings"]
+        self._strings = SnapshotStrings(
+            self.get_array(strings["offsets"]), self.get_array(strings["data"])
+        )
+
+    def get_array(self, section):
+        typecode = section["typecode"]
+        if array(typecode).itemsize != section["itemsize"]:
+            raise ValueError(
+                f"Snapshot arrays of type {typecode} do not fit this platform."
+            )
+        end = section["offset"] + section["length"] * section["itemsize"]
+        data = self._data[section["offset"] : end]
+        if not self._swap:
+            return data.cast(typecode)
+        # written on a machine of the other byte order, fall back to a copy
+        values = array(typecode)
+        values.frombytes(data)
+        values.byteswap()
+        return values
+
+    def get_strings(self, section):
+        strings = self._strings
+        return [strings[string_id] for string_id in self.get_array(section)]
+
+    def get_graph(self, entry):
+        strings = self._strings
+        return CompactGraph(
+            names=SnapshotNames(strings, self.get_array(entry["names"])),
+            node_columns={
+                attr: self.get_array(section)
+                for attr, section in entry["node_columns"].items()
+            },
+            edge_columns={
+                attr: self.get_array(section)
+                for attr, section in entry["edge_columns"].items()
+            },
+            values=SnapshotValues(
+                strings,
+                self.get_array(entry["value_tags"]),
+                self.get_array(entry["value_payloads"]),
+            ),
+            graph_attrs=entry["graph"],
+            **{name: self.get_array(entry[name]) for name in GRAPH_ARRAYS},
+        )
+
+    def get_entry(self, key):
+        entry = self._header["entries"][key]
+        if entry["kind"] == "graph":
+            return self.get_graph(entry)
+        if entry["kind"] == "set":
+            return set(self.get_strings(entry["ids"]))
+        if entry["kind"] == "mapping":
+            return dict(
+                zip(self.get_strings(entry["ids"]), self.get_strings(entry["values"]))
+            )
+        return self.get_strings(entry["ids"])
+
+    def get_keys(self):
+        return list(self._header["entries"])
+
+    def get_metadata(self):
+        return self._header["metadata"]
+
+
+def read_snapshot(file_path):
+    # the graphs stay backed by the mapped file, copy them with pickle or
+    # to_networkx to detach them
+    reader = SnapshotReader(file_path)
+    return {key: reader.get_entry(key) for key in reader.get_keys()}
@@ -0,0 +1,193 @@
+import csv
+import re
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from urllib.parse import quote
+
+REL_COLUMNS = ["parent", "child", "rel", "is_rank"]
+
+# well-known namespaces, prefixes missing here are placed under the base iri
+DEFAULT_PREFIXES = {
+    "rdf": "http://www.w3.org/1999/02/22-rdf-syntax-ns#",
+    "rdfs": "http://www.w3.org/2000/01/rdf-schema#",
+    "owl": "http://www.w3.org/2002/07/owl#",
+    "pmd": "https://w3id.org/pmd/co/",
+}
+DEFAULT_BASE_IRI = "urn:visto:"
+# local names that can be written as prefixed names in turtle
+PREFIXED_NAME = re.compile(r"[A-Za-z_][A-Za-z0-9_\-]*")
+
+
+class TripleWriter:
+    # writers consume relationships as an iterable of
+    # (parent, child, rel, is_rank) tuples, see BaseOntology.iter_rels
+    extension = None
+
+    def write(self, file_path, rels):
+        raise NotImplementedError
+
+    def get_file_path(self, file_path_stem):
+        return f"{file_path_stem}.{self.extension}"
+
+
+class CsvTripleWriter(TripleWriter):
+    extension = "csv"
+
+    def write(self, file_path, rels):
+        with open(file_path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(REL_COLUMNS)
+            writer.writerows(rels)
+
+
+class ParquetTripleWriter(TripleWriter):
+    extension = "parquet"
+
+    def __init__(self, batch_size=65536):
+        self._batch_size = batch_size
+
+    def write(self, file_path, rels):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ImportError(
+                "Writing parquet files requires pyarrow. Please install it or choose another triple format."
+            ) from e
+
+        schema = pa.schema(
+            [
+                ("parent", pa.string()),
+                ("child", pa.string()),
+                ("rel", pa.string()),
+                ("is_rank", pa.bool_()),
+            ]
+        )
+        rels = iter(rels)
+        with pq.ParquetWriter(file_path, schema) as writer:
+            # only hold one batch of relationships in memory at a time
+            while batch := list(islice(rels, self._batch_size)):
+                columns = [list(column) for column in zip(*batch)]
+                writer.write_batch(pa.record_batch(columns, schema=schema))
+
+
+class RdfTripleWriter(TripleWriter):
+
+    def __init__(self, prefixes=None, base_iri=DEFAULT_BASE_IRI):
+        self._prefixes = dict(DEFAULT_PREFIXES)
+        if prefixes:
+            self._prefixes.update(prefixes)
+        self._base_iri = base_iri
+
+    def get_iri(self, term):
+        prefix, sep, name = term.partition(":")
+        if sep and prefix and " " not in prefix:
+            namespace = self._prefixes.get(prefix, f"{self._base_iri}{prefix}/")
+            return f"{namespace}{quote(name.strip(), safe='')}"
+        # instances are not prefixed by convention
+        return f"{self._base_iri}{quote(term.strip(), safe='')}"
+
+    def iter_triples(self, rels):
+        # rank edges point from the class to its subclasses and instances,
+        # rdfs:subClassOf and rdf:type are stated the other way around
+        for parent, child, rel, is_rank in rels:
+            if is_rank:
+                yield child, rel, parent
+            else:
+                yield parent, rel, child
+
+
+class NTriplesTripleWriter(RdfTripleWriter):
+    extension = "nt"
+
+    def write(self, file_path, rels):
+        get_iri = self.get_iri
+        with open(file_path, "w", encoding="utf-8") as f:
+            f.writelines(
+                f"<{get_iri(subject)}> <{get_iri(rel)}> <{get_iri(obj)}> .\n"
+                for subject, rel, obj in self.iter_triples(rels)
+            )
+
+
+class TurtleTripleWriter(RdfTripleWriter):
+    extension = "ttl"
+
+    def get_name(self, term):
+        prefix, sep, name = term.partition(":")
+        if sep and prefix in self._prefixes and PREFIXED_NAME.fullmatch(name):
+            return term
+        return f"<{self.get_iri(term)}>"
+
+    def write(self, file_path, rels):
+        get_name = self.get_name
+        with open(file_path, "w", encoding="utf-8") as f:
+            for prefix, namespace in self._prefixes.items():
+                f.write(f"@prefix {prefix}: <{namespace}> .\n")
+            f.write("\n")
+            f.writelines(
+                f"{get_name(subject)} {get_name(rel)} {get_name(obj)} .\n"
+                for subject, rel, obj in self.iter_triples(rels)
+            )
+
+
+class ExcelTripleWriter(TripleWriter):
+    # the spreadsheet is built in memory by openpyxl, only use it for small exports
+    extension = "xlsx"
+
+    def write(self, file_path, rels):
+        import pandas as pd
+
+        pd.DataFrame(list(rels), columns=REL_COLUMNS).to_excel(file_path)
+
+
+TRIPLE_WRITERS = {
+    "csv": CsvTripleWriter,
+    "parquet": ParquetTripleWriter,
+    "nt": NTriplesTripleWriter,
+    "ttl": TurtleTripleWriter,
+    "xlsx": ExcelTripleWriter,
+}
+
+
+def get_triple_writer(triple_format):
+    try:
+        return TRIPLE_WRITERS[triple_format]()
+    except KeyError:
+        raise ValueError(
+            f"Unknown triple format {triple_format}. "
+            f"Please choose one of {', '.join(TRIPLE_WRITERS)}."
+        ) from None
+
+
+class BackgroundTripleWriter:
+    # writes on a single worker thread so that the build can move on to the next
+    # component, the relationships must not be modified until the write is done
+
+    def __init__(self, writer):
+        self._writer = writer
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._futures = []
+
+    def get_file_path(self, file_path_stem):
+        return self._writer.get_file_path(file_path_stem)
+
+    def write(self, file_path, rels):
+        self._futures.append(self._executor.submit(self._writer.write, file_path, rels))
+
+    def close(self):
+        # wait for all pending writes and surface the first error, if any
+        self._executor.shutdown(wait=True)
+        futures, self._futures = self._futures, []
+        for future in futures:
+            future.result()
+
+    def cancel(self):
+        # drop the writes that have not started, e.g. when the build is aborted
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        self._futures = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
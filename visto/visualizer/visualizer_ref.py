@@ -1,4 +1,5 @@
 import importlib.resources as pkg_resources
+import os
 from configparser import ConfigParser
 from pathlib import Path
 
@@ -31,9 +32,42 @@ class VisualizerRef:
         config = self._get_config()
         return config["file_params"]["triple_output_path"]
 
-    def get_temp_path(self):
+    def get_triple_format(self):
         config = self._get_config()
-        return config["file_params"]["temp_path"]
+        return config["file_params"].get("triple_format") or "csv"
+
+    def get_template_cache_path(self):
+        # the on-disk template cache is optional, leave the entry blank to disable
+        config = self._get_config()
+        return config["file_params"].get("template_cache_path") or None
+
+    def get_graph_store_path(self):
+        # evicted session graphs are spilled here, leave the entry blank to disable
+        config = self._get_config()
+        return config["file_params"].get("graph_store_path") or None
+
+    def get_ego_precompute_count(self):
+        # the most connected nodes whose neighborhoods are prepared after an upload
+        config = self._get_config()
+        return config["file_params"].getint("ego_precompute_count", fallback=0)
+
+    def get_column_cache_path(self):
+        # columns of the plotted source files are cached here, leave blank to disable
+        config = self._get_config()
+        return config["file_params"].get("column_cache_path") or None
+
+    def get_snapshot_path(self):
+        # prebuilt graph snapshots are looked up here, leave blank to disable
+        config = self._get_config()
+        return config["file_params"].get("snapshot_path") or None
+
+    def get_ontology_search_paths(self):
+        # extra template folders besides the packaged ones, separated by os.pathsep
+        config = self._get_config()
+        search_paths = config["file_params"].get("ontology_search_paths") or ""
+        return [
+            search_path for search_path in search_paths.split(os.pathsep) if search_path
+        ]
 
     def _get_config(self):
         return self._config